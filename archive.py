@@ -0,0 +1,370 @@
+from playing import *
+import mmap
+import os
+# import check
+
+
+ARCHIVE_MAGIC = b"BRGA"
+ARCHIVE_HEADER = 8
+INDEX_EXTENSION = ".idx"
+INDEX_ENTRY = 16
+REMOVED = (1 << 64) - 1
+
+##An archive is a header (ARCHIVE_MAGIC, SAVE_VERSION, then a 3-byte
+##little-endian generation) followed by records of SAVE_SIZE bytes, each
+##a Game.to_bytes. Record k starts at ARCHIVE_HEADER + k * SAVE_SIZE.
+##Next to it, the file name plus INDEX_EXTENSION holds the index: the
+##same header padded with zeros to INDEX_ENTRY bytes, then pairs of
+##little-endian 8-byte numbers (game id, record), appended on every
+##write; a later pair for an id replaces an earlier one, and the
+##record REMOVED means the game was removed.
+##An index belongs to the archive with the same header. compact writes
+##the next generation of both files aside, then renames the archive
+##into place, which is the switch; an archive opened with the index
+##still waiting aside (a crash before its rename) finishes the switch.
+
+
+class GameArchive:
+  '''
+  Many saved Games in one file, found by game id through an index
+  held in memory. Writes only ever append; a game saved again gets
+  a new record and its old record is left dead until compact.
+
+  Fields:
+     file_name (Str)
+     index (dictof Nat Nat)
+     records (Nat)
+     file (File)
+     index_file (File)
+     mapped (anyof mmap None)
+  Requires:
+     index maps the id of every game in the archive to its record
+     records is the number of records in the file, live or dead
+     mapped is None or maps the first ARCHIVE_HEADER + n * SAVE_SIZE
+        bytes of file for some n <= records
+  '''
+
+  def __init__(self, file_name):
+    '''
+    Opens the archive file_name, creating it if it does not exist,
+    and reads its index. Raises ValueError if file_name is not an
+    archive of version SAVE_VERSION or its index does not belong to it.
+
+    Effects:
+       Mutates self
+       Reads/Writes to file
+
+    __init__: GameArchive Str -> None
+    '''
+    self.file_name = file_name
+    index_name = file_name + INDEX_EXTENSION
+    if not os.path.exists(file_name):
+      header = archive_header(0)
+      _write_file(index_name, header + bytes(INDEX_ENTRY - ARCHIVE_HEADER))
+      _write_file(file_name, header)
+    self.file = open(file_name, 'r+b')
+    header = self.file.read(ARCHIVE_HEADER)
+    if len(header) < ARCHIVE_HEADER or header[:4] != ARCHIVE_MAGIC:
+      self.file.close()
+      raise ValueError("not a game archive: " + file_name)
+    if header[4] != SAVE_VERSION:
+      self.file.close()
+      raise ValueError("game archive {0} has version {1}, not {2}".format(
+        file_name, header[4], SAVE_VERSION))
+    if _read_header(index_name) != header and \
+       _read_header(index_name + ".tmp") == header:
+      os.replace(index_name + ".tmp", index_name)
+    self.index_file = open(index_name, 'a+b')
+    self.index_file.seek(0)
+    data = self.index_file.read()
+    if data[:ARCHIVE_HEADER] != header:
+      self.file.close()
+      self.index_file.close()
+      raise ValueError("index does not match game archive: " + file_name)
+    self.records = ((os.path.getsize(file_name) - ARCHIVE_HEADER) //
+                    SAVE_SIZE)
+    self.mapped = None
+    self.index = {}
+    entries = numpy.frombuffer(data[INDEX_ENTRY:], dtype = "<u8")
+    for game_id, record in entries.reshape(-1, 2).tolist():
+      if record == REMOVED:
+        self.index.pop(game_id, None)
+      else:
+        self.index[game_id] = record
+
+  def __repr__(self):
+    '''
+    Returns a representation of a GameArchive object
+
+    __repr__: GameArchive -> Str
+    '''
+    return ("GameArchive: {0.file_name} Games {1} Records " +
+            "{0.records}").format(self, len(self.index))
+
+  def __len__(self):
+    '''
+    Returns the number of games in self
+
+    __len__: GameArchive -> Nat
+    '''
+    return len(self.index)
+
+  def __contains__(self, game_id):
+    '''
+    Returns True if a game with id game_id is in self and False
+    otherwise
+
+    __contains__: GameArchive Nat -> Bool
+    '''
+    return game_id in self.index
+
+  def ids(self):
+    '''
+    Returns the ids of the games in self in increasing order
+
+    ids: GameArchive -> (listof Nat)
+    '''
+    return sorted(self.index)
+
+  def append(self, game_id, game):
+    '''
+    Saves game under game_id at the end of self, replacing any game
+    saved under game_id before.
+
+    Effects:
+       Mutates self
+       Writes to file
+
+    append: GameArchive Nat Game -> None
+    Requires: 0 <= game_id < 2 ** 64 - 1
+    '''
+    self.file.seek(ARCHIVE_HEADER + self.records * SAVE_SIZE)
+    self.file.write(game.to_bytes())
+    self.file.flush()
+    self._write_index(game_id, self.records)
+    self.index[game_id] = self.records
+    self.records += 1
+
+  def remove(self, game_id):
+    '''
+    Returns True if a game with id game_id was in self and removes
+    it. False otherwise with no mutation.
+
+    Effects:
+       Mutates self
+       Writes to file
+
+    remove: GameArchive Nat -> Bool
+    '''
+    if game_id not in self.index:
+      return False
+    self._write_index(game_id, REMOVED)
+    self.index.pop(game_id)
+    return True
+
+  def record(self, game_id):
+    '''
+    Returns the saved bytes of the game with id game_id in self, or
+    None if there is no such game. Only that record is read, through
+    a memory map of the file.
+
+    Effects: Mutates self.mapped
+
+    record: GameArchive Nat -> (anyof Bytes None)
+    '''
+    record = self.index.get(game_id)
+    if record == None:
+      return None
+    start = ARCHIVE_HEADER + record * SAVE_SIZE
+    if self.mapped == None or len(self.mapped) < start + SAVE_SIZE:
+      if self.mapped != None:
+        self.mapped.close()
+      self.mapped = mmap.mmap(self.file.fileno(), 0,
+                              access = mmap.ACCESS_READ)
+    return self.mapped[start:start + SAVE_SIZE]
+
+  def load(self, game_id):
+    '''
+    Returns the Game saved under game_id in self, or None if there
+    is no such game
+
+    Effects: Mutates self.mapped
+
+    load: GameArchive Nat -> (anyof Game None)
+    '''
+    data = self.record(game_id)
+    if data == None:
+      return None
+    return from_bytes(data)
+
+  def compact(self):
+    '''
+    Rewrites self with only the live record of each game, in order
+    of game id, and a fresh index with one entry per game, as the next
+    generation. A crash at any point leaves either the old or the new
+    generation whole.
+
+    Effects:
+       Mutates self
+       Reads/Writes to file
+
+    compact: GameArchive -> None
+    '''
+    ids = self.ids()
+    records = [self.record(game_id) for game_id in ids]
+    if self.mapped != None:
+      self.mapped.close()
+      self.mapped = None
+    self.file.seek(0)
+    generation = int.from_bytes(self.file.read(ARCHIVE_HEADER)[5:],
+                                "little")
+    header = archive_header((generation + 1) % (1 << 24))
+    pairs = numpy.array([[ids[k], k] for k in range(len(ids))],
+                        dtype = "<u8").reshape(-1, 2)
+    index_name = self.file_name + INDEX_EXTENSION
+    _write_file(index_name + ".tmp",
+                header + bytes(INDEX_ENTRY - ARCHIVE_HEADER) +
+                pairs.tobytes())
+    _write_file(self.file_name + ".tmp", header + b"".join(records))
+    self.file.close()
+    self.index_file.close()
+    os.replace(self.file_name + ".tmp", self.file_name)
+    os.replace(index_name + ".tmp", index_name)
+    self.file = open(self.file_name, 'r+b')
+    self.index_file = open(self.file_name + INDEX_EXTENSION, 'a+b')
+    self.index = {ids[k]: k for k in range(len(ids))}
+    self.records = len(ids)
+
+  def close(self):
+    '''
+    Closes the files of self
+
+    Effects: Mutates self
+
+    close: GameArchive -> None
+    '''
+    if self.mapped != None:
+      self.mapped.close()
+      self.mapped = None
+    self.file.close()
+    self.index_file.close()
+
+  def _write_index(self, game_id, record):
+    '''
+    Appends the index entry (game_id, record) to the index file of
+    self
+
+    Effects: Writes to file
+
+    _write_index: GameArchive Nat Nat -> None
+    '''
+    self.index_file.write(game_id.to_bytes(8, "little") +
+                          record.to_bytes(8, "little"))
+    self.index_file.flush()
+
+
+##END OF CLASSES
+
+
+def archive_header(generation):
+  '''
+  Returns the header of an archive of generation
+
+  archive_header: Nat -> Bytes
+  Requires: generation < 2 ** 24
+
+  Example:
+     archive_header(1) => ARCHIVE_MAGIC + bytes([SAVE_VERSION, 1, 0, 0])
+  '''
+  return ARCHIVE_MAGIC + bytes([SAVE_VERSION]) + generation.to_bytes(3,
+                                                                      "little")
+
+def _read_header(file_name):
+  '''
+  Returns the first ARCHIVE_HEADER bytes of file_name, or None if it
+  does not exist
+
+  Effects: Reads from file
+
+  _read_header: Str -> (anyof Bytes None)
+  '''
+  if not os.path.exists(file_name):
+    return None
+  file = open(file_name, 'rb')
+  header = file.read(ARCHIVE_HEADER)
+  file.close()
+  return header
+
+def _write_file(file_name, data):
+  '''
+  Writes data to file_name and waits until it is on disk
+
+  Effects: Writes to file
+
+  _write_file: Str Bytes -> None
+  '''
+  file = open(file_name, 'wb')
+  file.write(data)
+  file.flush()
+  os.fsync(file.fileno())
+  file.close()
+
+
+'''
+##Tests GameArchive
+
+import tempfile
+folder = tempfile.mkdtemp()
+name = os.path.join(folder, "games.bra")
+P = [Player("North", [Card("2", "S")]), Player("East", [Card("5", "D")]),
+     Player("South", [Card("A", "D")]), Player("West", [Card("K", "D")])]
+G1 = Game([Bid("3", "NT"), Bid("double", None)], "West", "South", 12, P,
+          False, False)
+G2 = Game([Bid("4", "S"), None], "East", "North", 3, P, True, False)
+A = GameArchive(name)
+A.append(7, G1)
+A.append(9, G2)
+check.expect("Test load", A.load(7), G1)
+A.append(7, G2)
+check.expect("Test replaced", [A.load(7), len(A), A.records], [G2, 2, 3])
+check.expect("Test remove", [A.remove(9), A.remove(9), 9 in A],
+             [True, False, False])
+A.close()
+A = GameArchive(name)
+check.expect("Test reopen", [A.ids(), A.load(7), A.load(9)], [[7], G2, None])
+A.compact()
+check.expect("Test compact", [A.records, A.load(7),
+                              os.path.getsize(name)],
+             [1, G2, ARCHIVE_HEADER + SAVE_SIZE])
+A.append(3, G1)
+A.close()
+A = GameArchive(name)
+check.expect("Test after compact", [A.ids(), A.load(3)], [[3, 7], G1])
+A.compact()
+A.close()
+index_name = name + INDEX_EXTENSION
+os.replace(index_name, index_name + ".tmp")
+_write_file(index_name, archive_header(1) + bytes(8))
+A = GameArchive(name)
+check.expect("Test crash before index switch", [A.ids(), A.load(3),
+                                                A.records], [[3, 7], G1, 2])
+A.close()
+_write_file(index_name, archive_header(1) + bytes(8))
+try:
+  GameArchive(name)
+  check.expect("Test mismatched index", False, True)
+except ValueError:
+  pass
+foreign = os.path.join(folder, "foreign.bra")
+_write_file(foreign, b"PK" + bytes(62))
+old = os.path.join(folder, "old.bra")
+_write_file(old, ARCHIVE_MAGIC + bytes([SAVE_VERSION + 1, 0, 0, 0]))
+for file_name in [foreign, old]:
+  try:
+    GameArchive(file_name)
+    check.expect("Test bad header " + file_name, False, True)
+  except ValueError:
+    pass
+check.expect("Test archive_header", archive_header(1),
+             ARCHIVE_MAGIC + bytes([SAVE_VERSION, 1, 0, 0]))
+'''
@@ -0,0 +1,437 @@
+from scoring import *
+from double_dummy import *
+import json
+import os
+import sys
+import tempfile
+import time
+# import check
+
+
+BASELINE_FILE = "benchmarks_baseline.json"
+THRESHOLD = 0.25
+NOISE_FLOOR = 1e-3
+REPEATS = 5
+SIZES = [1, 10000, 1000000]
+OPT_IN = ["dd_tables"]
+
+##Each benchmark is a setup function taking a size n. Setup builds the
+##inputs (untimed) and returns a function of no arguments doing n units
+##of work, which is what gets timed. Results map each benchmark name to
+##a dictionary from size (as a string, for JSON) to the best time in
+##seconds of REPEATS runs. Benchmarks in OPT_IN take minutes, so they run
+##only when named (--only) or when every benchmark is asked for (--all).
+
+
+def _random_players(n, seed = 0):
+  '''
+  Returns n lists of four Players holding the hands of n random deals
+
+  _random_players: Nat [Nat] -> (listof (listof Player))
+  '''
+  hands = generate_deals(n, seed)
+  return [hands_to_players(hands[k]) for k in range(n)]
+
+def bench_shuffle_deal(n):
+  '''
+  Returns a function that shuffles and deals n decks to four Players
+
+  bench_shuffle_deal: Nat -> (None -> Any)
+  '''
+  def run():
+    for seed in range(n):
+      players = [Player(name, []) for name in SEATS]
+      deal(shuffle(seed), players)
+  return run
+
+def bench_generate_deals(n):
+  '''
+  Returns a function that generates n deals as a NumPy array
+
+  bench_generate_deals: Nat -> (None -> Any)
+  '''
+  return lambda: generate_deals(n, 0)
+
+def bench_play_card(n):
+  '''
+  Returns a function that plays every card of the hands of n deals
+  with Player.play_card
+
+  bench_play_card: Nat -> (None -> Any)
+  '''
+  deals = _random_players(n)
+  def run():
+    for players in deals:
+      for player in players:
+        for card in list(player.hand):
+          player.play_card(card)
+  return run
+
+def bench_followed_suit(n):
+  '''
+  Returns a function that makes n followed_suit checks of random
+  cards against random 13-card hands
+
+  bench_followed_suit: Nat -> (None -> Any)
+  '''
+  hands = generate_deals(max(1, n // NUM_HANDS + 1), 1)
+  checks = []
+  for k in range(n):
+    hand = [CARDS[code] for code in hands[k // NUM_HANDS, k % NUM_HANDS]]
+    checks.append([hand, hand[k % HAND_SIZE], CARD_SUITS[k % 4]])
+  def run():
+    for hand, card, suit in checks:
+      followed_suit(hand, card, suit)
+  return run
+
+def bench_trick_winner(n):
+  '''
+  Returns a function that finds the winner of n random tricks with
+  Game.trick_winner
+
+  bench_trick_winner: Nat -> (None -> Any)
+  '''
+  hands = generate_deals(max(1, n // HAND_SIZE + 1), 2)
+  tricks = [[CARDS[code] for code in hands[k // HAND_SIZE, :, k % HAND_SIZE]]
+            for k in range(n)]
+  game = Game([Bid("4", "H"), None], "North", "South", 0, [], False, False)
+  def run():
+    for trick in tricks:
+      game.cur_player = "North"
+      game.trick_winner(trick)
+  return run
+
+def bench_trick_winners(n):
+  '''
+  Returns a function that finds the winners of n random tricks with
+  trick_winners
+
+  bench_trick_winners: Nat -> (None -> Any)
+  '''
+  hands = generate_deals(max(1, n // HAND_SIZE + 1), 2)
+  tricks = hands.transpose(0, 2, 1).reshape(-1, NUM_HANDS)[:n]
+  rng = random.default_rng(2)
+  leaders = rng.integers(0, NUM_HANDS, n)
+  trumps = rng.integers(0, len(STRAINS), n)
+  return lambda: trick_winners(tricks, leaders, trumps)
+
+def _random_auctions(n, seed = 3):
+  '''
+  Returns n random complete auctions as lists of Bids, mostly passes
+
+  _random_auctions: Nat [Nat] -> (listof (listof Bid))
+  '''
+  rng = random.default_rng(seed)
+  auctions = []
+  for k in range(n):
+    auction = Auction()
+    while not auction.is_complete():
+      legal = auction.legal_calls()
+      codes = [code for code in range(NUM_CALLS) if legal >> code & 1]
+      if rng.random() < 0.6:
+        auction.call(Bid("pass", None))
+      else:
+        auction.call(BIDS[codes[rng.integers(min(len(codes), 6))]])
+    auctions.append(auction.bids)
+  return auctions
+
+def bench_auction(n):
+  '''
+  Returns a function that checks every call of n random auctions with
+  valid_bid and then finds their contract and declarer
+
+  bench_auction: Nat -> (None -> Any)
+  '''
+  auctions = _random_auctions(n)
+  def run():
+    for bids in auctions:
+      for k in range(len(bids)):
+        valid_bid(bids[:k], bids[k])
+      contract(bids)
+      declarer("North", bids)
+  return run
+
+def bench_auction_object(n):
+  '''
+  Returns a function that replays n random auctions through Auction
+  and finds their contract and declarer
+
+  bench_auction_object: Nat -> (None -> Any)
+  '''
+  auctions = _random_auctions(n)
+  def run():
+    for bids in auctions:
+      auction = Auction.from_bids("North", bids)
+      auction.contract()
+      auction.declarer()
+  return run
+
+def _random_results(n, seed = 4):
+  '''
+  Returns n random results as arrays of levels, strains, doubling,
+  vulnerability and tricks
+
+  _random_results: Nat [Nat] -> (listof ndarray)
+  '''
+  rng = random.default_rng(seed)
+  return [rng.integers(1, 8, n), rng.integers(0, 5, n), rng.integers(0, 3, n),
+          rng.integers(0, 2, n), rng.integers(0, 14, n)]
+
+def bench_score(n):
+  '''
+  Returns a function that scores n random results with score
+
+  bench_score: Nat -> (None -> Any)
+  '''
+  levels, strains, doubles, vul, tricks = _random_results(n)
+  games = []
+  for k in range(n):
+    bid = None
+    if DOUBLES[doubles[k]] != None:
+      bid = Bid(DOUBLES[doubles[k]], None)
+    games.append(Game([Bid(str(levels[k]), STRAINS[strains[k]]), bid],
+                      "East", "North", int(tricks[k]), [], vul[k] == 1,
+                      False))
+  def run():
+    for game in games:
+      score(game)
+  return run
+
+def bench_score_many(n):
+  '''
+  Returns a function that scores n random results with score_many
+
+  bench_score_many: Nat -> (None -> Any)
+  '''
+  results = _random_results(n)
+  score_table()
+  return lambda: score_many(*results)
+
+def _random_games(n):
+  '''
+  Returns n random Games in the middle of the play
+
+  _random_games: Nat -> (listof Game)
+  '''
+  deals = _random_players(n, 5)
+  return [Game([Bid("3", "NT"), Bid("double", None)], "West", "South", 4,
+               deals[k], k % 2 == 0, k % 3 == 0) for k in range(n)]
+
+def bench_save_load(n):
+  '''
+  Returns a function that saves and loads n Games with Game.save
+  and load
+
+  bench_save_load: Nat -> (None -> Any)
+  '''
+  games = _random_games(n)
+  file_name = os.path.join(tempfile.mkdtemp(), "game.txt")
+  def run():
+    for game in games:
+      game.save(file_name)
+      load(file_name)
+  return run
+
+def bench_save_binary(n):
+  '''
+  Returns a function that turns n Games into binary saves and back
+  with Game.to_bytes and from_bytes
+
+  bench_save_binary: Nat -> (None -> Any)
+  '''
+  games = _random_games(n)
+  def run():
+    for game in games:
+      from_bytes(game.to_bytes())
+  return run
+
+def bench_loads_many(n):
+  '''
+  Returns a function that decodes n binary saves with loads_many
+
+  bench_loads_many: Nat -> (None -> Any)
+  '''
+  data = _random_games(1)[0].to_bytes() * n
+  return lambda: loads_many(data)
+
+def bench_dd_tables(n):
+  '''
+  Returns a function that computes the double-dummy tables of n full
+  13-card deals with dd_tables in this process
+
+  bench_dd_tables: Nat -> (None -> Any)
+  '''
+  ##Full-deal solves range from about a minute to well over ten minutes
+  ##in pure Python, so skip to the seed 5 deals starting at one that
+  ##takes about a minute to keep each repeat practical.
+  deals = generate_deals(n + 2, 5, True)[2:]
+  return lambda: dd_tables(deals, 1)
+
+BENCHMARKS = {"shuffle_deal": [bench_shuffle_deal, [1, 10000]],
+              "generate_deals": [bench_generate_deals, SIZES],
+              "play_card": [bench_play_card, [1, 10000]],
+              "followed_suit": [bench_followed_suit, SIZES],
+              "trick_winner": [bench_trick_winner, SIZES],
+              "trick_winners": [bench_trick_winners, SIZES],
+              "auction": [bench_auction, [1, 10000]],
+              "auction_object": [bench_auction_object, [1, 10000]],
+              "score": [bench_score, [1, 10000]],
+              "score_many": [bench_score_many, SIZES],
+              "save_load": [bench_save_load, [1, 1000]],
+              "save_binary": [bench_save_binary, [1, 10000]],
+              "loads_many": [bench_loads_many, SIZES],
+              "dd_tables": [bench_dd_tables, [1]]}
+
+
+def time_benchmark(setup, n, repeats = REPEATS):
+  '''
+  Returns the best time in seconds of repeats runs of the function
+  setup(n) returns, with the setup itself untimed
+
+  time_benchmark: (Nat -> (None -> Any)) Nat [Nat] -> Float
+  '''
+  best = None
+  for k in range(repeats):
+    run = setup(n)
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    if best == None or elapsed < best:
+      best = elapsed
+  return best
+
+def run_benchmarks(names = None, max_size = None, repeats = REPEATS):
+  '''
+  Returns the results of the benchmarks named in names (all of
+  BENCHMARKS not in OPT_IN when None) at each of their sizes up to
+  max_size (all sizes when None)
+
+  run_benchmarks: [(anyof (listof Str) None)] [(anyof Nat None)] [Nat]
+     -> (dictof Str (dictof Str Float))
+  '''
+  results = {}
+  for name in BENCHMARKS:
+    if names == None and name in OPT_IN or \
+       names != None and name not in names:
+      continue
+    setup, sizes = BENCHMARKS[name]
+    results[name] = {}
+    for n in sizes:
+      if max_size == None or n <= max_size:
+        results[name][str(n)] = time_benchmark(setup, n, repeats)
+  return results
+
+def compare(results, baseline, threshold = THRESHOLD):
+  '''
+  Returns the regressions of results against baseline: each
+  benchmark and size present in both whose time grew by more than
+  threshold (a fraction), as [name, size, baseline time, time].
+  Baseline times under NOISE_FLOOR seconds are too noisy to compare.
+
+  compare: (dictof Str (dictof Str Float)) (dictof Str (dictof Str Float))
+     [Float] -> (listof (list Str Str Float Float))
+
+  Example:
+     compare({"score": {"1": 2.0}}, {"score": {"1": 1.0}})
+        => [["score", "1", 1.0, 2.0]]
+  '''
+  regressions = []
+  for name in results:
+    for size in results[name]:
+      before = baseline.get(name, {}).get(size)
+      if before != None and before >= NOISE_FLOOR:
+        if results[name][size] > before * (1 + threshold):
+          regressions.append([name, size, before, results[name][size]])
+  return regressions
+
+def main(arguments):
+  '''
+  Runs the benchmarks as asked for by the command line arguments,
+  prints the results as JSON and returns the exit status: 1 if any
+  benchmark regressed against the baseline, 0 otherwise.
+
+  Arguments:
+     --max-size N       skip sizes above N
+     --only A,B         run only benchmarks A and B
+     --all              also run the benchmarks in OPT_IN
+     --output FILE      also write the results to FILE
+     --baseline FILE    compare with FILE (default BASELINE_FILE, if
+                        it exists)
+     --threshold T      allowed slowdown as a fraction (default 0.25)
+     --save-baseline    write the results to the baseline file
+
+  Effects:
+     Reads/Writes to file
+     Prints to Screen
+
+  main: (listof Str) -> Nat
+  '''
+  options = {"--max-size": None, "--only": None, "--output": None,
+             "--baseline": BASELINE_FILE, "--threshold": str(THRESHOLD)}
+  save_baseline = False
+  run_all = False
+  k = 0
+  while k < len(arguments):
+    if arguments[k] == "--save-baseline":
+      save_baseline = True
+      k += 1
+    elif arguments[k] == "--all":
+      run_all = True
+      k += 1
+    else:
+      options[arguments[k]] = arguments[k + 1]
+      k += 2
+  max_size = None
+  if options["--max-size"] != None:
+    max_size = int(options["--max-size"])
+  names = None
+  if options["--only"] != None:
+    names = options["--only"].split(",")
+  elif run_all:
+    names = list(BENCHMARKS)
+  results = run_benchmarks(names, max_size)
+  report = {"python": sys.version.split()[0], "numpy": numpy.__version__,
+            "results": results}
+  print(json.dumps(report, indent = 2))
+  if options["--output"] != None:
+    file = open(options["--output"], 'w')
+    json.dump(report, file, indent = 2)
+    file.close()
+  status = 0
+  if save_baseline:
+    file = open(options["--baseline"], 'w')
+    json.dump(report, file, indent = 2)
+    file.close()
+  elif os.path.exists(options["--baseline"]):
+    file = open(options["--baseline"], 'r')
+    baseline = json.load(file)["results"]
+    file.close()
+    for name, size, before, after in compare(results, baseline,
+                                             float(options["--threshold"])):
+      print("REGRESSION {0} n={1}: {2:.6f}s -> {3:.6f}s".format(
+        name, size, before, after))
+      status = 1
+  return status
+
+
+if __name__ == "__main__":
+  sys.exit(main(sys.argv[1:]))
+
+
+'''
+##Tests compare and run_benchmarks
+
+check.expect("Test compare slower", compare({"score": {"1": 2.0}},
+                                            {"score": {"1": 1.0}}),
+             [["score", "1", 1.0, 2.0]])
+check.expect("Test compare within threshold",
+             compare({"score": {"1": 1.2}}, {"score": {"1": 1.0}}), [])
+check.expect("Test compare noise", compare({"score": {"1": 1e-4}},
+                                           {"score": {"1": 1e-5}}), [])
+check.expect("Test compare missing", compare({"score": {"10": 9.0}},
+                                             {"score": {"1": 1.0}}), [])
+R = run_benchmarks(max_size = 1, repeats = 1)
+check.expect("Test every benchmark runs", sorted(R),
+             sorted(name for name in BENCHMARKS if name not in OPT_IN))
+check.expect("Test sizes", all(list(R[name]) == ["1"] for name in R), True)
+'''
@@ -2,29 +2,46 @@ from dealing import *
 # import check
 
 
+STRAINS = ["C", "D", "H", "S", "NT"]
+NUM_LEVELS = 7
+PASS_CALL = NUM_LEVELS * len(STRAINS)
+DOUBLE_CALL = PASS_CALL + 1
+REDOUBLE_CALL = PASS_CALL + 2
+NUM_CALLS = PASS_CALL + 3
+CONTRACT_CALLS = (1 << PASS_CALL) - 1
+
+
 class Bid:
   '''
   Fields:
      value (Str)
      suit (anyof Str None)
+     code (Nat)
   Requires:
      value is one of "1", "2", "3", "4", "5", "6", "7", 
          "pass", "double", "redouble"
      suit is one of "C", "D", "H", "S", "NT" or None
      If value is non-numeric, then suit must be None
+     code is 5 * (level - 1) plus the index of suit in STRAINS for
+        a numeric bid, and PASS_CALL, DOUBLE_CALL or REDOUBLE_CALL
+        otherwise, so 0 <= code < NUM_CALLS
+     
+  There are exactly 38 Bid objects, built once and stored in BIDS
+  by code. Calling Bid(val, st) returns the existing object, so bids
+  compare and hash by identity and order by code. Bids must not be
+  mutated.
   '''
   
-  def __init__(self, bid_value, bid_suit):
+  __slots__ = ("value", "suit", "code")
+  
+  def __new__(cls, bid_value, bid_suit):
     '''
-    Initialized a valid Bridge bid.
-   
-    Effects: Mutates self
+    Returns the Bridge bid with value bid_value and suit bid_suit.
   
-    __init__: Bid Str (anyof Str None) -> None
+    __new__: Str (anyof Str None) -> Bid
     Requires: Conditions from Fields above are met.
     '''
-    self.value = bid_value
-    self.suit = bid_suit
+    return BID_LOOKUP[(bid_value, bid_suit)]
 
   def __repr__(self):
     '''
@@ -43,8 +60,23 @@ class Bid:
   
     __eq__: Bid Any -> Bool
     '''
-    return (isinstance(other, Bid) and self.value == other.value and
-            self.suit == other.suit)
+    return self is other
+  
+  def __hash__(self):
+    '''
+    Returns the hash of self, which is its code
+  
+    __hash__: Bid -> Nat
+    '''
+    return self.code
+  
+  def __reduce__(self):
+    '''
+    Pickles self as a reference to its shared instance
+  
+    __reduce__: Bid -> (list Function (list Nat))
+    '''
+    return (code_to_call, (self.code,))
   
   def __lt__(self, other):
     '''
@@ -54,18 +86,263 @@ class Bid:
     __lt__: Bid Any -> Bool
     '''
     ## ♣, ♦, ♥, ♠ and lastly, "no trump" 
-    if (isinstance(other, Bid) and self.value.isdigit() and
-            other.value.isdigit()):
-      if self == other:
-        return False
-      else:
-        ranking = {"C": 1, "D": 2, "H": 3, "S": 4, "NT": 5}
-        if self.value == other.value:
-          return ranking[self.suit] < ranking[other.suit]
-        else:
-          return self.value < other.value
-    return False
+    return (isinstance(other, Bid) and other.code < PASS_CALL and
+            self.code < other.code)
+
+
+def _build_bids():
+  '''
+  Returns the 38 Bid objects ordered by code
+  
+  _build_bids: None -> (listof Bid)
+  '''
+  bids = []
+  calls = [[str(level), strain] for level in range(1, NUM_LEVELS + 1)
+           for strain in STRAINS]
+  calls += [["pass", None], ["double", None], ["redouble", None]]
+  for code in range(NUM_CALLS):
+    bid = object.__new__(Bid)
+    bid.value = calls[code][0]
+    bid.suit = calls[code][1]
+    bid.code = code
+    bids.append(bid)
+  return bids
+
+BIDS = tuple(_build_bids())
+BID_LOOKUP = {(bid.value, bid.suit): bid for bid in BIDS}
+  
+
+class Auction:
+  '''
+  An auction kept up to date call by call, so that every question
+  about it is answered without looking back over bids.
+  
+  Fields:
+     dealer (Str)
+     bids (listof Bid)
+     last_bid (anyof Bid None)
+     last_bidder (anyof Nat None)
+     doubling (Nat)
+     passes (Nat)
+     first_bidders (dictof (list Nat Str) Nat)
+  Requires:
+     dealer is one of SEATS and makes the first call
+     bids are the calls made so far, each legal when it was made
+     last_bid is the last contract bid and last_bidder the index in
+        SEATS of who made it, both None before any contract bid
+     doubling is 0, 1 or 2 when last_bid is undoubled, doubled or
+        redoubled
+     passes is the number of passes since the last other call
+     first_bidders maps each (side, strain) to the index in SEATS
+        of the first player of that side (0 for North-South, 1 for
+        East-West) to bid the strain
+  '''
   
+  def __init__(self, dealer = "North"):
+    '''
+    Initialize an Auction with no calls, with dealer to call first.
+   
+    Effects: Mutates self
+  
+    __init__: Auction [Str] -> None
+    Requires: dealer is one of SEATS
+    '''
+    self.dealer = dealer
+    self.bids = []
+    self.last_bid = None
+    self.last_bidder = None
+    self.doubling = 0
+    self.passes = 0
+    self.first_bidders = {}
+    
+  @classmethod
+  def from_bids(cls, dealer, bids):
+    '''
+    Returns the Auction with dealer to call first and bids made
+  
+    from_bids: Str (listof Bid) -> Auction
+    Requires: 
+       For all k from 0 to len(bids) - 1,
+         valid_bid(bids[:k], bids[k]) => True
+    '''
+    auction = cls(dealer)
+    for bid in bids:
+      auction.call(bid)
+    return auction
+    
+  def __repr__(self):
+    '''
+    Returns a representation of an Auction object
+  
+    __repr__: Auction -> Str
+    '''
+    return "Auction: Dealer {0.dealer} Bids {0.bids}".format(self)
+  
+  def __len__(self):
+    '''
+    Returns the number of calls made in self
+  
+    __len__: Auction -> Nat
+    '''
+    return len(self.bids)
+  
+  def next_bidder(self):
+    '''
+    Returns the name of the player to make the next call in self
+  
+    next_bidder: Auction -> Str
+    '''
+    return SEATS[(SEATS.index(self.dealer) + len(self.bids)) % NUM_HANDS]
+  
+  def is_complete(self):
+    '''
+    Returns True if self is over (three passes after a bid, or four
+    passes) and False otherwise
+  
+    is_complete: Auction -> Bool
+    '''
+    return self.passes >= 3 and len(self.bids) >= 4
+  
+  def legal_calls(self):
+    '''
+    Returns the calls that may be made next in self as a mask with
+    bit call_code(bid) set for every legal bid.
+  
+    legal_calls: Auction -> Nat
+  
+    Examples:
+       Auction().legal_calls() => CONTRACT_CALLS | (1 << PASS_CALL)
+       Auction.from_bids("North", [Bid("7", "NT")]).legal_calls()
+          => (1 << PASS_CALL) | (1 << DOUBLE_CALL)
+    '''
+    if self.is_complete():
+      return 0
+    legal = 1 << PASS_CALL
+    if self.last_bid == None:
+      return legal | CONTRACT_CALLS
+    legal |= CONTRACT_CALLS & ~((2 << self.last_bid.code) - 1)
+    if self.passes % 2 == 0:
+      if self.doubling == 0:
+        legal |= 1 << DOUBLE_CALL
+      elif self.doubling == 1:
+        legal |= 1 << REDOUBLE_CALL
+    return legal
+  
+  def is_legal(self, bid):
+    '''
+    Returns True if bid may be made next in self and False otherwise.
+    Agrees with valid_bid(self.bids, bid).
+  
+    is_legal: Auction Bid -> Bool
+    '''
+    return self.legal_calls() >> bid.code & 1 == 1
+  
+  def call(self, bid):
+    '''
+    Returns True if bid is legal and makes it in self. False
+    otherwise with no mutation.
+  
+    Effects: Mutates self
+  
+    call: Auction Bid -> Bool
+    '''
+    if not self.is_legal(bid):
+      return False
+    seat = (SEATS.index(self.dealer) + len(self.bids)) % NUM_HANDS
+    self.bids.append(bid)
+    if bid.code == PASS_CALL:
+      self.passes += 1
+      return True
+    self.passes = 0
+    if bid.code == DOUBLE_CALL:
+      self.doubling = 1
+    elif bid.code == REDOUBLE_CALL:
+      self.doubling = 2
+    else:
+      self.last_bid = bid
+      self.last_bidder = seat
+      self.doubling = 0
+      if (seat % 2, bid.suit) not in self.first_bidders:
+        self.first_bidders[(seat % 2, bid.suit)] = seat
+    return True
+  
+  def contract(self):
+    '''
+    Returns the contract of self as contract(self.bids) does
+  
+    contract: Auction -> (list Bid (anyof Bid None))
+    Requires: self.is_complete() => True
+    '''
+    if self.last_bid == None:
+      return [Bid("pass", None), None]
+    if self.doubling == 1:
+      return [self.last_bid, Bid("double", None)]
+    if self.doubling == 2:
+      return [self.last_bid, Bid("redouble", None)]
+    return [self.last_bid, None]
+  
+  def declarer(self):
+    '''
+    Returns the declarer of self as declarer(self.dealer, self.bids)
+    does: the first player of the side that made the last contract
+    bid to bid its strain. Returns None if there is no contract bid.
+  
+    declarer: Auction -> (anyof Str None)
+    Requires: self.is_complete() => True
+    '''
+    if self.last_bid == None:
+      return None
+    return SEATS[self.first_bidders[(self.last_bidder % 2,
+                                     self.last_bid.suit)]]
+  
+  
+##END OF CLASSES
+
+
+def call_code(bid):
+  '''
+  Returns the number of bid among all 38 calls: 5 * (level - 1) plus
+  the index of the strain in STRAINS for a contract bid, then
+  PASS_CALL, DOUBLE_CALL and REDOUBLE_CALL.
+  
+  call_code: Bid -> Nat
+  
+  Examples:
+     call_code(Bid("1", "C")) => 0
+     call_code(Bid("2", "NT")) => 9
+     call_code(Bid("pass", None)) => 35
+  '''
+  return bid.code
+
+def code_to_call(code):
+  '''
+  Returns the Bid numbered code by call_code
+  
+  code_to_call: Nat -> Bid
+  Requires: 0 <= code < NUM_CALLS
+  '''
+  return BIDS[code]
+
+def encode_calls(bids):
+  '''
+  Returns bids stored as bytes, one call_code per call
+  
+  encode_calls: (listof Bid) -> Bytes
+  
+  Example:
+     encode_calls([Bid("1", "C"), Bid("pass", None)]) => bytes([0, 35])
+  '''
+  return bytes([bid.code for bid in bids])
+
+def decode_calls(data):
+  '''
+  Returns the list of Bids stored in data by encode_calls. data may
+  also be a uint8 NumPy array or any sequence of codes.
+  
+  decode_calls: (anyof Bytes ndarray (listof Nat)) -> (listof Bid)
+  Requires: every element of data is below NUM_CALLS
+  '''
+  return [BIDS[code] for code in bytes(data)]
   
 def valid_bid(bids, new_bid):
   '''
@@ -285,10 +562,10 @@ def bidding_bootstrap(deck = []):
   invalid_bid_response = "Invalid bid."
   bid_prompt = "Please enter a valid bid for {0}: "
   odd_bids = ['pass', 'double', 'redouble']   
-  bids = []
   num_players = len(players)
   starting_player = num_players - 1
-  while not bidding_complete(bids):
+  auction = Auction(players[starting_player].name)
+  while not auction.is_complete():
     print("{0}'s hand: ".format(players[starting_player].name))
     display_hand(players[starting_player].hand)
     bid = input(bid_prompt.format(players[starting_player].name))
@@ -319,12 +596,11 @@ def bidding_bootstrap(deck = []):
       num = bid[0]
       suit = bid[1:]      
       bid = Bid(num, suit)
-    if not valid_bid(bids, bid):
+    if not auction.call(bid):
       print(invalid_bid_response)
     else:
-      bids.append(bid)
       starting_player = (starting_player + 1) % num_players
-  return [players, bids]
+  return [players, auction.bids]
     
 
 '''
@@ -430,4 +706,53 @@ check.expect("Example bid three pass",
 check.expect("Example incomplete", 
              bidding_complete([Bid("1", "C"), Bid("3", "NT"), 
                         Bid("pass", None), Bid("pass", None)]), False)
-'''
\ No newline at end of file
+
+## Tests Auction agrees with valid_bid, bidding_complete, contract 
+## and declarer on random auctions
+
+import random as py_random
+py_random.seed(3)
+agree = True
+for test in range(300):
+  dealer = py_random.choice(SEATS)
+  A = Auction(dealer)
+  bids = []
+  while not bidding_complete(bids):
+    legal = [code_to_call(code) for code in range(NUM_CALLS)
+             if valid_bid(bids, code_to_call(code))]
+    mask = sum(1 << call_code(bid) for bid in legal)
+    if A.legal_calls() != mask or A.is_complete():
+      agree = False
+    weights = [1 if bid.value.isdigit() else 12 for bid in legal]
+    bid = py_random.choices(legal, weights)[0]
+    bids.append(bid)
+    A.call(bid)
+  if not A.is_complete() or A.contract() != contract(bids) or \
+     A.declarer() != declarer(dealer, bids):
+    agree = False
+check.expect("Test Auction agrees", agree, True)
+
+A = Auction.from_bids("North", [Bid("7", "NT")])
+check.expect("Test legal after 7NT", A.legal_calls(),
+             (1 << PASS_CALL) | (1 << DOUBLE_CALL))
+check.expect("Test illegal call", A.call(Bid("7", "S")), False)
+check.expect("Test next bidder", A.next_bidder(), "East")
+check.expect("Test call_code", [call_code(Bid("2", "NT")),
+                                call_code(Bid("redouble", None))], [9, 37])
+check.expect("Test code_to_call", code_to_call(9), Bid("2", "NT"))
+
+check.expect("Test Bid interned", Bid("3", "NT") is code_to_call(14), True)
+check.expect("Test Bid order", [Bid("1", "NT") < Bid("2", "C"),
+                                Bid("2", "C") < Bid("1", "NT"),
+                                Bid("1", "C") < Bid("pass", None)],
+             [True, False, False])
+check.expect("Test sorted bids", sorted([Bid("3", "C"), Bid("2", "S"),
+                                         Bid("2", "D")]),
+             [Bid("2", "D"), Bid("2", "S"), Bid("3", "C")])
+check.expect("Test encode_calls", decode_calls(encode_calls(
+  [Bid("1", "C"), Bid("double", None), Bid("7", "NT")])),
+  [Bid("1", "C"), Bid("double", None), Bid("7", "NT")])
+check.expect("Test decode_calls array", decode_calls(
+  numpy.array([35, 36], dtype = numpy.uint8)),
+  [Bid("pass", None), Bid("double", None)])
+'''
@@ -0,0 +1,238 @@
+from evaluation import *
+# import check
+
+
+FILTER_BATCH = 1 << 15
+SHAPE_CLASSES = {"balanced": [4333, 4432, 5332],
+                 "semi-balanced": [4333, 4432, 5332, 5422, 6322]}
+
+
+class HandConstraint:
+  '''
+  Fields:
+     hcp (list Nat Nat)
+     lengths (dictof Str (list Nat Nat))
+     shapes (anyof (listof Str) None)
+     cards (listof Card)
+  Requires:
+     hcp is an inclusive range of high card points (A=4 K=3 Q=2 J=1)
+     the keys of lengths are among "C", "D", "H", "S" and each value
+        is an inclusive range of the number of cards in that suit
+     each element of shapes is a key of SHAPE_CLASSES or a hand
+        pattern of suit lengths from longest to shortest, e.g. "5431"
+     cards are the cards the hand must hold
+  '''
+
+  def __init__(self, hcp = [0, 37], lengths = {}, shapes = None, cards = []):
+    '''
+    Initialize a HandConstraint accepting hands with hcp high card
+    points, suit lengths in lengths, one of the shapes in shapes
+    (any shape if None) and holding all of cards.
+
+    Effects: Mutates self
+
+    __init__: HandConstraint [(list Nat Nat)] [(dictof Str (list Nat Nat))]
+       [(anyof (listof Str) None)] [(listof Card)] -> None
+    Requires: Conditions from Fields above are met.
+    '''
+    self.hcp = hcp
+    self.lengths = lengths
+    self.shapes = shapes
+    self.cards = cards
+
+  def __repr__(self):
+    '''
+    Returns a representation of a HandConstraint object
+
+    __repr__: HandConstraint -> Str
+    '''
+    return ("HandConstraint: HCP {0.hcp} Lengths {0.lengths} " +
+            "Shapes {0.shapes} Cards {0.cards}").format(self)
+
+  def accepts(self, points, lengths, patterns, masks):
+    '''
+    Returns a boolean array telling which of a batch of hands meet
+    self, given their high card points, (n, 4) suit lengths, shape
+    patterns and 52-bit masks (see hand_metrics). The masks may be
+    None when self.cards is empty.
+
+    accepts: HandConstraint ndarray ndarray ndarray (anyof ndarray None) 
+       -> ndarray
+    '''
+    ok = (points >= self.hcp[0]) & (points <= self.hcp[1])
+    for suit in self.lengths:
+      low, high = self.lengths[suit]
+      suit_length = lengths[:, CARD_SUITS.index(suit)]
+      ok &= (suit_length >= low) & (suit_length <= high)
+    if self.shapes != None:
+      allowed = []
+      for shape in self.shapes:
+        if shape in SHAPE_CLASSES:
+          allowed.extend(SHAPE_CLASSES[shape])
+        else:
+          allowed.append(int(shape))
+      ok &= numpy.isin(patterns, allowed)
+    if self.cards != []:
+      need = numpy.uint64(hand_to_mask(self.cards))
+      ok &= (masks & need) == need
+    return ok
+
+
+##END OF CLASSES
+
+
+def hand_metrics(hands, masks = True):
+  '''
+  Returns the high card points, suit lengths, shape patterns and
+  52-bit masks of every hand in a batch of deals. For an (n, 4, 13)
+  array of card codes these are (n, 4), (n, 4, 4), (n, 4) and (n, 4)
+  arrays, with suit lengths in the order of CARD_SUITS and the shape
+  pattern written as a number, e.g. 5332 for a 5-3-3-2 hand.
+  The masks are None when masks is False. The metrics come from
+  evaluate_masks.
+
+  hand_metrics: ndarray [Bool] 
+     -> (list ndarray ndarray ndarray (anyof ndarray None))
+  Requires: hands holds card codes from 0 to 51
+  '''
+  all_masks = hands_to_masks(hands)
+  metrics = evaluate_masks(all_masks)
+  if masks:
+    return [metrics["hcp"], metrics["lengths"], metrics["shape"], all_masks]
+  return [metrics["hcp"], metrics["lengths"], metrics["shape"], None]
+
+def deal_filter(constraints, hands):
+  '''
+  Returns a boolean array telling which of a batch of deals meet
+  every seat constraint in constraints
+
+  deal_filter: (dictof Str HandConstraint) ndarray -> ndarray
+  Requires:
+     the keys of constraints are among SEATS
+     hands is an (n, 4, 13) array of card codes with hands in the
+        order of SEATS
+  '''
+  need_masks = any(constraints[seat].cards != [] for seat in constraints)
+  points, lengths, patterns, masks = hand_metrics(hands, need_masks)
+  ok = numpy.ones(len(hands), dtype = bool)
+  for seat in constraints:
+    k = SEATS.index(seat)
+    seat_masks = None
+    if need_masks:
+      seat_masks = masks[:, k]
+    ok &= constraints[seat].accepts(points[:, k], lengths[:, k],
+                                    patterns[:, k], seat_masks)
+  return ok
+
+def partial_deals(rng, size, fixed = {}):
+  '''
+  Returns size random deals as an (size, 4, 13) array of card codes
+  in which each seat of fixed holds its given cards and only the
+  remaining cards are shuffled into the remaining places. Hands are
+  in the order of SEATS; fixed cards come first in their hands.
+
+  Effects: Advances the state of rng
+
+  partial_deals: Generator Nat [(dictof Str (listof Card))] -> ndarray
+  Requires:
+     the keys of fixed are among SEATS
+     no card appears twice in fixed and no seat has more than 13
+  '''
+  if fixed == {}:
+    return numpy.ascontiguousarray(random_hands(rng, size))
+  template = numpy.zeros((NUM_HANDS, HAND_SIZE), dtype = numpy.uint8)
+  free = numpy.ones((NUM_HANDS, HAND_SIZE), dtype = bool)
+  known = 0
+  for seat in fixed:
+    k = SEATS.index(seat)
+    codes = [card.code for card in fixed[seat]]
+    template[k, :len(codes)] = codes
+    free[k, :len(codes)] = False
+    known |= hand_to_mask(fixed[seat])
+  unknown = numpy.array([code for code in range(NUM_CARDS)
+                         if not known >> code & 1], dtype = numpy.uint8)
+  hands = numpy.broadcast_to(template, (size, NUM_HANDS, HAND_SIZE)).copy()
+  order = rng.random((size, len(unknown))).argsort(axis = 1)
+  hands[:, free] = unknown[order]
+  return hands
+
+def constrained_deals(constraints, seed = None, fixed = {},
+                      batch = FILTER_BATCH, limit = None):
+  '''
+  Yields arrays of random deals that meet constraints, in the format
+  of partial_deals. Deals are generated batch at a time, with the
+  cards in fixed already placed, and filtered with deal_filter.
+  Stops once limit deals have been yielded, or never if limit is None.
+
+  Effects: Yields values
+
+  constrained_deals: (dictof Str HandConstraint) [(anyof Nat None)]
+     [(dictof Str (listof Card))] [Nat] [(anyof Nat None)]
+     -> (generatorof ndarray)
+  Requires:
+     the keys of constraints and fixed are among SEATS
+     constraints can be met with the cards in fixed
+
+  Example:
+     next(constrained_deals({"South": HandConstraint([15, 17],
+                                       shapes = ["balanced"])}, 7))
+        yields the deals of the first batch whose South hand is a
+        15-17 HCP balanced hand
+  '''
+  rng = random.default_rng(seed)
+  count = 0
+  while limit == None or count < limit:
+    hands = partial_deals(rng, batch, fixed)
+    accepted = hands[deal_filter(constraints, hands)]
+    if limit != None:
+      accepted = accepted[:limit - count]
+    count += len(accepted)
+    if len(accepted) > 0:
+      yield accepted
+
+def find_deals(constraints, n, seed = None, fixed = {}):
+  '''
+  Returns the first n deals of constrained_deals as one (n, 4, 13)
+  array of card codes.
+
+  find_deals: (dictof Str HandConstraint) Nat [(anyof Nat None)]
+     [(dictof Str (listof Card))] -> ndarray
+  Requires: see constrained_deals
+  '''
+  found = list(constrained_deals(constraints, seed, fixed, limit = n))
+  if found == []:
+    return numpy.zeros((0, NUM_HANDS, HAND_SIZE), dtype = numpy.uint8)
+  return numpy.concatenate(found)
+
+
+'''
+##Tests hand_metrics
+
+D = numpy.array([[[0, 12, 11, 10, 1, 2, 13, 14, 15, 26, 27, 28, 39],
+                  list(range(40, 52)) + [3],
+                  list(range(16, 26)) + [29, 30, 31],
+                  list(range(4, 10)) + list(range(32, 39))]],
+                dtype = numpy.uint8)
+points, lengths, patterns, masks = hand_metrics(D)
+check.expect("Test hcp", points[0].tolist(), [22, 6, 6, 6])
+check.expect("Test lengths", lengths[0, 0].tolist(), [6, 3, 3, 1])
+check.expect("Test pattern", patterns[0, 0], 6331)
+
+##Tests constrained_deals
+
+C = {"South": HandConstraint([15, 17], shapes = ["balanced"]),
+     "North": HandConstraint(lengths = {"S": [5, 13]})}
+D = find_deals(C, 20, 7)
+points, lengths, patterns, masks = hand_metrics(D)
+check.expect("Test South HCP", ((points[:, 2] >= 15) & (points[:, 2] <= 17)).all(),
+             True)
+check.expect("Test South balanced",
+             numpy.isin(patterns[:, 2], [4333, 4432, 5332]).all(), True)
+check.expect("Test North spades", (lengths[:, 0, 3] >= 5).all(), True)
+
+F = {"North": [Card("A", "S"), Card("K", "S")]}
+D = find_deals({}, 10, 7, F)
+check.expect("Test fixed cards kept", (D[:, 0, :2] == [39, 51]).all(), True)
+check.expect("Test fixed full deck",
+             all(sorted(d.ravel().tolist()) == list(range(52)) for d in D), True)
+'''
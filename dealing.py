@@ -1,5 +1,69 @@
-from numpy import random
+import importlib
+import math
 # import check
+
+
+class _LazyModule:
+  '''
+  A stand-in for the module named name that imports it on first use
+  of one of its attributes, so that importing this file does not
+  import NumPy.
+
+  Fields:
+     name (Str)
+  '''
+
+  def __init__(self, name):
+    '''
+    Initialize a _LazyModule for the module name, not yet imported
+
+    Effects: Mutates self
+
+    __init__: _LazyModule Str -> None
+    '''
+    self.name = name
+
+  def __repr__(self):
+    '''
+    Returns a representation of a _LazyModule object
+
+    __repr__: _LazyModule -> Str
+    '''
+    return "_LazyModule: {0}".format(self.name)
+
+  def __getattr__(self, attribute):
+    '''
+    Returns attribute of the module of self, importing it first if
+    needed. The attribute is kept on self so later uses of it are
+    plain lookups.
+
+    Effects: Mutates self
+
+    __getattr__: _LazyModule Str -> Any
+    '''
+    value = getattr(importlib.import_module(self.name), attribute)
+    setattr(self, attribute, value)
+    return value
+
+
+numpy = _LazyModule("numpy")
+random = _LazyModule("numpy.random")
+
+
+CARD_VALUES = ["A", "2", "3", "4", "5", "6", "7", "8", "9", "10",
+               "J", "Q", "K"]
+CARD_SUITS = ["C", "D", "H", "S"]
+SUIT_BITS = 13
+SUIT_WORD = (1 << SUIT_BITS) - 1
+NUM_CARDS = 52
+NUM_HANDS = 4
+SEATS = ["North", "East", "South", "West"]
+HAND_SIZE = NUM_CARDS // NUM_HANDS
+DEAL_BLOCK = 1 << 12
+CARD_BITS = 6
+CARD_WORD = (1 << CARD_BITS) - 1
+NUM_DEALS = math.factorial(NUM_CARDS) // math.factorial(HAND_SIZE) ** NUM_HANDS
+DEAL_INDEX_BYTES = 12
   
   
 class Card:
@@ -7,27 +71,36 @@ class Card:
   Fields:
      value (Str)
      suit (Str)
+     code (Nat)
+     rank (Nat)
+     suit_index (Nat)
   Requires:
      value is one of "A", "2", "3", "4", "5",
         "6", "7", "8", "9", "10", "J", "Q", "K"
      suit is one of "C", "D", "H", "S"
+     code is convert_to_card's n - 1, so 0 <= code <= 51
+     rank is convert_value(value), so aces are 14
+     suit_index is the index of suit in CARD_SUITS
+     
+  There are exactly 52 Card objects, built once and stored in CARDS.
+  Calling Card(val, st) returns the existing object, so cards
+  compare and hash by identity. Cards must not be mutated.
   '''
   
-  def __init__(self, val, st):
+  __slots__ = ("value", "suit", "code", "rank", "suit_index")
+  
+  def __new__(cls, val, st):
     '''
-    Initialized a card from a standard deck of 52 cards
+    Returns the card from a standard deck of 52 cards
     with value val and suit st.
-   
-    Effects: Mutates self
   
-    __init__: Card Str Str -> None
+    __new__: Str Str -> Card
     Requires:
        value is one of "A", "2", "3", "4", "5",
         "6", "7", "8", "9", "10", "J", "Q", "K"
        suit is one of "C", "D", "H", "S"
     '''
-    self.value = val
-    self.suit = st
+    return CARD_LOOKUP[(val, st)]
     
   def __eq__(self, other):
     '''
@@ -36,8 +109,23 @@ class Card:
   
     __eq__: Card Any -> Bool
     '''
-    return (isinstance(other, Card) and self.value == other.value and
-            self.suit == other.suit)
+    return self is other
+  
+  def __hash__(self):
+    '''
+    Returns the hash of self, which is its code
+  
+    __hash__: Card -> Nat
+    '''
+    return self.code
+  
+  def __reduce__(self):
+    '''
+    Pickles self as a reference to its shared instance
+  
+    __reduce__: Card -> (list Function (list Nat))
+    '''
+    return (convert_to_card, (self.code + 1,))
   
   def __repr__(self):
     '''
@@ -55,6 +143,28 @@ class Card:
     return "{0.value} of {1}".format(self, s)
 
 
+def _build_cards():
+  '''
+  Returns the 52 Card objects ordered by code
+  
+  _build_cards: None -> (listof Card)
+  '''
+  cards = []
+  for suit_index in range(len(CARD_SUITS)):
+    for value_index in range(len(CARD_VALUES)):
+      card = object.__new__(Card)
+      card.value = CARD_VALUES[value_index]
+      card.suit = CARD_SUITS[suit_index]
+      card.code = suit_index * SUIT_BITS + value_index
+      card.rank = value_index + 1 if value_index > 0 else 14
+      card.suit_index = suit_index
+      cards.append(card)
+  return cards
+
+CARDS = tuple(_build_cards())
+CARD_LOOKUP = {(card.value, card.suit): card for card in CARDS}
+
+
 class Player:
   '''
   Fields:
@@ -89,16 +199,9 @@ class Player:
   
     __eq__: Player Any -> Bool
     '''
-    if (isinstance(other, Player) and self.name == other.name and
-        len(self.hand) == len(other.hand)):
-      for card in self.hand:
-        if card not in other.hand:
-          return False
-      for card in other.hand:
-        if card not in self.hand:
-          return False
-      return True
-    return False
+    return (isinstance(other, Player) and self.name == other.name and
+            len(self.hand) == len(other.hand) and
+            hand_to_mask(self.hand) == hand_to_mask(other.hand))
   
   
   def __repr__(self):
@@ -136,6 +239,123 @@ class Player:
       self.hand.remove(card)
       return True
     return False
+
+
+class CompactPlayer:
+  '''
+  A Player whose hand is stored as a 52-bit integer, one 13-bit
+  word per suit in the order clubs, diamonds, hearts, spades.
+  Within a word bit k is the card CARD_VALUES[k], so bit
+  13 * s + k is set when the card convert_to_card(13 * s + k + 1)
+  is held.
+  
+  Fields:
+     name (Str)
+     mask (Nat)
+  Requires:
+     name is one of "North", "East", "South", "West"
+     0 <= mask < 2 ** 52 with at most 13 bits set
+  '''
+  
+  def __init__(self, player_name, player_mask):
+    '''
+    Initialize a CompactPlayer with name player_name
+    and hand mask player_mask
+   
+    Effects: Mutates self
+  
+    __init__: Str Nat -> None
+    Requires: Conditions from Fields above are met.
+    '''
+    self.name = player_name
+    self.mask = player_mask
+    
+  @classmethod
+  def from_player(cls, player):
+    '''
+    Returns the CompactPlayer holding the same cards as player
+  
+    from_player: Player -> CompactPlayer
+    '''
+    return cls(player.name, hand_to_mask(player.hand))
+    
+  def to_player(self):
+    '''
+    Returns a Player holding the same cards as self, with the
+    hand sorted by suit then value
+  
+    to_player: CompactPlayer -> Player
+    '''
+    return Player(self.name, mask_to_hand(self.mask))
+    
+  @property
+  def hand(self):
+    '''
+    Returns the cards held by self as a list
+  
+    hand: CompactPlayer -> (listof Card)
+    '''
+    return mask_to_hand(self.mask)
+    
+  def __eq__(self, other):
+    '''
+    Returns True if self and other have equal names and hands 
+    and False otherwise
+  
+    __eq__: CompactPlayer Any -> Bool
+    '''
+    return (isinstance(other, CompactPlayer) and self.name == other.name and
+            self.mask == other.mask)
+  
+  def __len__(self):
+    '''
+    Returns the number of cards held by self
+  
+    __len__: CompactPlayer -> Nat
+    '''
+    return bin(self.mask).count("1")
+  
+  def __repr__(self):
+    '''
+    Returns a representation of a CompactPlayer object
+  
+    __repr__: CompactPlayer -> Str
+    '''
+    return "Player: {0.name} Hand: {1}".format(self, self.hand)
+    
+  def has_card(self, card):
+    '''
+    Returns True if card is in self's hand and False otherwise
+  
+    has_card: CompactPlayer Card -> Bool
+    '''
+    return self.mask & card_to_bit(card) != 0
+  
+  def is_void(self, suit):
+    '''
+    Returns True if self holds no cards of suit and False otherwise
+  
+    is_void: CompactPlayer Str -> Bool
+    Requires: suit is one of "C", "D", "H", "S"
+    '''
+    return suit_mask(self.mask, suit) == 0
+  
+  def play_card(self, card):
+    '''
+    Returns True if the card is in self's hand
+    and removes it from their hand. False otherwise
+    with no mutation.
+  
+    Effects: 
+       Mutates self.mask
+  
+    play_card: CompactPlayer Card -> Bool
+    '''
+    bit = card_to_bit(card)
+    if self.mask & bit:
+      self.mask ^= bit
+      return True
+    return False
   
   
 ##END OF CLASSES  
@@ -154,15 +374,65 @@ def convert_to_card(n):
      convert_to_card(1) => Card("A", "C")
      convert_to_card(52) => Card("K", "S")
   '''
-  numbers = ["A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K"]
-  if n <= 13:
-    return Card(numbers[n - 1], "C")
-  elif n <= 26:
-    return Card(numbers[n - 14], "D")
-  elif n <= 39:
-    return Card(numbers[n - 27], "H")
-  elif n <= 52:
-    return Card(numbers[n - 40], "S")
+  return CARDS[n - 1]
+
+
+def card_to_bit(card):
+  '''
+  Returns the single-bit mask of card in the compact hand
+  representation used by CompactPlayer
+  
+  card_to_bit: Card -> Nat
+  
+  Example:
+     card_to_bit(Card("A", "C")) => 1
+     card_to_bit(Card("K", "S")) => 2 ** 51
+  '''
+  return 1 << card.code
+
+def hand_to_mask(hand):
+  '''
+  Returns the 52-bit mask of the cards in hand
+  
+  hand_to_mask: (listof Card) -> Nat
+  
+  Example:
+     hand_to_mask([]) => 0
+     hand_to_mask([Card("A", "C"), Card("2", "D")]) => 16385
+  '''
+  mask = 0
+  for card in hand:
+    mask |= card_to_bit(card)
+  return mask
+
+def mask_to_hand(mask):
+  '''
+  Returns the cards in mask as a list sorted by suit then value
+  in the order used by convert_to_card
+  
+  mask_to_hand: Nat -> (listof Card)
+  
+  Example:
+     mask_to_hand(16385) => [Card("A", "C"), Card("2", "D")]
+  '''
+  hand = []
+  while mask:
+    low = mask & -mask
+    hand.append(CARDS[low.bit_length() - 1])
+    mask ^= low
+  return hand
+
+def suit_mask(mask, suit):
+  '''
+  Returns the 13-bit word of mask holding the cards of suit
+  
+  suit_mask: Nat Str -> Nat
+  Requires: suit is one of "C", "D", "H", "S"
+  
+  Example:
+     suit_mask(16385, "D") => 2
+  '''
+  return (mask >> (CARD_SUITS.index(suit) * SUIT_BITS)) & SUIT_WORD
   
 def deal(cards, players):
   '''
@@ -247,12 +517,257 @@ def shuffle(seed = None):
   Note that the return type should be Card 52 times but for 
   brevity we write this as (listof Card).
   
+  Uses a private RandomState rather than reseeding NumPy's global
+  generator, so it is safe to call from several threads and gives
+  the same deck for a given seed as it always has.
+  
   shuffle: [(anyof Nat None)] -> (listof Card)
   '''
-  num_cards = 52
-  L = list(range(1, num_cards + 1))
-  random.seed(seed)
-  return list(map(convert_to_card, random.permutation(L)))
+  rng = random.RandomState(seed)
+  return [CARDS[n] for n in rng.permutation(NUM_CARDS)]
+
+
+def deal_rng(seed, block):
+  '''
+  Returns the random Generator for block number block of the deal
+  stream with the given seed. This is child number block of
+  SeedSequence(seed).spawn (or seed.spawn for a SeedSequence seed),
+  built directly from its spawn key so the earlier children need not
+  be created.
+  
+  deal_rng: (anyof Nat SeedSequence) Nat -> Generator
+  '''
+  if isinstance(seed, random.SeedSequence):
+    entropy = seed.entropy
+    spawn_key = tuple(seed.spawn_key)
+  else:
+    entropy = seed
+    spawn_key = ()
+  return random.default_rng(random.SeedSequence(
+    entropy, spawn_key = spawn_key + (block,)))
+
+def random_hands(rng, size):
+  '''
+  Returns size random deals drawn from rng as a (size, 4, 13) uint8 
+  array of card codes. Each deal is a uniformly random permutation of
+  the card codes 0..51 dealt out as deal does, so hand k receives the 
+  cards in positions k, k + 4, k + 8, ... of the permutation.
+  
+  Effects: Advances the state of rng
+  
+  random_hands: Generator Nat -> ndarray
+  '''
+  ## Each card gets a random 58-bit key with its code in the low 6 bits.
+  ## Sorting the keys themselves is about twice as fast as an argsort,
+  ## and the codes come back out of the low bits. Two keys tie with
+  ## odds of about 1 in 2 ** 47 per deal.
+  keys = rng.integers(0, 1 << 64, (size, NUM_CARDS), dtype = numpy.uint64)
+  keys <<= numpy.uint64(CARD_BITS)
+  keys |= numpy.arange(NUM_CARDS, dtype = numpy.uint64)
+  keys.sort(axis = 1)
+  order = keys.astype(numpy.uint8) & numpy.uint8(CARD_WORD)
+  return order.reshape(size, HAND_SIZE, NUM_HANDS).transpose(0, 2, 1)
+
+def shard_deals(n, seed, shard = 0, num_shards = 1, masks = False):
+  '''
+  Yields the part of the deal stream for seed that belongs to shard
+  number shard out of num_shards, as pairs of the index of the first
+  deal and an array of consecutive deals in the format of 
+  generate_deals.
+  
+  The stream is cut into blocks of DEAL_BLOCK deals and block b, which 
+  always draws from deal_rng(seed, b), belongs to shard b % num_shards.
+  Deal number i is therefore the same whatever num_shards is, and the 
+  shards together cover deals 0 to n - 1 exactly once.
+  
+  Effects: Yields values
+  
+  shard_deals: Nat (anyof Nat SeedSequence) [Nat] [Nat] [Bool] 
+     -> (generatorof (list Nat ndarray))
+  Requires: 0 <= shard < num_shards
+  
+  Example:
+     with n = 10000 and DEAL_BLOCK = 4096, shard_deals(n, 7, 1, 2) 
+     yields only (4096, A) where A holds deals 4096 to 8191 
+  '''
+  num_blocks = (n + DEAL_BLOCK - 1) // DEAL_BLOCK
+  for block in range(shard, num_blocks, num_shards):
+    start = block * DEAL_BLOCK
+    hands = random_hands(deal_rng(seed, block), 
+                         min(DEAL_BLOCK, n - start))
+    if masks:
+      hands = hands_to_masks(hands)
+    yield [start, hands]
+
+def generate_deals(n, seed = None, masks = False):
+  '''
+  Returns deals 0 to n - 1 of the deal stream for seed (see
+  shard_deals) as one NumPy array.
+  
+  If masks is False the result is an (n, 4, 13) uint8 array of card
+  codes (see Card.code). Otherwise it is an (n, 4) uint64 array of
+  52-bit hand masks as used by CompactPlayer. When seed is None a
+  fresh seed is drawn from the operating system.
+  
+  generate_deals: Nat [(anyof Nat SeedSequence None)] [Bool] 
+     -> (anyof ndarray ndarray)
+  
+  Example:
+     generate_deals(2, 7).shape => (2, 4, 13)
+     generate_deals(2, 7, True).shape => (2, 4)
+  '''
+  if seed is None:
+    seed = random.SeedSequence()
+  hands = numpy.empty((n, NUM_HANDS, HAND_SIZE), dtype = numpy.uint8)
+  for start, block in shard_deals(n, seed):
+    hands[start:start + len(block)] = block
+  if masks:
+    return hands_to_masks(hands)
+  return hands
+
+def deal_at(seed, index):
+  '''
+  Returns deal number index of the deal stream for seed as a 
+  (4, 13) uint8 array, without generating the rest of the stream
+  
+  deal_at: (anyof Nat SeedSequence) Nat -> ndarray
+  '''
+  block, offset = divmod(index, DEAL_BLOCK)
+  return random_hands(deal_rng(seed, block), offset + 1)[offset]
+
+def hands_to_masks(hands):
+  '''
+  Returns the 52-bit masks of an array of hands of card codes,
+  reducing over the last axis
+  
+  hands_to_masks: ndarray -> ndarray
+  Requires: hands holds card codes from 0 to 51 with no repeats
+     along the last axis
+  '''
+  bits = numpy.left_shift(numpy.uint64(1), 
+                          numpy.arange(NUM_CARDS, dtype = numpy.uint64))
+  return numpy.bitwise_or.reduce(bits[hands], axis = -1)
+
+def hands_to_players(hands, names = ["North", "East", "South", "West"]):
+  '''
+  Returns a list of Player objects with the given names holding
+  the hands of one generated deal
+  
+  hands_to_players: ndarray (listof Str) -> (listof Player)
+  Requires: hands is one (4, 13) row of generate_deals
+  '''
+  return [Player(names[k], [CARDS[code] for code in hands[k]])
+          for k in range(len(names))]
+
+##Deals are numbered in lexicographic order of the seat (0 to 3) holding
+##each card, taken in order of card code: deal 0 gives hand 0 the 13
+##clubs, hand 1 the diamonds and so on, and deal NUM_DEALS - 1 gives
+##hand 3 the clubs. NUM_DEALS is below 2 ** 96, so an index fits in
+##DEAL_INDEX_BYTES bytes.
+
+def deal_index(hands):
+  '''
+  Returns the number of the deal where hand k holds the cards of
+  hands[k], from 0 to NUM_DEALS - 1
+  
+  deal_index: (anyof ndarray (listof (listof Nat)) (listof Player)) -> Nat
+  Requires: hands are four hands of 13 different cards, as card codes
+     (such as a (4, 13) row of generate_deals) or as Players
+  
+  Examples:
+     deal_index([range(0, 13), range(13, 26), range(26, 39), 
+                 range(39, 52)]) => 0
+     deal_index(index_deal(12345)) => 12345
+  '''
+  seats = [0] * NUM_CARDS
+  for k in range(NUM_HANDS):
+    hand = hands[k]
+    if isinstance(hand, Player):
+      hand = [card.code for card in hand.hand]
+    for code in hand:
+      seats[int(code)] = k
+  counts = [HAND_SIZE] * NUM_HANDS
+  left = NUM_CARDS
+  total = NUM_DEALS
+  index = 0
+  for seat in seats:
+    ## total * counts[k] // left deals go on with seat k holding this card
+    for k in range(seat):
+      index += total * counts[k] // left
+    total = total * counts[seat] // left
+    counts[seat] -= 1
+    left -= 1
+  return index
+
+def index_deal(index):
+  '''
+  Returns deal number index (see deal_index) as a (4, 13) uint8 array
+  of card codes, each hand in increasing order
+  
+  index_deal: Nat -> ndarray
+  Requires: 0 <= index < NUM_DEALS
+  
+  Example:
+     index_deal(NUM_DEALS - 1)[0].tolist() => [39, 40, ..., 51]
+  '''
+  hands = [[] for k in range(NUM_HANDS)]
+  counts = [HAND_SIZE] * NUM_HANDS
+  left = NUM_CARDS
+  total = NUM_DEALS
+  for code in range(NUM_CARDS):
+    for k in range(NUM_HANDS):
+      block = total * counts[k] // left
+      if index < block:
+        break
+      index -= block
+    hands[k].append(code)
+    total = block
+    counts[k] -= 1
+    left -= 1
+  return numpy.array(hands, dtype = numpy.uint8)
+
+def pack_deals(hands):
+  '''
+  Returns the deals of hands as DEAL_INDEX_BYTES big-endian bytes each,
+  holding their deal_index
+  
+  pack_deals: ndarray -> Bytes
+  Requires: hands is an (n, 4, 13) array of deals, as from
+     generate_deals
+  
+  Example:
+     len(pack_deals(generate_deals(10))) => 120
+  '''
+  return b"".join(deal_index(deal).to_bytes(DEAL_INDEX_BYTES, "big")
+                  for deal in hands)
+
+def unpack_deals(data):
+  '''
+  Returns the deals packed in data by pack_deals as an (n, 4, 13)
+  uint8 array, each hand in increasing order
+  
+  unpack_deals: Bytes -> ndarray
+  Requires: len(data) is a multiple of DEAL_INDEX_BYTES
+  '''
+  hands = [index_deal(int.from_bytes(data[k:k + DEAL_INDEX_BYTES], "big"))
+           for k in range(0, len(data), DEAL_INDEX_BYTES)]
+  if hands == []:
+    return numpy.zeros((0, NUM_HANDS, HAND_SIZE), dtype = numpy.uint8)
+  return numpy.stack(hands)
+
+def random_deal_index(rng):
+  '''
+  Returns a uniformly random deal number from 0 to NUM_DEALS - 1,
+  drawing 96-bit numbers from rng until one is in range
+  
+  Effects: Advances the state of rng
+  
+  random_deal_index: Generator -> Nat
+  '''
+  while True:
+    index = int.from_bytes(rng.bytes(DEAL_INDEX_BYTES), "big")
+    if index < NUM_DEALS:
+      return index
 
 
 def deal_bootstrap(deck = []):
@@ -313,6 +828,9 @@ def deal_bootstrap(deck = []):
 c = Card("A", "C")
 check.expect("Test AC", c.value, "A")
 check.expect("Test AC", c.suit, "C")
+check.expect("Test AC code", c.code, 0)
+check.expect("Test AC rank", c.rank, 14)
+check.expect("Test AC shared", c is convert_to_card(1), True)
 
 ##Test for __eq__ for Card
 
@@ -361,6 +879,29 @@ check.expect("Test play_card False No Mutation", p, Player("North", [Card("A", "
                                                          Card("2", "C"), 
                                                          Card("3", "C")]))
 
+##Tests hand_to_mask and mask_to_hand:
+
+check.expect("Test mask empty", hand_to_mask([]), 0)
+check.expect("Test mask AC 2D", hand_to_mask([Card("A", "C"), Card("2", "D")]),
+             16385)
+check.expect("Test mask KS", card_to_bit(Card("K", "S")), 2 ** 51)
+check.expect("Test mask round trip", mask_to_hand(16385),
+             [Card("A", "C"), Card("2", "D")])
+check.expect("Test suit_mask", suit_mask(16385, "D"), 2)
+
+
+##Tests CompactPlayer:
+
+p = CompactPlayer.from_player(Player("North", [Card("A", "C"), 
+                                               Card("2", "C")]))
+check.expect("Test compact has_card", p.has_card(Card("2", "C")), True)
+check.expect("Test compact is_void", p.is_void("S"), True)
+check.expect("Test compact play_card True", p.play_card(Card("A", "C")), True)
+check.expect("Test compact play_card False", p.play_card(Card("A", "C")), False)
+check.expect("Test compact to_player", p.to_player(), 
+             Player("North", [Card("2", "C")]))
+
+
 ##Tests deal:
 
 
@@ -391,9 +932,51 @@ check.expect("Test deal Simple Mutation", P,
                Player("West", [Card("4", "C")])])
 
 
+##Tests generate_deals
+
+D = generate_deals(5, 7)
+check.expect("Test generate_deals shape", D.shape, (5, 4, 13))
+check.expect("Test generate_deals seeded", (D == generate_deals(5, 7)).all(), 
+             True)
+check.expect("Test generate_deals full deck", 
+             sorted(D[0].ravel().tolist()), list(range(52)))
+check.expect("Test generate_deals masks", 
+             (generate_deals(5, 7, True) == hands_to_masks(D)).all(), True)
+S = numpy.concatenate([hands for shard in range(3) 
+                       for start, hands in shard_deals(10000, 7, shard, 3)])
+check.expect("Test shard_deals covers stream", 
+             sorted(d.tobytes() for d in S) == 
+             sorted(d.tobytes() for d in generate_deals(10000, 7)), True)
+check.expect("Test deal_at", (deal_at(7, 4100) == generate_deals(4101, 7)[-1]).all(), 
+             True)
+C = random.SeedSequence(7).spawn(2)
+check.expect("Test spawned seeds differ", 
+             (generate_deals(5, C[0]) == generate_deals(5, C[1])).all(), False)
+check.expect("Test hands_to_players",
+             hand_to_mask(hands_to_players(D[0])[2].hand),
+             int(hands_to_masks(D)[0, 2]))
+
+
+
 ##Test for display_hand
 
 L = [Card("A", "C"), Card("10", "C"), Card("4", "S"), Card("5", "H"), Card("K", "D")]
 check.set_print_exact("♠ 4", "♥ 5", "♦ K","♣ A 10")
 check.expect("Test example", display_hand(L), None)
+
+##Tests deal_index
+
+check.expect("Test first deal", deal_index([range(0, 13), range(13, 26), 
+                                            range(26, 39), range(39, 52)]), 0)
+check.expect("Test last deal", index_deal(NUM_DEALS - 1)[0].tolist(),
+             list(range(39, 52)))
+check.expect("Test fits", NUM_DEALS < 2 ** (8 * DEAL_INDEX_BYTES), True)
+D = generate_deals(20, 3)
+check.expect("Test round trip", (unpack_deals(pack_deals(D)) == 
+                                 numpy.sort(D, axis = 2)).all(), True)
+check.expect("Test players", deal_index(hands_to_players(D[4])),
+             deal_index(D[4]))
+R = random.default_rng(2)
+I = random_deal_index(R)
+check.expect("Test random index", deal_index(index_deal(I)), I)
 '''
\ No newline at end of file
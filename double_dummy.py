@@ -0,0 +1,862 @@
+from transposition import *
+from concurrent import futures
+# import check
+
+
+NO_TRUMP = 4
+SUIT_WORDS = [SUIT_WORD << (SUIT_BITS * s) for s in range(len(CARD_SUITS))]
+CACHE_LIMIT = 1 << 20
+TABLE_CHUNK = 4
+VALUE_SHIFT = NUM_CARDS
+RELEVANT_WORD = (1 << NUM_CARDS) - 1
+RUN_COUNT = SUIT_BITS
+RUN_OWNER = RUN_COUNT + DEPTH_BITS
+RUN_LENGTHS = RUN_OWNER + 2
+
+##Inside the solver a hand is a 52-bit mask with one 13-bit word per suit
+##as in CompactPlayer, but within a word bit k is the card of rank k + 2,
+##so that higher bits are higher cards and aces are bit 12. The cards of
+##a suit in all four hands are also kept together as a column, with the
+##word of each seat SUIT_BITS * seat bits up.
+##
+##Every node of the search returns one number: the tricks the declaring
+##side takes from there, VALUE_SHIFT bits up, over the mask of the cards
+##whose ranks decided that result.
+
+_GROUPS = {}
+_SHAPES = {}
+_TOPS = {}
+_MASTERS = {}
+_CARD_SUITS = [card // SUIT_BITS for card in range(NUM_CARDS)]
+_CARDS_BELOW = [SUIT_WORDS[card // SUIT_BITS] & ((2 << card) - 1)
+                for card in range(NUM_CARDS)]
+_COLUMN_BITS = [[1 << (SUIT_BITS * seat + card % SUIT_BITS)
+                 for card in range(NUM_CARDS)] for seat in range(NUM_HANDS)]
+
+
+def to_rank_order(mask):
+  '''
+  Returns the solver mask of the hand mask, moving each ace from
+  the bottom to the top of its suit word
+
+  to_rank_order: Nat -> Nat
+
+  Example:
+     to_rank_order(1) => 4096
+     to_rank_order(2) => 1
+  '''
+  out = 0
+  for s in range(len(CARD_SUITS)):
+    word = (mask >> (SUIT_BITS * s)) & SUIT_WORD
+    word = (word >> 1) | ((word & 1) << (SUIT_BITS - 1))
+    out |= word << (SUIT_BITS * s)
+  return out
+
+def suit_groups(hand_word, all_word):
+  '''
+  Returns the groups of equivalent cards of hand_word, lowest first,
+  as pairs of the bits of the top and bottom card of each group.
+  Cards are equivalent when no other card of all_word lies between
+  them, so playing any one of them has the same effect.
+
+  suit_groups: Nat Nat -> (listof (list Nat Nat))
+  Requires: hand_word is a subset of all_word, both 13-bit suit words
+     in rank order
+
+  Example:
+     suit_groups(0b1011, 0b1111) => [[1, 0], [3, 3]]
+  '''
+  key = all_word << SUIT_BITS | hand_word
+  groups = _GROUPS.get(key)
+  if groups == None:
+    groups = []
+    bottom = -1
+    for bit in range(SUIT_BITS):
+      if hand_word >> bit & 1:
+        if bottom < 0:
+          bottom = bit
+        higher = all_word >> (bit + 1)
+        if higher == 0 or not hand_word >> ((higher & -higher).bit_length() +
+                                            bit) & 1:
+          groups.append([bit, bottom])
+          bottom = -1
+    if len(_GROUPS) >= CACHE_LIMIT:
+      _GROUPS.clear()
+    _GROUPS[key] = groups
+  return groups
+
+def suit_shape(column):
+  '''
+  Returns the owners of the cards of the suit column from the highest
+  down, packed two bits per card with the highest card in the lowest
+  bits, and the run of top cards held by the owner of the highest
+  card: the mask of those cards, plus their number RUN_COUNT bits up,
+  the owner RUN_OWNER bits up and the lengths of the four hands,
+  DEPTH_BITS each, RUN_LENGTHS bits up (0 for an empty suit)
+
+  suit_shape: Nat -> (list Nat Nat)
+  Requires: column holds the disjoint 13-bit words of one suit of
+     the four hands, SUIT_BITS apart
+
+  Example:
+     suit_shape(0b100 | 0b001 << 13 | 0b010 << 26)[0] => 0b011000
+  '''
+  shape = _SHAPES.get(column)
+  if shape == None:
+    words = [(column >> (SUIT_BITS * seat)) & SUIT_WORD
+             for seat in range(NUM_HANDS)]
+    rest = words[0] | words[1] | words[2] | words[3]
+    owners = 0
+    count = 0
+    holder = -1
+    run = 0
+    cards = 0
+    while rest:
+      top = 1 << (rest.bit_length() - 1)
+      rest ^= top
+      seat = 0
+      while not words[seat] & top:
+        seat += 1
+      if holder < 0:
+        holder = seat
+      if seat == holder and run == count:
+        run += 1
+        cards |= top
+      owners |= seat << (2 * count)
+      count += 1
+    lengths = 0
+    for seat in range(NUM_HANDS):
+      lengths |= bin(words[seat]).count("1") << (DEPTH_BITS * seat)
+    if count:
+      run = (cards | run << RUN_COUNT | holder << RUN_OWNER |
+             lengths << RUN_LENGTHS)
+    shape = [owners, run]
+    if len(_SHAPES) >= CACHE_LIMIT:
+      _SHAPES.clear()
+    _SHAPES[column] = shape
+  return shape
+
+def top_cards(word, depth):
+  '''
+  Returns the mask of the highest depth cards of the suit word word
+
+  top_cards: Nat Nat -> Nat
+  Requires: depth is at most the number of cards in word
+
+  Example:
+     top_cards(0b10110, 2) => 0b10100
+  '''
+  key = word << DEPTH_BITS | depth
+  cards = _TOPS.get(key)
+  if cards == None:
+    cards = 0
+    for k in range(depth):
+      top = 1 << (word.bit_length() - 1)
+      cards |= top
+      word ^= top
+    if len(_TOPS) >= CACHE_LIMIT:
+      _TOPS.clear()
+    _TOPS[key] = cards
+  return cards
+
+def trump_masters(column):
+  '''
+  Returns the master trumps of the trump column: the top trumps held
+  by one side down to the highest trump of the other side, as the
+  mask of those cards and that highest opposing trump, plus the most
+  of them in one hand RUN_COUNT bits up and the side (0 for North
+  and South, 1 for East and West) RUN_OWNER bits up (0 for an empty
+  suit). Each of them in one hand takes a trick, whoever is on lead.
+
+  trump_masters: Nat -> Nat
+  Requires: column is as in suit_shape
+
+  Example:
+     trump_masters(0b100 | 0b001 << 13 | 0b010 << 26) => 0b111 | 1 << 13
+  '''
+  masters = _MASTERS.get(column)
+  if masters == None:
+    words = [(column >> (SUIT_BITS * seat)) & SUIT_WORD
+             for seat in range(NUM_HANDS)]
+    rest = words[0] | words[1] | words[2] | words[3]
+    counts = [0] * NUM_HANDS
+    side = -1
+    cards = 0
+    while rest:
+      top = 1 << (rest.bit_length() - 1)
+      rest ^= top
+      seat = 0
+      while not words[seat] & top:
+        seat += 1
+      cards |= top
+      if side < 0:
+        side = seat % 2
+      elif seat % 2 != side:
+        break
+      counts[seat] += 1
+    masters = 0
+    if side >= 0:
+      masters = (cards | max(counts[side], counts[side + 2]) << RUN_COUNT |
+                 side << RUN_OWNER)
+    if len(_MASTERS) >= CACHE_LIMIT:
+      _MASTERS.clear()
+    _MASTERS[column] = masters
+  return masters
+
+
+def solve_masks(masks, strain, leader, table = None):
+  '''
+  Returns the number of tricks the side not on lead takes in the
+  remaining tricks when all four hands are played double dummy
+  (everyone sees every card and plays perfectly).
+
+  The search is alpha-beta over whole tricks with null-window tests
+  on the trick count. Cards touching in rank are treated as one move,
+  and so are the cards of a suit too small to change the result of
+  one of them. Sure tricks and master trumps cut the search short,
+  and positions are stored in a table that also matches positions
+  differing only in cards too small to have changed any trick
+  (partition search). Passing the same
+  table to several solves of a deal lets later solves use the
+  positions stored by earlier ones.
+
+  Positions are keyed by a Zobrist key updated with one xor per card
+  and by the owners of every card packed into one number, and moves
+  are taken straight from cached groups of equivalent cards, so no
+  lists or dictionaries are built per node.
+
+  Effects: Mutates table
+
+  solve_masks: (listof Nat) Nat Nat [(anyof TranspositionTable None)] -> Nat
+  Requires:
+     masks are four disjoint hand masks (see CompactPlayer) of equal
+        size for North, East, South and West in that order
+     0 <= strain <= 4, indexing STRAINS
+     0 <= leader <= 3, indexing PLAYERS
+  '''
+  hands = [to_rank_order(int(mask)) for mask in masks]
+  trump = strain
+  max_side = (leader + 1) % 2
+  if table == None:
+    table = TranspositionTable()
+  columns = [0] * len(CARD_SUITS)
+  lengths = [0] * (NUM_HANDS * len(CARD_SUITS))
+  for seat in range(NUM_HANDS):
+    for s in range(len(CARD_SUITS)):
+      word = (hands[seat] >> (SUIT_BITS * s)) & SUIT_WORD
+      columns[s] |= word << (SUIT_BITS * seat)
+      lengths[4 * seat + s] = bin(word).count("1")
+  play_keys = [PLAY_KEYS[seat][s] for seat in range(NUM_HANDS)
+               for s in range(len(CARD_SUITS))]
+  trump_word = SUIT_WORDS[trump] if trump != NO_TRUMP else 0
+  groups_get = _GROUPS.get
+  shapes_get = _SHAPES.get
+  tops_get = _TOPS.get
+  masters_get = _MASTERS.get
+  card_suits = _CARD_SUITS
+  cards_below = _CARDS_BELOW
+  column_bits = _COLUMN_BITS
+
+  def play(pos, seat, card, bottom, led, win_seat, win_card, by_rank, target,
+           key, remaining, played, left):
+    '''
+    Local helper playing card, the top of the group of equivalent
+    cards down to bottom, as card number pos of the trick by seat,
+    searching the rest of the hand and taking the card back.
+    win_seat and win_card are winning the trick so far (led is its
+    suit) and by_rank tells whether win_card beat another card of its
+    suit. remaining are the cards in play at the start of the trick,
+    played those played to it already, key the Zobrist key of the
+    position without the leader and left the tricks left.
+
+    play: Nat Nat Nat Nat Int Int Int Bool Int Nat Nat Nat Nat -> Nat
+    '''
+    s = card_suits[card]
+    bit = 1 << card
+    if pos == 0:
+      led = s
+      win_seat = seat
+      win_card = card
+      by_rank = False
+    elif s == card_suits[win_card]:
+      by_rank = True
+      if card > win_card:
+        win_seat = seat
+        win_card = card
+    elif s == trump:
+      win_seat = seat
+      win_card = card
+      by_rank = False
+    i = 4 * seat + s
+    length = lengths[i]
+    lengths[i] = length - 1
+    hands[seat] ^= bit
+    columns[s] ^= column_bits[seat][card]
+    key ^= play_keys[i][length]
+    if pos == 3:
+      if win_seat % 2 == max_side:
+        result = trick_start(win_seat, target - 1, key,
+                             remaining ^ (played | bit), left - 1)
+        result += 1 << VALUE_SHIFT
+      else:
+        result = trick_start(win_seat, target, key, remaining ^ (played | bit),
+                             left - 1)
+      if by_rank:
+        result |= 1 << win_card
+    else:
+      result = follow(pos + 1, (seat + 1) % 4, led, win_seat, win_card, by_rank,
+                      target, key, remaining, played | bit, left)
+    lengths[i] = length
+    hands[seat] ^= bit
+    columns[s] ^= column_bits[seat][card]
+    if result & cards_below[card]:
+      result |= 1 << bottom
+    return result
+
+  def follow(pos, seat, led, win_seat, win_card, by_rank, target, key,
+             remaining, played, left):
+    '''
+    Local helper returning the result of the rest of the hand from
+    card number pos of the trick, played by seat, with the arguments
+    of play. Cards of the led suit are tried lowest first, except
+    that the lowest card beating the opponents goes first in the last
+    two places. Without the led suit the lowest ruff that wins goes
+    first, then the lowest card of each suit, then the rest.
+
+    A card that does not settle the target, with no card of its suit
+    at or below it among the cards that decided its result, stands
+    for every card of that suit below the lowest one that did: any
+    of them gives the same result, so they are skipped.
+
+    follow: Nat Nat Nat Nat Nat Bool Int Nat Nat Nat Nat -> Nat
+    '''
+    hand = hands[seat]
+    maximizing = seat % 2 == max_side
+    best = -1 if maximizing else HAND_SIZE + 1
+    relevant = 0
+    shift = SUIT_BITS * led
+    word = (hand >> shift) & SUIT_WORD
+    if word:
+      all_word = (remaining >> shift) & SUIT_WORD
+      groups = (groups_get(all_word << SUIT_BITS | word) or
+                suit_groups(word, all_word))
+      first = -1
+      if pos > 1 and (win_seat ^ seat) % 2 and card_suits[win_card] == led:
+        for top, bottom in groups:
+          if top + shift > win_card:
+            first = top
+            result = play(pos, seat, top + shift, bottom + shift, led,
+                          win_seat, win_card, by_rank, target, key, remaining,
+                          played, left)
+            best = result >> VALUE_SHIFT
+            if (best >= target) == maximizing:
+              return result
+            relevant = result
+            break
+      skip = 0
+      for top, bottom in groups:
+        if top == first or skip >> top & 1:
+          continue
+        result = play(pos, seat, top + shift, bottom + shift, led, win_seat,
+                      win_card, by_rank, target, key, remaining, played, left)
+        value = result >> VALUE_SHIFT
+        if maximizing:
+          if value >= target:
+            return result
+          if value > best:
+            best = value
+        else:
+          if value < target:
+            return result
+          if value < best:
+            best = value
+        relevant |= result
+        if not result & cards_below[top + shift]:
+          low = (result >> shift) & SUIT_WORD
+          skip |= ((low & -low) - 1) if low else SUIT_WORD
+      return best << VALUE_SHIFT | (relevant & RELEVANT_WORD)
+    ruff = -1
+    if hand & trump_word and (win_seat ^ seat) % 2:
+      shift = SUIT_BITS * trump
+      word = (hand >> shift) & SUIT_WORD
+      all_word = (remaining >> shift) & SUIT_WORD
+      floor = win_card if card_suits[win_card] == trump else -1
+      for top, bottom in (groups_get(all_word << SUIT_BITS | word) or
+                          suit_groups(word, all_word)):
+        if top + shift > floor:
+          ruff = top + shift
+          result = play(pos, seat, ruff, bottom + shift, led, win_seat,
+                        win_card, by_rank, target, key, remaining, played, left)
+          best = result >> VALUE_SHIFT
+          if (best >= target) == maximizing:
+            return result
+          relevant = result
+          break
+    skips = [0] * len(CARD_SUITS)
+    for lowest in (True, False):
+      for s in range(4):
+        shift = SUIT_BITS * s
+        word = (hand >> shift) & SUIT_WORD
+        if not word:
+          continue
+        all_word = (remaining >> shift) & SUIT_WORD
+        groups = (groups_get(all_word << SUIT_BITS | word) or
+                  suit_groups(word, all_word))
+        for top, bottom in (groups[:1] if lowest else groups[1:]):
+          if top + shift == ruff or skips[s] >> top & 1:
+            continue
+          result = play(pos, seat, top + shift, bottom + shift, led, win_seat,
+                        win_card, by_rank, target, key, remaining, played, left)
+          value = result >> VALUE_SHIFT
+          if maximizing:
+            if value >= target:
+              return result
+            if value > best:
+              best = value
+          else:
+            if value < target:
+              return result
+            if value < best:
+              best = value
+          relevant |= result
+          if not result & cards_below[top + shift]:
+            low = (result >> shift) & SUIT_WORD
+            skips[s] |= ((low & -low) - 1) if low else SUIT_WORD
+    return best << VALUE_SHIFT | (relevant & RELEVANT_WORD)
+
+  def trick_start(first, target, key, remaining, left):
+    '''
+    Local helper returning the result of the rest of the hand from
+    the start of a trick with first on lead, with the arguments of
+    play. The tricks in it are exact, or a bound on the side of
+    target that settles whether the declaring side takes target
+    tricks.
+
+    trick_start: Nat Int Nat Nat Nat -> Nat
+    '''
+    if target <= 0:
+      return 0
+    if target > left:
+      return left << VALUE_SHIFT
+    leading = first % 2 == max_side
+    owners0, run0 = shapes_get(columns[0]) or suit_shape(columns[0])
+    owners1, run1 = shapes_get(columns[1]) or suit_shape(columns[1])
+    owners2, run2 = shapes_get(columns[2]) or suit_shape(columns[2])
+    owners3, run3 = shapes_get(columns[3]) or suit_shape(columns[3])
+    owners = (owners0 | owners1 << OWNER_BITS | owners2 << (2 * OWNER_BITS) |
+              owners3 << (3 * OWNER_BITS))
+    table_key = key ^ LEADER_KEYS[first]
+    if leading:
+      found = table.probe(table_key, owners, target)
+    else:
+      found = table.probe(table_key, owners, left - target + 1)
+    if found != None:
+      bound = found >> BOUND_SHIFT
+      depths = found & ((1 << BOUND_SHIFT) - 1)
+      relevant = 0
+      for s in range(4):
+        depth = (depths >> (DEPTH_BITS * s)) & DEPTH_WORD
+        if depth:
+          word = (remaining >> (SUIT_BITS * s)) & SUIT_WORD
+          relevant |= (tops_get(word << DEPTH_BITS | depth) or
+                       top_cards(word, depth)) << (SUIT_BITS * s)
+      if not leading:
+        bound = left - bound
+      return bound << VALUE_SHIFT | relevant
+    ##Sure tricks: the side on lead cashes the top cards it holds in a
+    ##row, as many as the opponents follow to when they hold trumps, and
+    ##the cashes of the leader's partner when the leader has a card of
+    ##that suit to get there. When the leader's top cards are as many as
+    ##anyone else holds and cannot be ruffed, the rest of the suit cashes
+    ##too.
+    ruffers = (hands[first ^ 1] | hands[first ^ 3]) & trump_word
+    own = 0
+    own_cards = 0
+    partner = 0
+    partner_cards = 0
+    entry = False
+    follows = True
+    s = 0
+    for run in (run0, run1, run2, run3):
+      place = ((run >> RUN_OWNER) - first) % 4
+      if run and place % 2 == 0:
+        count = (run >> RUN_COUNT) & DEPTH_WORD
+        suit_lengths = run >> RUN_LENGTHS
+        if ruffers and s != trump:
+          count = min(count,
+                      (suit_lengths >> (DEPTH_BITS * (first ^ 1))) & DEPTH_WORD,
+                      (suit_lengths >> (DEPTH_BITS * (first ^ 3))) & DEPTH_WORD)
+        cards = (run & SUIT_WORD) << (SUIT_BITS * s)
+        if place == 0:
+          if ((not ruffers or s == trump) and
+              count == (run >> RUN_COUNT) & DEPTH_WORD and
+              count >= max((suit_lengths >> (DEPTH_BITS * (first ^ 1))) &
+                           DEPTH_WORD,
+                           (suit_lengths >> (DEPTH_BITS * (first ^ 2))) &
+                           DEPTH_WORD,
+                           (suit_lengths >> (DEPTH_BITS * (first ^ 3))) &
+                           DEPTH_WORD)):
+            count = (suit_lengths >> (DEPTH_BITS * first)) & DEPTH_WORD
+          own += count
+          own_cards |= cards
+          if count > (suit_lengths >> (DEPTH_BITS * (first ^ 2))) & DEPTH_WORD:
+            follows = False
+        else:
+          partner += count
+          partner_cards |= cards
+          if count and (suit_lengths >> (DEPTH_BITS * first)) & DEPTH_WORD:
+            entry = True
+      s += 1
+    if entry:
+      if follows:
+        own += partner
+        own_cards |= partner_cards
+      elif partner > own:
+        own = partner
+        own_cards = partner_cards
+    if leading:
+      if own >= target:
+        return own << VALUE_SHIFT | own_cards
+    elif left - own < target:
+      return (left - own) << VALUE_SHIFT | own_cards
+    ##The master trumps in one hand take a trick each.
+    if trump_word:
+      run = masters_get(columns[trump])
+      if run == None:
+        run = trump_masters(columns[trump])
+      if run:
+        count = (run >> RUN_COUNT) & DEPTH_WORD
+        cards = (run & SUIT_WORD) << (SUIT_BITS * trump)
+        if (run >> RUN_OWNER) == max_side:
+          if count >= target:
+            return count << VALUE_SHIFT | cards
+        elif left - count < target:
+          return (left - count) << VALUE_SHIFT | cards
+    ##Leads are tried in passes: the lead that won here last time, the
+    ##top cards the leader can cash, the lowest card of each suit, and
+    ##then the rest, skipping leads that stand for each other as in
+    ##follow.
+    position = table_key
+    lead = table.best_lead(position)
+    if lead == None:
+      lead = -1
+    hand = hands[first]
+    best = -1 if leading else HAND_SIZE + 1
+    relevant = 0
+    result = -1
+    tried = 0
+    for phase in range(4):
+      for s in range(4):
+        shift = SUIT_BITS * s
+        word = (hand >> shift) & SUIT_WORD
+        if not word or (phase == 0 and lead >> DEPTH_BITS != s):
+          continue
+        all_word = (remaining >> shift) & SUIT_WORD
+        groups = (groups_get(all_word << SUIT_BITS | word) or
+                  suit_groups(word, all_word))
+        if phase == 0:
+          higher = all_word
+          for k in range(lead & DEPTH_WORD):
+            higher ^= 1 << (higher.bit_length() - 1)
+          bit = higher.bit_length() - 1
+          leads = [group for group in groups if group[1] <= bit <= group[0]]
+        elif phase == 1:
+          if all_word >> (groups[-1][0] + 1):
+            continue
+          leads = groups[-1:]
+        elif phase == 2:
+          leads = groups[:1]
+        else:
+          leads = groups[1:]
+        for top, bottom in leads:
+          card = top + shift
+          if tried >> card & 1:
+            continue
+          tried |= 1 << card
+          outcome = play(0, first, card, bottom + shift, -1, -1, -1, False,
+                         target, key, remaining, 0, left)
+          value = outcome >> VALUE_SHIFT
+          if (value >= target) == leading:
+            result = outcome
+            break
+          if leading:
+            if value > best:
+              best = value
+          else:
+            if value < best:
+              best = value
+          relevant |= outcome
+          if not outcome & cards_below[card]:
+            low = (outcome >> shift) & SUIT_WORD
+            tried |= (((low & -low) - 1) if low else SUIT_WORD) << shift
+        if result >= 0:
+          break
+      if result >= 0:
+        break
+    if result >= 0:
+      higher = all_word >> (top + 1)
+      table.remember_lead(position, s << DEPTH_BITS | bin(higher).count("1"))
+    else:
+      result = best << VALUE_SHIFT | (relevant & RELEVANT_WORD)
+    value = result >> VALUE_SHIFT
+    if value >= target:
+      low, high = value, left
+    else:
+      low, high = 0, value
+    if not leading:
+      low, high = left - high, left - low
+    depths = 0
+    for s in range(4):
+      cards = (result >> (SUIT_BITS * s)) & SUIT_WORD
+      if cards:
+        word = (remaining >> (SUIT_BITS * s)) & SUIT_WORD
+        depth = bin(word >> ((cards & -cards).bit_length() - 1)).count("1")
+        depths |= depth << (DEPTH_BITS * s)
+    table.store(table_key, owners, low, high, depths)
+    return result
+
+  total = bin(hands[leader]).count("1")
+  remaining = hands[0] | hands[1] | hands[2] | hands[3]
+  key = position_key(masks, leader, trump) ^ LEADER_KEYS[leader]
+  points = 0
+  for seat in (max_side, max_side + 2):
+    for s in range(4):
+      word = hands[seat] >> (SUIT_BITS * s)
+      points += (4 * (word >> 12 & 1) + 3 * (word >> 11 & 1) +
+                 2 * (word >> 10 & 1) + (word >> 9 & 1))
+  guess = min(total, max(0, round(total * (0.5 + (points - 20) / 40))))
+  low, high = 0, total
+  while low < high:
+    target = min(max(guess, low + 1), high)
+    value = trick_start(leader, target, key, remaining, total) >> VALUE_SHIFT
+    if value >= target:
+      low = value
+      guess = value + 1
+    else:
+      high = value
+      guess = value
+  return low
+
+def solve(players, strain, leader, table = None):
+  '''
+  Returns the number of tricks the declaring side (the side not on
+  lead) takes when the hands of players are played out double dummy
+  with strain as trumps and leader on lead to the first trick.
+  Tricks are won as in Game.trick_winner. table is passed on to
+  solve_masks.
+
+  Effects: Mutates table
+
+  solve: (listof Player) Str Str [(anyof TranspositionTable None)] -> Nat
+  Requires:
+     players are four Players named "North", "East", "South" and
+        "West" in some order, all holding the same number of cards
+        and no card twice
+     strain is one of "C", "D", "H", "S", "NT"
+     leader is one of the player names
+
+  Examples:
+     P = [Player("North", [Card("A", "S"), Card("K", "S")]),
+          Player("East", [Card("Q", "S"), Card("2", "H")]),
+          Player("South", [Card("3", "S"), Card("4", "S")]),
+          Player("West", [Card("A", "H"), Card("5", "S")])]
+     solve(P, "NT", "West") => 1
+     solve(P, "S", "West") => 2
+  '''
+  masks = [0] * NUM_PLAYERS
+  for player in players:
+    masks[PLAYERS_DICT[player.name]] = hand_to_mask(player.hand)
+  return solve_masks(masks, STRAINS.index(strain), PLAYERS_DICT[leader],
+                     table)
+
+
+def dd_table(deal, table = None):
+  '''
+  Returns the double-dummy tricks of every declarer in every strain
+  for deal, as a list indexed by declarer in the order of PLAYERS
+  and then by strain in the order of STRAINS. The opening lead is
+  made by the player on declarer's left. All 20 solves share table,
+  or a new TranspositionTable when table is None.
+
+  Effects: Mutates table
+
+  dd_table: (anyof (listof Player) (listof Nat) ndarray)
+     [(anyof TranspositionTable None)] -> (listof (listof Nat))
+  Requires:
+     deal is four Players as in solve, or four hand masks (see
+        CompactPlayer) for North, East, South and West in that order
+
+  Example:
+     dd_table(P)[2][3] => tricks for South as declarer in spades
+  '''
+  if isinstance(deal[0], Player):
+    masks = [0] * NUM_PLAYERS
+    for player in deal:
+      masks[PLAYERS_DICT[player.name]] = hand_to_mask(player.hand)
+  else:
+    masks = [int(mask) for mask in deal]
+  if table == None:
+    table = TranspositionTable()
+  tricks = [[0] * len(STRAINS) for declarer in PLAYERS]
+  for strain in range(len(STRAINS)):
+    for declarer in range(NUM_PLAYERS):
+      tricks[declarer][strain] = solve_masks(masks, strain,
+                                             (declarer + 1) % NUM_PLAYERS,
+                                             table)
+  return tricks
+
+def _dd_block(masks):
+  '''
+  Returns the dd_table of each deal in an (n, 4) array of hand masks
+  as an (n, 4, 5) array. Runs in the worker processes of dd_tables.
+
+  _dd_block: ndarray -> ndarray
+  '''
+  tricks = numpy.zeros((len(masks), NUM_PLAYERS, len(STRAINS)),
+                       dtype = numpy.uint8)
+  for k in range(len(masks)):
+    tricks[k] = dd_table(masks[k])
+  return tricks
+
+def dd_tables(deals, workers = None, chunk = TABLE_CHUNK):
+  '''
+  Returns the dd_table of every deal in deals as an (n, 4, 5) uint8
+  array indexed by deal, declarer and strain.
+
+  Deals are split into blocks of chunk deals that are solved in a
+  pool of workers processes (one per CPU when workers is None), so
+  only the compact mask arrays cross between processes. With
+  workers equal to 1 everything runs in this process.
+
+  dd_tables: ndarray [(anyof Nat None)] [Nat] -> ndarray
+  Requires:
+     deals is an (n, 4) array of hand masks as from
+        generate_deals(n, seed, True), or an (n, 4, 13) array of card
+        codes as from generate_deals(n, seed)
+     workers > 0 when given, chunk > 0
+
+  Example:
+     dd_tables(generate_deals(36, 7, True), 4).shape => (36, 4, 5)
+  '''
+  deals = numpy.asarray(deals)
+  if deals.ndim == 3:
+    deals = hands_to_masks(deals)
+  blocks = [deals[k:k + chunk] for k in range(0, len(deals), chunk)]
+  if workers == 1 or len(blocks) <= 1:
+    results = [_dd_block(block) for block in blocks]
+  else:
+    with futures.ProcessPoolExecutor(workers) as pool:
+      results = list(pool.map(_dd_block, blocks))
+  if results == []:
+    return numpy.zeros((0, NUM_PLAYERS, len(STRAINS)), dtype = numpy.uint8)
+  return numpy.concatenate(results)
+
+
+'''
+##Tests suit_groups and to_rank_order
+
+check.expect("Test rank order ace", to_rank_order(1), 4096)
+check.expect("Test rank order two", to_rank_order(2), 1)
+check.expect("Test groups", suit_groups(0b1011, 0b1111), [[1, 0], [3, 3]])
+check.expect("Test groups gap", suit_groups(0b101, 0b101), [[2, 0]])
+
+##Examples solve
+
+P = [Player("North", [Card("A", "S"), Card("K", "S")]),
+     Player("East", [Card("Q", "S"), Card("2", "H")]),
+     Player("South", [Card("3", "S"), Card("4", "S")]),
+     Player("West", [Card("A", "H"), Card("5", "S")])]
+check.expect("Example West leads", solve(P, "NT", "West"), 1)
+check.expect("Example East leads", solve(P, "NT", "East"), 1)
+check.expect("Example spades trumps", solve(P, "S", "West"), 2)
+
+##Tests solve agrees with trick_winner: play every line out with Game
+##objects and compare the minimax result with solve.
+
+def minimax(game, hands, leader, tricks_left):
+  if tricks_left == 0:
+    return game.declarer_tricks
+  def extend(trick, seat):
+    if len(trick) == 4:
+      copy = Game(game.contract, leader, game.declarer, game.declarer_tricks,
+                  game.players, False, False)
+      winner = copy.trick_winner(trick)
+      return minimax(copy, hands, winner, tricks_left - 1)
+    name = PLAYERS[seat]
+    hand = hands[name]
+    values = []
+    for card in list(hand):
+      if trick == [] or followed_suit(hand, card, trick[0].suit):
+        hand.remove(card)
+        values.append(extend(trick + [card], (seat + 1) % 4))
+        hand.insert(0, card)
+    if name in [game.declarer, who_is_dummy(game.declarer)]:
+      return max(values)
+    return min(values)
+  return extend([], PLAYERS_DICT[leader])
+
+import random as py_random
+py_random.seed(1)
+agree = True
+for test in range(60):
+  n = py_random.choice([1, 2, 3])
+  cards = py_random.sample(CARDS, 4 * n)
+  P = [Player(PLAYERS[k], cards[k * n:(k + 1) * n]) for k in range(4)]
+  strain = py_random.choice(STRAINS)
+  leader = py_random.choice(PLAYERS)
+  declarer = PLAYERS[(PLAYERS_DICT[leader] + 3) % 4]
+  G = Game([Bid("1", strain), None], leader, declarer, 0, P, False, False)
+  hands = {p.name: list(p.hand) for p in P}
+  if minimax(G, hands, leader, n) != solve(P, strain, leader):
+    agree = False
+check.expect("Test solve agrees with trick_winner", agree, True)
+
+##Tests a shared table gives the same results across strains and leaders
+
+D = hands_to_players(generate_deals(1, 3)[0][:, :5])
+T = TranspositionTable()
+fresh = [solve(D, strain, leader) for strain in STRAINS for leader in PLAYERS]
+shared = [solve(D, strain, leader, T) for strain in STRAINS for leader in PLAYERS]
+check.expect("Test shared table", shared, fresh)
+check.expect("Test shared table hits", T.hits > 0, True)
+
+##Tests suit_shape, top_cards and trump_masters
+
+check.expect("Test shape owners", suit_shape(0b100 | 0b001 << 13 |
+                                             0b010 << 26)[0], 0b011000)
+check.expect("Test shape run", suit_shape(0b1100 | 0b0010 << 26)[1],
+             0b1100 | 2 << RUN_COUNT | 0 << RUN_OWNER |
+             (2 | 1 << (2 * DEPTH_BITS)) << RUN_LENGTHS)
+check.expect("Test shape empty", suit_shape(0), [0, 0])
+check.expect("Test top_cards", top_cards(0b10110, 2), 0b10100)
+check.expect("Test masters", trump_masters(0b100 | 0b001 << 13 | 0b010 << 26),
+             0b111 | 1 << RUN_COUNT)
+check.expect("Test masters one hand",
+             trump_masters(0b1010000000000 | 1 << 13 | 1 << (11 + 26) |
+                           1 << (9 + 39)),
+             0b1111000000000 | 2 << RUN_COUNT)
+check.expect("Test masters east-west", trump_masters(0b1 | 0b100 << 13),
+             0b101 | 1 << RUN_COUNT | 1 << RUN_OWNER)
+check.expect("Test masters empty", trump_masters(0), 0)
+
+##Tests a whole 13-card deal
+
+M = generate_deals(2, 5, True)[1]
+check.expect("Test 13-card solve", solve_masks(M, 4, 0), 7)
+
+##Tests dd_table and dd_tables
+
+H = generate_deals(3, 11)[:, :, :4]
+M = hands_to_masks(H)
+R = dd_table(M[0])
+check.expect("Test dd_table shape", [len(R), len(R[0])], [4, 5])
+check.expect("Test dd_table entry", R[1][4], solve_masks(M[0], 4, 2))
+check.expect("Test dd_table players", dd_table(hands_to_players(H[0])), R)
+check.expect("Test dd_tables workers", dd_tables(M, 2, 1).tolist(),
+             dd_tables(M, 1).tolist())
+check.expect("Test dd_tables codes", dd_tables(H, 1)[0].tolist(), R)
+F = generate_deals(3, 5, True)[2:]
+check.expect("Test full deal dd_tables", dd_tables(F, 1)[0].tolist(),
+             [[9, 9, 6, 9, 8], [4, 4, 6, 4, 5], [9, 9, 6, 9, 8],
+              [4, 4, 6, 3, 5]])
+'''
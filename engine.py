@@ -0,0 +1,204 @@
+from scoring import *
+# import check
+
+
+class Engine:
+  '''
+  A whole hand of bridge, auction then play, driven one move at a
+  time with no input or output: legal_moves lists what may be done
+  next, apply does it, and is_over and result tell when the hand is
+  finished and how it scored.
+
+  Fields:
+     players (list Player Player Player Player)
+     auction (Auction)
+     ns_vulnerable (Bool)
+     ew_vulnerable (Bool)
+     play (anyof PlayState None)
+  Requires:
+     players are named "North", "East", "South" and "West" in some
+        order and hold 13 different cards each
+     play is None until auction is complete, then the PlayState of
+        its contract
+  '''
+
+  def __init__(self, players, dealer = "North", ns_vul = False,
+               ew_vul = False):
+    '''
+    Initialize an Engine for a hand with the cards of players, dealer
+    to make the first call and the given vulnerability.
+
+    Effects: Mutates self
+
+    __init__: Engine (listof Player) [Str] [Bool] [Bool] -> None
+    Requires: Conditions from Fields above are met.
+    '''
+    self.players = players
+    self.auction = Auction(dealer)
+    self.ns_vulnerable = ns_vul
+    self.ew_vulnerable = ew_vul
+    self.play = None
+
+  def __repr__(self):
+    '''
+    Returns a representation of an Engine object
+
+    __repr__: Engine -> Str
+    '''
+    return "Engine: {0} {1}".format(self.phase(), self.auction.bids)
+
+  def phase(self):
+    '''
+    Returns "auction" while calls are being made, "play" while cards
+    are being played and "over" once the hand is finished
+
+    phase: Engine -> Str
+    '''
+    if self.play == None:
+      return "auction"
+    if self.play.is_over():
+      return "over"
+    return "play"
+
+  def to_move(self):
+    '''
+    Returns the name of the player who chooses the next move (for
+    dummy's cards, the declarer), or None if the hand is over
+
+    to_move: Engine -> (anyof Str None)
+    '''
+    if self.play == None:
+      return self.auction.next_bidder()
+    if self.play.is_over():
+      return None
+    return self.play.controller()
+
+  def legal_moves(self):
+    '''
+    Returns the moves that may be made next: Bids, in call_code
+    order, during the auction and Cards during the play
+
+    legal_moves: Engine -> (anyof (listof Bid) (listof Card))
+    '''
+    if self.play == None:
+      legal = self.auction.legal_calls()
+      return [BIDS[code] for code in range(NUM_CALLS) if legal >> code & 1]
+    return self.play.legal_moves()
+
+  def apply(self, move):
+    '''
+    Returns True if move is legal and makes it. False otherwise with
+    no mutation. The play starts, with the player on declarer's left
+    on lead, as soon as the auction is complete.
+
+    Effects: Mutates self
+
+    apply: Engine (anyof Bid Card) -> Bool
+    '''
+    if self.play != None:
+      return isinstance(move, Card) and self.play.apply(move)
+    if not isinstance(move, Bid) or not self.auction.call(move):
+      return False
+    if self.auction.is_complete():
+      declarer = self.auction.declarer()
+      leader = self.auction.dealer
+      if declarer != None:
+        leader = PLAYERS[(PLAYERS_DICT[declarer] + 1) % NUM_PLAYERS]
+      self.play = PlayState(Game(self.auction.contract(), leader, declarer,
+                                 0, self.players, self.ns_vulnerable,
+                                 self.ew_vulnerable))
+    return True
+
+  def is_over(self):
+    '''
+    Returns True if the hand is finished and False otherwise
+
+    is_over: Engine -> Bool
+    '''
+    return self.play != None and self.play.is_over()
+
+  def result(self):
+    '''
+    Returns the score of the hand for North-South (negative when
+    East-West gain), using score; 0 when passed out
+
+    result: Engine -> Int
+    Requires: self.is_over() => True
+    '''
+    game = self.play.game
+    if game.declarer == None:
+      return 0
+    points = score(game)
+    if game.declarer in ["North", "South"]:
+      return points
+    return -points
+
+
+##END OF CLASSES
+
+
+def play_out(engine, choose):
+  '''
+  Returns the result of engine after playing it to the end, with
+  choose(engine, moves) picking each move from the legal moves
+
+  Effects: Mutates engine
+
+  play_out: Engine (Engine (listof Any) -> Any) -> Int
+  Requires: choose returns an element of moves
+
+  Example:
+     play_out(Engine(P), lambda engine, moves: moves[-1]) plays the
+     hand with every player always choosing the last legal move
+  '''
+  while not engine.is_over():
+    engine.apply(choose(engine, engine.legal_moves()))
+  return engine.result()
+
+
+'''
+##Tests Engine
+
+import random as py_random
+py_random.seed(5)
+weights = lambda moves: [8 if move == Bid("pass", None) else 1
+                         for move in moves]
+def choose(engine, moves):
+  if engine.phase() == "auction":
+    return py_random.choices(moves, weights(moves))[0]
+  return py_random.choice(moves)
+
+agree = True
+for seed in range(30):
+  P = hands_to_players(generate_deals(1, seed)[0])
+  E = Engine(P, SEATS[seed % 4], seed % 2 == 0, seed % 3 == 0)
+  points = play_out(E, choose)
+  if E.play.game.declarer != None:
+    G = E.play.game
+    tricks = sum(1 for leader, trick, winner in E.play.tricks
+                 if winner in [G.declarer, who_is_dummy(G.declarer)])
+    if len(E.play.tricks) != 13 or tricks != G.declarer_tricks:
+      agree = False
+    if abs(points) != abs(score(G)):
+      agree = False
+check.expect("Test self-play", agree, True)
+
+P = hands_to_players(generate_deals(1, 1)[0])
+E = Engine(P, "East")
+check.expect("Test to_move", E.to_move(), "East")
+check.expect("Test first calls", len(E.legal_moves()), 36)
+check.expect("Test illegal double", E.apply(Bid("double", None)), False)
+for bid in [Bid("1", "NT"), Bid("pass", None), Bid("pass", None),
+            Bid("pass", None)]:
+  E.apply(bid)
+check.expect("Test play starts", [E.phase(), E.to_move()], ["play", "South"])
+lead = E.legal_moves()[0]
+E.apply(lead)
+hand = E.play.player("West").hand
+check.expect("Test follow suit", E.legal_moves(),
+             [card for card in hand if card.suit == lead.suit] or hand)
+E = Engine(P)
+for bid in [Bid("pass", None)] * 4:
+  E.apply(bid)
+check.expect("Test passed out", [E.is_over(), E.result()], [True, 0])
+'''
@@ -0,0 +1,186 @@
+from dealing import *
+# import check
+
+
+SUIT_METRICS = ["length", "hcp", "controls", "quick_tricks", "losers"]
+SHAPE_DIGITS = [1000, 100, 10, 1]
+
+_SUIT_TABLE = []
+
+##Metrics are looked up per suit in the table of suit_table, indexed by
+##the suit's 13-bit word (bit 0 the ace, bit k - 1 the card of rank k,
+##bit 12 the king), then summed over the four suits. Quick tricks are
+##kept in halves in the table: AK 2, AQ 1.5, A 1, KQ 1, K and another
+##card 0.5. The losing trick count of a suit counts the ace, king and
+##queen missing among its top min(length, 3) places. For speed the
+##metrics after the length are also packed 8 bits each into one number
+##per holding, so that one lookup and one sum over the suits total all
+##of them without carries.
+
+
+def suit_table():
+  '''
+  Returns the table of the metrics of every suit holding, built the
+  first time it is needed: a NumPy array indexed by the 13-bit word of
+  a suit and then by metric in the order of SUIT_METRICS (quick tricks
+  in halves)
+
+  Effects: Mutates _SUIT_TABLE the first time it is called
+
+  suit_table: None -> ndarray
+
+  Example:
+     suit_table()[0b1110000000001].tolist() => [4, 10, 3, 4, 0]
+  '''
+  if _SUIT_TABLE == []:
+    words = numpy.arange(1 << SUIT_BITS)
+    bits = (words[:, None] >> numpy.arange(SUIT_BITS)) & 1
+    length = bits.sum(axis = 1)
+    ace = bits[:, 0]
+    king = bits[:, 12]
+    queen = bits[:, 11]
+    jack = bits[:, 10]
+    quick = numpy.select([ace & king > 0, ace & queen > 0, ace > 0,
+                          king & queen > 0, king * (length >= 2) > 0],
+                         [4, 3, 2, 2, 1], 0)
+    losers = (numpy.minimum(length, 3) - ace - king * (length >= 2) -
+              queen * (length >= 3))
+    table = numpy.stack([length, 4 * ace + 3 * king + 2 * queen + jack,
+                         2 * ace + king, quick, losers], axis = 1)
+    table = table.astype(numpy.uint8)
+    packed = numpy.zeros(len(table), dtype = numpy.uint32)
+    for k in range(1, len(SUIT_METRICS)):
+      packed |= table[:, k].astype(numpy.uint32) << numpy.uint32(8 * (k - 1))
+    _SUIT_TABLE.extend([table, packed])
+  return _SUIT_TABLE[0]
+
+def suit_words(masks):
+  '''
+  Returns the 13-bit words of the four suits of each 52-bit mask in
+  masks, in the order of CARD_SUITS along a new last axis
+
+  suit_words: ndarray -> ndarray
+
+  Example:
+     suit_words(numpy.array(16385, dtype = numpy.uint64)).tolist()
+        => [1, 1, 0, 0]
+  '''
+  shifts = numpy.arange(0, NUM_CARDS, SUIT_BITS, dtype = numpy.uint64)
+  words = (numpy.asarray(masks, dtype = numpy.uint64)[..., None] >> shifts)
+  return (words & numpy.uint64(SUIT_WORD)).astype(numpy.uint16)
+
+def _sort_lengths(lengths):
+  '''
+  Returns the suit lengths along the last axis of lengths as four
+  arrays from longest to shortest, using a sorting network
+
+  _sort_lengths: ndarray -> (list ndarray ndarray ndarray ndarray)
+  '''
+  a, b, c, d = [lengths[..., k] for k in range(len(CARD_SUITS))]
+  a, b = numpy.maximum(a, b), numpy.minimum(a, b)
+  c, d = numpy.maximum(c, d), numpy.minimum(c, d)
+  a, c = numpy.maximum(a, c), numpy.minimum(a, c)
+  b, d = numpy.maximum(b, d), numpy.minimum(b, d)
+  b, c = numpy.maximum(b, c), numpy.minimum(b, c)
+  return [a, b, c, d]
+
+def evaluate_masks(masks):
+  '''
+  Returns the metrics of the hands with 52-bit masks masks, as a
+  dictionary of arrays shaped like masks: "hcp" (high card points,
+  A=4 K=3 Q=2 J=1), "controls" (A=2 K=1), "quick_tricks", "losers"
+  (the losing trick count), "shape" (the suit lengths from longest
+  to shortest as a number, e.g. 5431) and "lengths" (with one more
+  axis, the length of each suit in the order of CARD_SUITS)
+
+  evaluate_masks: ndarray -> (dictof Str ndarray)
+  '''
+  table = suit_table()
+  words = suit_words(masks)
+  lengths = table[:, 0][words].astype(numpy.int16)
+  totals = _SUIT_TABLE[1][words].sum(axis = -1, dtype = numpy.uint32)
+  metrics = [((totals >> numpy.uint32(8 * k)) & numpy.uint32(255)).astype(
+    numpy.int16) for k in range(len(SUIT_METRICS) - 1)]
+  shape = 0
+  for digit, length in zip(SHAPE_DIGITS, _sort_lengths(lengths)):
+    shape = shape + digit * length
+  return {"hcp": metrics[0],
+          "lengths": lengths,
+          "shape": shape,
+          "controls": metrics[1],
+          "quick_tricks": metrics[2] / 2,
+          "losers": metrics[3]}
+
+def evaluate(hands):
+  '''
+  Returns the metrics (see evaluate_masks) of hands, which is a
+  Player or CompactPlayer, a list of them, or an array of card codes
+  with each hand along the last axis (such as an (n, 4, 13) batch of
+  deals)
+
+  evaluate: (anyof Player CompactPlayer (listof (anyof Player
+     CompactPlayer)) ndarray) -> (dictof Str ndarray)
+  Requires: array hands hold card codes from 0 to 51 with no repeats
+     along the last axis
+
+  Examples:
+     evaluate(Player("North", [Card("A", "S"), Card("K", "S"),
+                               Card("2", "H")]))["hcp"] => 7
+     evaluate(generate_deals(1000))["hcp"].sum(axis = 1) => 40 for
+        each of the 1000 deals
+  '''
+  if isinstance(hands, (Player, CompactPlayer)):
+    masks = numpy.array(_player_mask(hands), dtype = numpy.uint64)
+  elif isinstance(hands, list):
+    masks = numpy.array([_player_mask(hand) for hand in hands],
+                        dtype = numpy.uint64)
+  else:
+    masks = hands_to_masks(numpy.asarray(hands))
+  return evaluate_masks(masks)
+
+def _player_mask(player):
+  '''
+  Returns the 52-bit mask of the hand of player
+
+  _player_mask: (anyof Player CompactPlayer) -> Nat
+  '''
+  if isinstance(player, CompactPlayer):
+    return player.mask
+  return hand_to_mask(player.hand)
+
+
+'''
+##Tests suit_table and evaluate
+
+check.expect("Test AKQ", suit_table()[0b1110000000001].tolist(),
+             [4, 10, 3, 4, 0])
+check.expect("Test void", suit_table()[0].tolist(), [0, 0, 0, 0, 0])
+check.expect("Test singleton K", suit_table()[1 << 12].tolist(),
+             [1, 3, 1, 0, 1])
+check.expect("Test Kx", suit_table()[(1 << 12) | 2].tolist(),
+             [2, 3, 1, 1, 1])
+check.expect("Test AQx", suit_table()[(1 << 11) | 3].tolist(),
+             [3, 6, 2, 3, 1])
+P = Player("North", [Card("A", "S"), Card("K", "S"), Card("Q", "S"),
+                     Card("J", "S"), Card("2", "S"), Card("K", "H"),
+                     Card("3", "H"), Card("A", "D"), Card("Q", "D"),
+                     Card("5", "D"), Card("4", "D"), Card("7", "C"),
+                     Card("8", "C")])
+R = evaluate(P)
+check.expect("Test player", [int(R["hcp"]), int(R["shape"]),
+                             R["lengths"].tolist(), int(R["controls"]),
+                             float(R["quick_tricks"]), int(R["losers"])],
+             [19, 5422, [2, 4, 2, 5], 6, 4.0, 4])
+check.expect("Test compact", int(evaluate([CompactPlayer.from_player(P)])
+                                 ["losers"][0]), 4)
+D = generate_deals(500, 3)
+R = evaluate(D)
+check.expect("Test deal hcp", (R["hcp"].sum(axis = 1) == 40).all(), True)
+check.expect("Test deal controls", (R["controls"].sum(axis = 1) == 12).all(),
+             True)
+check.expect("Test deal lengths", (R["lengths"].sum(axis = 2) == 13).all(),
+             True)
+check.expect("Test agrees with players",
+             evaluate(hands_to_players(D[7]))["losers"].tolist(),
+             R["losers"][7].tolist())
+'''
@@ -0,0 +1,429 @@
+from playing import *
+import re
+# import check
+
+
+PBN_SEATS = "NESW"
+PBN_SUITS = "SHDC"
+PBN_RANKS = "AKQJT98765432"
+PBN_CALLS = {"Pass": "pass", "X": "double", "XX": "redouble"}
+PBN_VULNERABLE = {"None": [False, False], "Love": [False, False],
+                  "-": [False, False], "NS": [True, False],
+                  "EW": [False, True], "All": [True, True],
+                  "Both": [True, True]}
+
+##A PBN file is a run of games separated by blank lines. Each game is a
+##list of tag pairs [Name "Value"], one per line; a tag may be followed
+##by lines of section data (the calls after [Auction], the cards after
+##[Play]). % starts a comment line and {...} is commentary. Inside a
+##tag value, \" stands for " and \\ for \.
+##
+##Reading is a pipeline of generators, each pulling from the one before:
+##   pbn_lines(file_name) -> pbn_records(lines) -> record_to_game(record)
+##so a file of any size is read one game at a time. Writing runs the
+##other way: game_to_record -> format_record -> write_pbn.
+
+
+def pbn_lines(file_name):
+  '''
+  Yields the lines of file_name without line endings, one at a time
+
+  Effects:
+     Reads from a file
+     Yields values
+
+  pbn_lines: Str -> (generatorof Str)
+  '''
+  file = open(file_name, 'r', encoding = "latin-1")
+  for line in file:
+    yield line.rstrip("\r\n")
+  file.close()
+
+def pbn_records(lines):
+  '''
+  Yields each game of lines as a dictionary from tag names to tag
+  values. The section lines following a tag are split into tokens
+  and stored as a list under the tag name followed by "Section",
+  e.g. the calls of [Auction "N"] under "AuctionSection".
+
+  Effects: Yields values
+
+  pbn_records: (iterableof Str) -> (generatorof (dictof Str Any))
+
+  Example:
+     list(pbn_records(['[Dealer "N"]', '[Result "9"]', '']))
+        => [{"Dealer": "N", "Result": "9"}]
+  '''
+  record = {}
+  section = None
+  comment = False
+  for line in lines:
+    if comment:
+      if "}" in line:
+        comment = False
+        line = line[line.index("}") + 1:]
+      else:
+        continue
+    line = line.strip()
+    if line.startswith("{"):
+      if "}" not in line:
+        comment = True
+      continue
+    if line == "" or line == "*":
+      if record != {}:
+        yield record
+        record = {}
+        section = None
+      continue
+    if line[0] == "%" or line[0] == ";":
+      continue
+    if line[0] == "[":
+      end = line.find(" ")
+      name = line[1:end]
+      value = line[end + 1:line.rindex("]")].strip()
+      record[name] = unescape_value(value[1:-1]) if value[:1] == '"' \
+                     else value
+      section = name + "Section"
+    elif section != None:
+      if "{" in line:
+        line = line[:line.index("{")]
+      record.setdefault(section, []).extend(line.split())
+  if record != {}:
+    yield record
+
+def escape_value(value):
+  '''
+  Returns value escaped to be written between the quotes of a tag
+
+  escape_value: Str -> Str
+
+  Example:
+     escape_value('a "b" \\ c') => 'a \\"b\\" \\\\ c'
+  '''
+  return value.replace("\\", "\\\\").replace('"', '\\"')
+
+def unescape_value(text):
+  '''
+  Returns the tag value written as text between the quotes of a tag
+
+  unescape_value: Str -> Str
+
+  Example:
+     unescape_value('a \\"b\\" \\\\ c') => 'a "b" \\ c'
+  '''
+  return re.sub(r"\\(.)", r"\1", text)
+
+def parse_deal(deal):
+  '''
+  Returns the four Players of the PBN deal string deal, in the order
+  of PLAYERS
+
+  parse_deal: Str -> (list Player Player Player Player)
+  Requires: deal is "<seat>:<hand> <hand> <hand> <hand>", hands
+     clockwise from seat, each "spades.hearts.diamonds.clubs"
+
+  Example:
+     parse_deal("N:A.-.-.- K.-.-.- Q.-.-.- J.-.-.-")[1]
+        => Player("East", [Card("K", "S")])
+  '''
+  first = PBN_SEATS.index(deal[0])
+  hands = deal[2:].split()
+  players = [None] * NUM_PLAYERS
+  for k in range(NUM_PLAYERS):
+    seat = (first + k) % NUM_PLAYERS
+    hand = []
+    if k < len(hands) and hands[k] != "-":
+      holdings = hands[k].split(".")
+      for s in range(len(PBN_SUITS)):
+        suit = PBN_SUITS[s]
+        for rank in holdings[s]:
+          if rank == "T":
+            hand.append(CARD_LOOKUP[("10", suit)])
+          elif rank != "-":
+            hand.append(CARD_LOOKUP[(rank, suit)])
+    players[seat] = Player(PLAYERS[seat], hand)
+  return players
+
+def format_deal(players, first = "North"):
+  '''
+  Returns the PBN deal string of players, starting with first
+
+  format_deal: (listof Player) [Str] -> Str
+  Requires: players are four Players named "North", "East", "South"
+     and "West" in some order
+
+  Example:
+     format_deal(parse_deal("N:A.-.-.- K.-.-.- Q.-.-.- J.-.-.-"))
+        => "N:A... K... Q... J..."
+  '''
+  by_name = {player.name: player for player in players}
+  hands = []
+  for k in range(NUM_PLAYERS):
+    mask = hand_to_mask(by_name[PLAYERS[(PLAYERS_DICT[first] + k) %
+                                        NUM_PLAYERS]].hand)
+    holdings = []
+    for suit in PBN_SUITS:
+      word = suit_mask(mask, suit)
+      holdings.append("".join(PBN_RANKS[rank] for rank in range(13)
+                              if word >> (13 - rank) % 13 & 1))
+    hands.append(".".join(holdings))
+  return first[0] + ":" + " ".join(hands)
+
+def parse_contract(text):
+  '''
+  Returns the contract of the PBN contract string text
+
+  parse_contract: Str -> (list Bid (anyof Bid None))
+
+  Examples:
+     parse_contract("4SX") => [Bid("4", "S"), Bid("double", None)]
+     parse_contract("Pass") => [Bid("pass", None), None]
+  '''
+  if text == "" or text.lower() == "pass":
+    return [Bid("pass", None), None]
+  doubling = None
+  if text.endswith("XX"):
+    doubling = Bid("redouble", None)
+    text = text[:-2]
+  elif text.endswith("X"):
+    doubling = Bid("double", None)
+    text = text[:-1]
+  return [Bid(text[0], text[1:]), doubling]
+
+def format_contract(contract):
+  '''
+  Returns the PBN contract string of contract
+
+  format_contract: (list Bid (anyof Bid None)) -> Str
+
+  Example:
+     format_contract([Bid("4", "S"), Bid("double", None)]) => "4SX"
+  '''
+  if contract[0].value == "pass":
+    return "Pass"
+  text = contract[0].value + contract[0].suit
+  if contract[-1] == Bid("double", None):
+    return text + "X"
+  if contract[-1] == Bid("redouble", None):
+    return text + "XX"
+  return text
+
+def parse_calls(tokens):
+  '''
+  Returns the Bids of the PBN auction tokens, skipping notes ("=1=",
+  "$4") and annotations ("!", "?"), with "AP" ending the auction
+  with three passes
+
+  parse_calls: (listof Str) -> (listof Bid)
+
+  Example:
+     parse_calls(["1NT", "Pass", "3NT", "AP"])
+        => [Bid("1", "NT"), Bid("pass", None), Bid("3", "NT"),
+            Bid("pass", None), Bid("pass", None), Bid("pass", None)]
+  '''
+  bids = []
+  for token in tokens:
+    if "=" in token:
+      token = token[:token.index("=")]
+    token = token.rstrip("!?")
+    if token in PBN_CALLS:
+      bids.append(BID_LOOKUP[(PBN_CALLS[token], None)])
+    elif token == "AP":
+      bids.extend([Bid("pass", None)] * 3)
+    elif token[:1].isdigit() and (token[0], token[1:]) in BID_LOOKUP:
+      bids.append(BID_LOOKUP[(token[0], token[1:])])
+  return bids
+
+def format_calls(bids):
+  '''
+  Returns the PBN auction tokens of bids
+
+  format_calls: (listof Bid) -> (listof Str)
+  '''
+  names = {"pass": "Pass", "double": "X", "redouble": "XX"}
+  return [names[bid.value] if bid.suit == None else bid.value + bid.suit
+          for bid in bids]
+
+def record_to_game(record):
+  '''
+  Returns the Game of the PBN record record: the hands of its Deal,
+  its Contract, Declarer, Result and Vulnerable tags, and the player
+  on declarer's left (or the dealer when passed out) on lead.
+  Missing tags give empty hands, a passed out contract, no tricks
+  and no vulnerability.
+
+  record_to_game: (dictof Str Any) -> Game
+  '''
+  if "Deal" in record:
+    players = parse_deal(record["Deal"])
+  else:
+    players = [Player(name, []) for name in PLAYERS]
+  contract = parse_contract(record.get("Contract", ""))
+  declarer = None
+  if record.get("Declarer", "")[:1] in ["N", "E", "S", "W"]:
+    declarer = PLAYERS[PBN_SEATS.index(record["Declarer"][0])]
+  tricks = 0
+  if record.get("Result", "").isdigit():
+    tricks = int(record["Result"])
+  vulnerable = PBN_VULNERABLE.get(record.get("Vulnerable", "None"),
+                                  [False, False])
+  if contract[0].value == "pass" or declarer == None:
+    leader = PLAYERS[PBN_SEATS.index(record.get("Dealer", "N")[0])]
+  else:
+    leader = PLAYERS[(PLAYERS_DICT[declarer] + 1) % NUM_PLAYERS]
+  return Game(contract, leader, declarer, tricks, players,
+              vulnerable[0], vulnerable[1])
+
+def record_to_auction(record):
+  '''
+  Returns the Auction of the [Auction] tag and section of record,
+  or None if record has no auction. Calls after an illegal call
+  are dropped.
+
+  record_to_auction: (dictof Str Any) -> (anyof Auction None)
+  '''
+  if "Auction" not in record:
+    return None
+  auction = Auction(PLAYERS[PBN_SEATS.index(record["Auction"][0])])
+  for bid in parse_calls(record.get("AuctionSection", [])):
+    if not auction.call(bid):
+      break
+  return auction
+
+def game_to_record(game, tags = {}, auction = None):
+  '''
+  Returns the PBN record of game, with tags added to it and the
+  calls of auction as its [Auction] section when given
+
+  game_to_record: Game [(dictof Str Str)] [(anyof Auction None)]
+     -> (dictof Str Any)
+  '''
+  vulnerable = "None"
+  for name in PBN_VULNERABLE:
+    if PBN_VULNERABLE[name] == [game.ns_vulnerable, game.ew_vulnerable]:
+      vulnerable = name
+      break
+  record = dict(tags)
+  record["Vulnerable"] = vulnerable
+  record["Deal"] = format_deal(game.players)
+  if game.declarer != None:
+    record["Declarer"] = game.declarer[0]
+  record["Contract"] = format_contract(game.contract)
+  record["Result"] = str(game.declarer_tricks)
+  if auction != None:
+    record["Auction"] = auction.dealer[0]
+    record["AuctionSection"] = format_calls(auction.bids)
+  return record
+
+def format_record(record):
+  '''
+  Yields the lines of the PBN record record, a tag pair per line
+  with its section lines after it, then a blank line
+
+  Effects: Yields values
+
+  format_record: (dictof Str Any) -> (generatorof Str)
+  '''
+  for name in record:
+    if name.endswith("Section"):
+      continue
+    yield '[{0} "{1}"]'.format(name, escape_value(str(record[name])))
+    tokens = record.get(name + "Section", [])
+    line = []
+    for token in tokens:
+      line.append(token)
+      if len(line) == NUM_PLAYERS:
+        yield " ".join(line)
+        line = []
+    if line != []:
+      yield " ".join(line)
+  yield ""
+
+def read_games(file_name):
+  '''
+  Yields the Game of every record of the PBN file file_name
+
+  Effects:
+     Reads from a file
+     Yields values
+
+  read_games: Str -> (generatorof Game)
+  '''
+  for record in pbn_records(pbn_lines(file_name)):
+    yield record_to_game(record)
+
+def write_pbn(records, file_name):
+  '''
+  Writes every record of records to the PBN file file_name and
+  returns how many there were
+
+  Effects: Writes to a file
+
+  write_pbn: (iterableof (dictof Str Any)) Str -> Nat
+  '''
+  count = 0
+  file = open(file_name, 'w', encoding = "latin-1")
+  file.write("% PBN 2.1\n")
+  for record in records:
+    for line in format_record(record):
+      file.write(line + "\n")
+    count += 1
+  file.close()
+  return count
+
+
+'''
+##Tests parse_deal and format_deal
+
+D = "N:AKQ.JT9.876.5432 J.AKQ2.AKQ2.AKQT 5432.8765.543.J9 T9876.43.JT9.876"
+P = parse_deal(D)
+check.expect("Test North", P[0], Player("North", [Card("A", "S"),
+  Card("K", "S"), Card("Q", "S"), Card("J", "H"), Card("10", "H"),
+  Card("9", "H"), Card("8", "D"), Card("7", "D"), Card("6", "D"),
+  Card("5", "C"), Card("4", "C"), Card("3", "C"), Card("2", "C")]))
+check.expect("Test deal round trip", format_deal(P), D)
+check.expect("Test deal from East", format_deal(parse_deal(
+  "E:" + " ".join(D[2:].split()[1:] + D[2:].split()[:1])), "East"),
+  "E:" + " ".join(D[2:].split()[1:] + D[2:].split()[:1]))
+check.expect("Test void", format_deal(parse_deal("N:A.-.-.- K.-.-.- " +
+                                                 "Q.-.-.- J.-.-.-")),
+             "N:A... K... Q... J...")
+
+##Tests contracts and calls
+
+check.expect("Test contract", parse_contract("4SX"),
+             [Bid("4", "S"), Bid("double", None)])
+check.expect("Test contract round trip", format_contract(
+  parse_contract("7NTXX")), "7NTXX")
+check.expect("Test calls", parse_calls(["1NT", "Pass", "2C=1=", "X!", "AP"]),
+             [Bid("1", "NT"), Bid("pass", None), Bid("2", "C"),
+              Bid("double", None),
+              Bid("pass", None), Bid("pass", None), Bid("pass", None)])
+
+##Tests records
+
+L = ['% comment', '[Event "Club"]', '[Dealer "E"]', '[Vulnerable "NS"]',
+     '[Deal "' + D + '"]', '[Declarer "S"]', '[Contract "3NT"]',
+     '[Result "10"]', '[Auction "E"]', 'Pass 1NT {forcing}', 'Pass',
+     '3NT AP', '', '{ a', 'long comment }', '[Event "Club"]',
+     '[Contract "Pass"]']
+R = list(pbn_records(L))
+check.expect("Test record count", len(R), 2)
+check.expect("Test auction section", R[0]["AuctionSection"],
+             ["Pass", "1NT", "Pass", "3NT", "AP"])
+G = record_to_game(R[0])
+check.expect("Test game", G, Game([Bid("3", "NT"), None], "West", "South",
+                                  10, P, True, False))
+A = record_to_auction(R[0])
+check.expect("Test auction", [A.contract(), A.declarer()],
+             [[Bid("3", "NT"), None], "South"])
+check.expect("Test passed out", record_to_game(R[1]).contract,
+             [Bid("pass", None), None])
+check.expect("Test record round trip", record_to_game(list(pbn_records(
+  format_record(game_to_record(G, {"Event": "Club"}, A))))[0]), G)
+E = {"Event": 'The "Open" \\ Pairs', "Site": '"', "Result": "9"}
+check.expect("Test escaped line", list(format_record(E))[0],
+             '[Event "The \\"Open\\" \\\\ Pairs"]')
+check.expect("Test escaped round trip", list(pbn_records(format_record(E))),
+             [E])
+'''
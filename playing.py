@@ -11,6 +11,45 @@ SUITS = ['C', 'D', 'H', 'S']
 VALUES = ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 
           'J', 'Q', 'K']
 
+##Binary saves are SAVE_SIZE bytes: the version, the call_code of the
+##contract bid, a flags byte (doubling in bits 0-1, NS and EW
+##vulnerability in bits 2 and 3, the declarer's and current player's
+##indices in PLAYERS in bits 4-5 and 6-7), a byte holding the declarer's
+##tricks plus 16 times the index of players[0], then the four hand
+##masks of North, East, South and West in MASK_BYTES little-endian
+##bytes each.
+SAVE_VERSION = 1
+MASK_BYTES = 7
+SAVE_SIZE = 4 + NUM_HANDS * MASK_BYTES
+DOUBLINGS = [None, "double", "redouble"]
+
+##Tricks are resolved on card codes through TRICK_KEYS: for a trump
+##strain (an index of STRAINS, 4 for no trumps) and the suit led, each
+##card's key is its rank (2 to 14), plus 16 if it is of the suit led,
+##plus 32 if it is a trump. The card with the highest key wins.
+TRICK_LED = 16
+TRICK_TRUMP = 32
+
+
+def _build_trick_keys():
+  '''
+  Returns the trick keys of every card, indexed by trump strain, then
+  suit led, then card code
+  
+  _build_trick_keys: None -> (listof (listof (listof Nat)))
+  '''
+  keys = []
+  for trump in range(len(STRAINS)):
+    keys.append([])
+    for led in range(len(CARD_SUITS)):
+      keys[trump].append(tuple(card.rank +
+                               TRICK_LED * (card.suit_index == led) +
+                               TRICK_TRUMP * (card.suit_index == trump)
+                               for card in CARDS))
+  return keys
+
+TRICK_KEYS = _build_trick_keys()
+
 
 class Game:
   '''
@@ -127,24 +166,10 @@ class Game:
        and G is mutated to
        Game([Bid("3", "S"), None], "North", "North", 1, P, False, False)  
     '''
-    trump = self.contract[0].suit
-    trump_played = list(filter(lambda x: x.suit == trump, trick))
-    if trump_played != []:
-      max_val = max(list(map(lambda x: convert_value(x.value), 
-                             trump_played)))
-      max_card = list(filter(lambda x: convert_value(x.value) == max_val,
-                             trump_played))[0]
-    else:
-      suit_led = trick[0].suit
-      suit_followed = list(filter(lambda x: x.suit == suit_led, trick))
-      max_val = max(list(map(lambda x: convert_value(x.value), 
-                             suit_followed)))
-      max_card = list(filter(lambda x: convert_value(x.value) == max_val,
-                             suit_followed))[0]
-      
+    trump = STRAINS.index(self.contract[0].suit)
+    winning = trick_winner_index([card.code for card in trick], trump)
     cur_player_index = PLAYERS_DICT[self.cur_player]
-    player_index = ((trick.index(max_card) + cur_player_index)
-                    % NUM_PLAYERS)
+    player_index = (winning + cur_player_index) % NUM_PLAYERS
     winner = PLAYERS[player_index]
     
     dummy_name = who_is_dummy(self.declarer)
@@ -214,6 +239,166 @@ class Game:
         for card in player.hand:
           file.write(card.value + card.suit + "\n")
       file.close()
+
+  def to_bytes(self):
+    '''
+    Returns the binary save of self, SAVE_SIZE bytes long
+    
+    to_bytes: Game -> Bytes
+    
+    Example:
+       len(G.to_bytes()) => 32
+    '''
+    doubling = 0
+    if self.contract[-1] != None:
+      doubling = DOUBLINGS.index(self.contract[-1].value)
+    flags = (doubling | self.ns_vulnerable << 2 | self.ew_vulnerable << 3 |
+             PLAYERS_DICT[self.declarer] << 4 |
+             PLAYERS_DICT[self.cur_player] << 6)
+    masks = [0] * NUM_PLAYERS
+    for player in self.players:
+      masks[PLAYERS_DICT[player.name]] = hand_to_mask(player.hand)
+    data = bytes([SAVE_VERSION, self.contract[0].code, flags,
+                  self.declarer_tricks |
+                  PLAYERS_DICT[self.players[0].name] << 4])
+    for mask in masks:
+      data += mask.to_bytes(MASK_BYTES, "little")
+    return data
+
+  def save_binary(self, file_name):
+    '''
+    Saves the Game self to file_name in the binary format of to_bytes
+    
+    Effects: Writes to a file
+    
+    save_binary: Game Str -> None
+    '''
+    file = open(file_name, 'wb')
+    file.write(self.to_bytes())
+    file.close()
+
+
+class PlayState:
+  '''
+  The play of a Game, one card at a time and without any input or
+  output. Bots, servers and the terminal driver all play through it.
+  
+  Fields:
+     game (Game)
+     trick (listof Card)
+     tricks (listof (list Str (listof Card) Str))
+  Requires:
+     game.cur_player is the player to play the next card
+     trick are the cards of the current trick, in the order played
+     tricks are the finished tricks of self, each as its leader, its
+        cards and its winner
+  '''
+  
+  def __init__(self, game, trick = []):
+    '''
+    Initialize a PlayState continuing game with the cards of trick
+    already played to the current trick.
+   
+    Effects: Mutates self
+  
+    __init__: PlayState Game [(listof Card)] -> None
+    Requires: Conditions from Fields above are met.
+    '''
+    self.game = game
+    self.trick = list(trick)
+    self.tricks = []
+    
+  def __repr__(self):
+    '''
+    Returns a representation of a PlayState object
+  
+    __repr__: PlayState -> Str
+    '''
+    return "PlayState: Trick {0.trick} To play {0.game.cur_player}".format(
+      self)
+  
+  def player(self, name):
+    '''
+    Returns the Player of self's game named name
+  
+    player: PlayState Str -> Player
+    Requires: name is one of PLAYERS
+    '''
+    for player in self.game.players:
+      if player.name == name:
+        return player
+  
+  def controller(self):
+    '''
+    Returns the name of who chooses the next card: the declarer
+    when it is dummy's turn, and the player to play otherwise
+  
+    controller: PlayState -> Str
+    '''
+    if self.game.cur_player == who_is_dummy(self.game.declarer):
+      return self.game.declarer
+    return self.game.cur_player
+  
+  def legal_moves(self):
+    '''
+    Returns the cards the player to play may play next: the cards of
+    the suit led if they hold any, and their whole hand otherwise
+  
+    legal_moves: PlayState -> (listof Card)
+    '''
+    if self.is_over():
+      return []
+    suit_lead = None
+    if self.trick != []:
+      suit_lead = self.trick[0].suit
+    return legal_moves(self.player(self.game.cur_player).hand, suit_lead)
+  
+  def apply(self, card):
+    '''
+    Returns True if card is a legal play and plays it. The trick is
+    scored with Game.trick_winner once it has four cards. False
+    otherwise with no mutation.
+    
+    Effects: Mutates self
+  
+    apply: PlayState Card -> Bool
+    '''
+    if card not in self.legal_moves():
+      return False
+    index = PLAYERS_DICT[self.game.cur_player]
+    self.player(self.game.cur_player).play_card(card)
+    self.trick.append(card)
+    if len(self.trick) < NUM_PLAYERS:
+      self.game.cur_player = PLAYERS[(index + 1) % NUM_PLAYERS]
+      return True
+    leader = PLAYERS[(index + 1) % NUM_PLAYERS]
+    self.game.cur_player = leader
+    winner = self.game.trick_winner(self.trick)
+    self.tricks.append([leader, self.trick, winner])
+    self.trick = []
+    return True
+  
+  def is_over(self):
+    '''
+    Returns True if the hand has been passed out or every card has
+    been played, and False otherwise
+  
+    is_over: PlayState -> Bool
+    '''
+    if self.game.contract[0].value == "pass":
+      return True
+    return self.trick == [] and all(len(player.hand) == 0
+                                    for player in self.game.players)
+  
+  def result(self):
+    '''
+    Returns the number of tricks declarer has taken in self
+  
+    result: PlayState -> Nat
+    '''
+    return self.game.declarer_tricks
+  
+
 ##FUNCTIONS TO COMPLETE:
 
 def load(file_name):
@@ -288,6 +473,77 @@ def load(file_name):
   file.close()
   return Game(contract, current_player, declarer, num_tricks, players, ns_vul, ew_vul)
 
+def from_bytes(data):
+  '''
+  Returns the Game saved in data by Game.to_bytes, or None if data
+  is not a save of version SAVE_VERSION
+  
+  from_bytes: Bytes -> (anyof Game None)
+  
+  Example:
+     from_bytes(G.to_bytes()) => G
+  '''
+  if len(data) < SAVE_SIZE or data[0] != SAVE_VERSION:
+    return None
+  flags = data[2]
+  contract = [code_to_call(data[1]), None]
+  if DOUBLINGS[flags & 3] != None:
+    contract[-1] = Bid(DOUBLINGS[flags & 3], None)
+  first = data[3] >> 4
+  players = []
+  for k in range(NUM_PLAYERS):
+    seat = (first + k) % NUM_PLAYERS
+    start = 4 + seat * MASK_BYTES
+    mask = int.from_bytes(data[start:start + MASK_BYTES], "little")
+    players.append(Player(PLAYERS[seat], mask_to_hand(mask)))
+  return Game(contract, PLAYERS[flags >> 6], PLAYERS[flags >> 4 & 3],
+              data[3] & 15, players, flags >> 2 & 1 == 1,
+              flags >> 3 & 1 == 1)
+
+def load_binary(file_name):
+  '''
+  Loads the Game saved by Game.save_binary in file_name, or None if
+  the file does not hold a binary save
+  
+  Effects: Reads from a file
+  
+  load_binary: Str -> (anyof Game None)
+  '''
+  file = open(file_name, 'rb')
+  data = file.read()
+  file.close()
+  return from_bytes(data)
+
+def loads_many(data):
+  '''
+  Returns the fields of a run of binary saves (as written one after
+  another by Game.to_bytes) as a dictionary of NumPy arrays with one
+  row per save:
+     "version", "contract" (call codes), "doubling" (indices in
+     DOUBLINGS), "declarer", "cur_player" and "first" (indices in
+     PLAYERS of the declarer, current player and players[0]),
+     "tricks", "ns_vulnerable", "ew_vulnerable" and "masks" (n by 4
+     uint64 hand masks of North, East, South and West)
+  
+  loads_many: (anyof Bytes ndarray) -> (dictof Str ndarray)
+  Requires: len(data) is a multiple of SAVE_SIZE
+  
+  Example:
+     loads_many(G.to_bytes() * 3)["tricks"].tolist() => [12, 12, 12]
+  '''
+  records = numpy.frombuffer(data, dtype = numpy.uint8).reshape(-1,
+                                                                SAVE_SIZE)
+  flags = records[:, 2]
+  padded = numpy.zeros((len(records), NUM_HANDS, 8), dtype = numpy.uint8)
+  padded[:, :, :MASK_BYTES] = records[:, 4:].reshape(-1, NUM_HANDS,
+                                                    MASK_BYTES)
+  return {"version": records[:, 0], "contract": records[:, 1],
+          "doubling": flags & 3, "ns_vulnerable": (flags >> 2 & 1) == 1,
+          "ew_vulnerable": (flags >> 3 & 1) == 1, "declarer": flags >> 4 & 3,
+          "cur_player": flags >> 6, "tricks": records[:, 3] & 15,
+          "first": records[:, 3] >> 4,
+          "masks": padded.view("<u8").reshape(-1, NUM_HANDS)}
+
 def followed_suit(hand, card, suit_lead):
   '''
   Returns True if card follows suit, or if the player
@@ -322,7 +578,105 @@ def followed_suit(hand, card, suit_lead):
       if card.suit == suit_lead:
         return False
     return True
-    
+
+def legal_mask(mask, suit_lead, collapse = False):
+  '''
+  Returns the mask of the cards of the hand mask that may be played
+  when suit_lead was led: its suit_lead word if not empty, and all of
+  mask otherwise. With collapse, only the highest card of each run of
+  cards touching in rank (such as Q-J) is kept, as they win and lose
+  the same tricks.
+
+  legal_mask: Nat (anyof Str None) [Bool] -> Nat
+  Requires: suit_lead is None or one of 'C', 'D', 'H', 'S'
+
+  Examples:
+     legal_mask(16385, "D") => 16384
+     legal_mask(16385, "H") => 16385
+     legal_mask(7169, None, True) => 1
+  '''
+  if suit_lead != None:
+    shift = CARD_SUITS.index(suit_lead) * SUIT_BITS
+    if (mask >> shift) & SUIT_WORD:
+      mask &= SUIT_WORD << shift
+  if collapse:
+    ## In rank order, with twos at bit 0 and aces at bit 12, the top of
+    ## a run is a bit whose next higher bit is clear.
+    collapsed = 0
+    for shift in range(0, NUM_CARDS, SUIT_BITS):
+      word = (mask >> shift) & SUIT_WORD
+      ranks = (word >> 1) | ((word & 1) << (SUIT_BITS - 1))
+      tops = ranks & ~(ranks >> 1)
+      word = ((tops << 1) & SUIT_WORD) | (tops >> (SUIT_BITS - 1))
+      collapsed |= word << shift
+    mask = collapsed
+  return mask
+
+def legal_moves(hand, suit_lead, collapse = False):
+  '''
+  Returns the cards of hand, in hand's order, that may be played
+  when suit_lead was led (any card when suit_lead is None), using
+  legal_mask. With collapse, only one card of each run of cards
+  touching in rank is returned.
+
+  legal_moves: (listof Card) (anyof Str None) [Bool] -> (listof Card)
+  Requires: suit_lead is None or one of 'C', 'D', 'H', 'S'
+
+  Examples:
+     hand = [Card("A", "D"), Card("4", "C")]
+     legal_moves(hand, "C") => [Card("4", "C")]
+     legal_moves(hand, "H") => hand
+     legal_moves([Card("J", "S"), Card("Q", "S"), Card("9", "S")], None,
+                 True) => [Card("Q", "S"), Card("9", "S")]
+  '''
+  legal = legal_mask(hand_to_mask(hand), suit_lead, collapse)
+  return [card for card in hand if legal >> card.code & 1]
+
+def trick_winner_index(trick, trump):
+  '''
+  Returns the position in trick (0 for the card led) of the card
+  that wins it with trump strain trump, using TRICK_KEYS
+  
+  trick_winner_index: (listof Nat) Nat -> Nat
+  Requires:
+     trick holds 1 to 4 different card codes, in the order played
+     0 <= trump <= 4 is an index of STRAINS
+  
+  Examples:
+     trick_winner_index([16, 13, 25, 41], 4) => 1
+     trick_winner_index([16, 13, 25, 41], 3) => 3
+  '''
+  keys = TRICK_KEYS[trump][trick[0] // SUIT_BITS]
+  best = 0
+  for k in range(1, len(trick)):
+    if keys[trick[k]] > keys[trick[best]]:
+      best = k
+  return best
+
+def trick_winners(tricks, leaders, trumps):
+  '''
+  Returns the seats (indices of PLAYERS) winning each of tricks, row
+  k being played by leaders[k] and then the seats after it, with
+  trump strain trumps[k]. This is trick_winner_index on every row in
+  one NumPy computation.
+  
+  trick_winners: ndarray ndarray ndarray -> ndarray
+  Requires:
+     tricks is an (n, 4) array of card codes
+     leaders and trumps have length n (or are single numbers)
+     leaders are indices of PLAYERS, trumps indices of STRAINS
+  
+  Example:
+     trick_winners(numpy.array([[16, 13, 25, 41]] * 2), 2,
+                   numpy.array([4, 3])).tolist() => [3, 1]
+  '''
+  tricks = numpy.asarray(tricks)
+  suits = tricks // SUIT_BITS
+  ranks = (tricks + SUIT_BITS - 1) % SUIT_BITS
+  keys = (ranks + TRICK_LED * (suits == suits[:, :1]) +
+          TRICK_TRUMP * (suits == numpy.reshape(trumps, (-1, 1))))
+  return (numpy.asarray(leaders) + keys.argmax(axis = 1)) % NUM_PLAYERS
+
     
 ## PROVIDED FUNCTIONS
 
@@ -367,6 +721,11 @@ def load_game():
     ans = input(load_game_prompt)
   if ans == "Y":
     file_name = input(load_game_name_prompt)
+    file = open(file_name, 'rb')
+    version = file.read(1)
+    file.close()
+    if version == bytes([SAVE_VERSION]):
+      return load_binary(file_name)
     return load(file_name)
   else:
     return None
@@ -399,27 +758,25 @@ def valid_card(s):
   return val in VALUES and suit in SUITS
 
     
-def select_card(bridge_game, trick, first, dummy_player, 
-                declarer_player):
+def select_card(state, first, dummy_player, declarer_player):
   '''
   Returns either the name of the saved game file or
   None based on a play of a card.
-  bridge_game is the Bridge Game object
-  trick is the current list of cards played in the trick
+  state is the PlayState of the Bridge Game being played
   first is True if this is the very first card played in the hand.
   dummy_player is the Player object corresponding to the dummy
   declarer_player is the Player object corresponding to the declarer
   
   Effects: 
-     Mutates bridge_game (specifically players and hands)
+     Mutates state (specifically its game and trick)
      Possibly writes to a file if saves
      Prints to Screen
      Request input from user
   
-  select_card: Game (listof Card) Bool Player Player -> (anyof Str None)
+  select_card: PlayState Bool Player Player -> (anyof Str None)
   Requires:
-     dummy_player is the dummy Player object in bridge_game
-     declarer_player is the declarer Player object in bridge_game
+     dummy_player is the dummy Player object in state.game
+     declarer_player is the declarer Player object in state.game
   '''
   play_card = "Player {0} please play a card from {1} hand."
   enter_card = \
@@ -432,22 +789,14 @@ def select_card(bridge_game, trick, first, dummy_player,
   save_prompt = "Enter the name of your game to save: "
 
   which_hand = "your"
-  if bridge_game.cur_player == dummy_player.name:
+  if state.game.cur_player == dummy_player.name:
     which_hand = "dummy's"
     
   str_to_card  = lambda s: Card(s[:-1],s[-1])
   
-  card = ""
-  if trick == []:
-    suit_lead = None
-  else:
-    suit_lead = trick[0].suit
-    
-  active_player = list(filter(
-    lambda x: x.name == bridge_game.cur_player, bridge_game.players))[0]  
+  active_player = state.player(state.game.cur_player)
   
-  while not valid_card(card) or \
-        not followed_suit(active_player.hand, str_to_card(card), suit_lead):
+  while True:
     if active_player == dummy_player:
       print(play_card.format(declarer_player.name, which_hand))
     else:
@@ -466,9 +815,9 @@ def select_card(bridge_game, trick, first, dummy_player,
       display_hand(active_player.hand)
       
     card = input(enter_card)  
-    if card == 'S' and trick == []:
+    if card == 'S' and state.trick == []:
       fin = input(save_prompt)
-      bridge_game.save(fin)
+      state.game.save(fin)
       return fin
     if not valid_card(card):
       print(invalid_card)   
@@ -476,12 +825,11 @@ def select_card(bridge_game, trick, first, dummy_player,
       card_actual = str_to_card(card)
       if card_actual not in active_player.hand:
         print(card_not_in_hand)
-        card = "not_in_hand"
-      elif not followed_suit(active_player.hand, card_actual, suit_lead):
+      elif card_actual not in state.legal_moves():
         print(not_follow_suit)    
       else: 
-        active_player.play_card(card_actual)
-  trick.append(card_actual)
+        state.apply(card_actual)
+        return None
   
 def play_game_bootstrap():
   '''
@@ -556,29 +904,27 @@ def play_game_bootstrap():
   declarer_player = list(filter(
     lambda x: x.name == bridge_game.declarer, bridge_game.players))[0] 
   
-  while len(bridge_game.players[0].hand) != 0:
-    trick = []
-    print(save_msg)
-    while len(trick) != 4:
-      print("Current Trick: {0}".format(trick))
-      saved = select_card(bridge_game, 
-                          trick, first, dummy_player, declarer_player)
-      if saved != None:
-        print(saved_msg.format(saved))
-        return saved
-      bridge_game.cur_player = PLAYERS[
-        (PLAYERS.index(bridge_game.cur_player) + 1 ) % NUM_PLAYERS]
-      first = False
-    first_player = bridge_game.cur_player
-    winner = bridge_game.trick_winner(trick)
-    print("First player: {0}".format(first_player))
-    print("Trick: {0}".format(trick))
-    print("Winner: {0}".format(winner))
+  state = PlayState(bridge_game)
+  while not state.is_over():
+    if state.trick == []:
+      print(save_msg)
+    print("Current Trick: {0}".format(state.trick))
+    saved = select_card(state, first, dummy_player, declarer_player)
+    if saved != None:
+      print(saved_msg.format(saved))
+      return saved
+    first = False
+    if state.trick == []:
+      first_player, trick, winner = state.tricks[-1]
+      print("First player: {0}".format(first_player))
+      print("Trick: {0}".format(trick))
+      print("Winner: {0}".format(winner))
     
   print(end_hand)
   return bridge_game
   
 
+'''
 ##Examples trick_winner
 
 P = [Player("North", [Card("2", "D")]), 
@@ -602,30 +948,28 @@ G = Game([Bid("3", "S"), None], "East", "North", 0, P, False, False)
 ##Example Save
 
 ##NOTE: Make sure you create the file "testExampleExpected.txt" with
-##the following except for the quotes
-'''
-3
-NT
-double
-West
-South
-12
-False
-False
-2
-North
-2S
-KD
-East
-5D
-AH
-South
-AD
-3C
-West
-KD
-8S
-'''
+##the following lines, without the leading "##   "
+##   3
+##   NT
+##   double
+##   West
+##   South
+##   12
+##   False
+##   False
+##   2
+##   North
+##   2S
+##   KD
+##   East
+##   5D
+##   AH
+##   South
+##   AD
+##   3C
+##   West
+##   KD
+##   8S
 
 P = [Player("North", [Card("2", "S"), Card("K", "D")]), 
      Player("East", [Card("5", "D"), Card("A", "H")]),  
@@ -653,6 +997,14 @@ G = Game([Bid("3", "NT"), Bid("double", None)], "West",
 
 # check.expect("Testing Given Example Load", load("testExampleExpected.txt"), G)
 
+##Examples binary save
+
+# check.expect("Binary size", len(G.to_bytes()), SAVE_SIZE)
+# check.expect("Binary round trip", from_bytes(G.to_bytes()), G)
+# check.expect("Binary many", loads_many(G.to_bytes() * 3)["tricks"].tolist(),
+#              [12, 12, 12])
+# check.expect("Binary bad version", from_bytes(bytes(SAVE_SIZE)), None)
+
 ##Examples followed_suit
 
 hand = [Card("A", "D"), Card("4", "C")]
@@ -665,4 +1017,21 @@ card = hand[0]
 
 hand = [Card("A", "D"), Card("4", "C")]
 card = hand[0]
-# check.expect("Basic Example", followed_suit(hand, card, None), True)
\ No newline at end of file
+# check.expect("Basic Example", followed_suit(hand, card, None), True)
+
+##Examples legal_moves
+
+# check.expect("Follow", legal_moves(hand, "C"), [Card("4", "C")])
+# check.expect("Void", legal_moves(hand, "H"), hand)
+# check.expect("Collapse", legal_moves([Card("J", "S"), Card("Q", "S"),
+#                                       Card("9", "S")], None, True),
+#              [Card("Q", "S"), Card("9", "S")])
+# check.expect("Collapse ace", legal_mask(7169, None, True), 1)
+
+##Examples trick resolution
+
+# check.expect("No trumps", trick_winner_index([16, 13, 25, 41], 4), 1)
+# check.expect("Ruffed", trick_winner_index([16, 13, 25, 41], 3), 3)
+# check.expect("Batch", trick_winners(numpy.array([[16, 13, 25, 41]] * 2), 2,
+#                                     numpy.array([4, 3])).tolist(), [3, 1])
+'''
@@ -0,0 +1,309 @@
+from engine import *
+import json
+import sys
+import time
+from contextlib import contextmanager
+# import check
+
+
+HOOKS = ["Game.trick_winner", "valid_bid", "Auction.call", "score",
+         "Game.save", "load", "Game.save_binary", "load_binary",
+         "select_card", "PlayState.apply", "Engine.apply"]
+
+MODULES = ["dealing", "bidding", "playing", "scoring", "engine",
+           "evaluation", "constraints", "transposition", "double_dummy",
+           "pbn", "archive", "tournament", "server", "benchmarks"]
+
+##A hook names a function ("score") or a method ("Game.save") defined in
+##one of MODULES, and is looked up only there, by the module it was
+##defined in. Modules share functions through "from X import *", so a
+##function is wrapped in every loaded module of MODULES holding it; a
+##method is wrapped once on its class.
+##Histograms count calls by the bit length of their time in
+##nanoseconds: bucket b holds times from 2 ** (b - 1) up to 2 ** b ns.
+
+
+class Profiler:
+  '''
+  Call counts, total times and latency histograms of the hooked
+  functions, recorded while enabled. When disabled the original
+  functions are back in place, so nothing is recorded and nothing is
+  slowed down.
+
+  Fields:
+     hooks (listof Str)
+     counts (dictof Str Nat)
+     totals (dictof Str Nat)
+     histograms (dictof Str (dictof Nat Nat))
+     report_every (anyof Float None)
+     stream (File)
+     last_report (Float)
+     originals (listof (list Any Str Any))
+  Requires:
+     totals are in nanoseconds
+     originals holds the (owner, name, value) of every attribute
+        replaced by enable, and is empty while disabled
+  '''
+
+  def __init__(self, hooks = HOOKS, report_every = None,
+               stream = sys.stderr):
+    '''
+    Initialize a disabled Profiler of hooks, with nothing recorded,
+    that prints its summary to stream every report_every seconds
+    while enabled (never when None)
+
+    Effects: Mutates self
+
+    __init__: Profiler [(listof Str)] [(anyof Float None)] [File] -> None
+    '''
+    self.hooks = hooks
+    self.report_every = report_every
+    self.stream = stream
+    self.originals = []
+    self.reset()
+
+  def __repr__(self):
+    '''
+    Returns a representation of a Profiler object
+
+    __repr__: Profiler -> Str
+    '''
+    return "Profiler: Enabled {0} Calls {1}".format(self.is_enabled(),
+                                                   sum(self.counts.values()))
+
+  def reset(self):
+    '''
+    Forgets everything recorded by self
+
+    Effects: Mutates self
+
+    reset: Profiler -> None
+    '''
+    self.counts = {hook: 0 for hook in self.hooks}
+    self.totals = {hook: 0 for hook in self.hooks}
+    self.histograms = {hook: {} for hook in self.hooks}
+    self.last_report = time.perf_counter()
+
+  def is_enabled(self):
+    '''
+    Returns True if self is recording and False otherwise
+
+    is_enabled: Profiler -> Bool
+    '''
+    return self.originals != []
+
+  def record(self, hook, elapsed):
+    '''
+    Records a call of hook taking elapsed nanoseconds, and prints the
+    summary if it is due
+
+    Effects:
+       Mutates self
+       Prints to stream
+
+    record: Profiler Str Nat -> None
+    '''
+    self.counts[hook] += 1
+    self.totals[hook] += elapsed
+    histogram = self.histograms[hook]
+    bucket = elapsed.bit_length()
+    histogram[bucket] = histogram.get(bucket, 0) + 1
+    if self.report_every != None:
+      now = time.perf_counter()
+      if now - self.last_report >= self.report_every:
+        self.last_report = now
+        print(self.summary(), file = self.stream)
+
+  def _wrap(self, hook, function):
+    '''
+    Returns function timed and recorded under hook
+
+    _wrap: Profiler Str Function -> Function
+    '''
+    clock = time.perf_counter_ns
+    def timed(*args, **kwargs):
+      start = clock()
+      try:
+        return function(*args, **kwargs)
+      finally:
+        self.record(hook, clock() - start)
+    timed.__name__ = function.__name__
+    timed.__doc__ = function.__doc__
+    timed.__wrapped__ = function
+    return timed
+
+  def enable(self):
+    '''
+    Starts recording the hooks of self defined in the loaded modules
+    of MODULES, by wrapping them in every such module holding them
+    (functions) or on their class (methods). Does nothing if self is
+    already enabled.
+
+    Effects:
+       Mutates self
+       Mutates the loaded modules and classes
+
+    enable: Profiler -> None
+    '''
+    if self.is_enabled():
+      return
+    modules = [sys.modules[name] for name in MODULES if name in sys.modules]
+    for hook in self.hooks:
+      names = hook.split(".")
+      for module in modules:
+        owner = module.__dict__.get(names[0])
+        if getattr(owner, "__module__", None) != module.__name__:
+          continue
+        if len(names) == 2 and isinstance(owner, type):
+          method = owner.__dict__.get(names[1])
+          if method != None:
+            self.originals.append([owner, names[1], method])
+            setattr(owner, names[1], self._wrap(hook, method))
+        elif len(names) == 1 and callable(owner):
+          wrapped = self._wrap(hook, owner)
+          for holder in modules:
+            if holder.__dict__.get(hook) is owner:
+              self.originals.append([holder, hook, owner])
+              setattr(holder, hook, wrapped)
+        break
+
+  def disable(self):
+    '''
+    Stops recording by putting back every original function
+
+    Effects:
+       Mutates self
+       Mutates the loaded modules and classes
+
+    disable: Profiler -> None
+    '''
+    for owner, name, function in reversed(self.originals):
+      setattr(owner, name, function)
+    self.originals = []
+
+  def summary(self):
+    '''
+    Returns a table of the calls, total milliseconds and mean
+    microseconds of each hook called, with the median and slowest
+    latency bucket of its histogram
+
+    summary: Profiler -> Str
+    '''
+    lines = ["{0:20} {1:>9} {2:>10} {3:>9} {4:>9} {5:>9}".format(
+      "hook", "calls", "total ms", "mean us", "p50 <us", "max <us")]
+    for hook in self.hooks:
+      calls = self.counts[hook]
+      if calls == 0:
+        continue
+      buckets = sorted(self.histograms[hook])
+      seen = 0
+      for bucket in buckets:
+        seen += self.histograms[hook][bucket]
+        if 2 * seen >= calls:
+          break
+      lines.append("{0:20} {1:>9} {2:>10.3f} {3:>9.2f} {4:>9.2f} {5:>9.2f}"
+                   .format(hook, calls, self.totals[hook] / 1e6,
+                           self.totals[hook] / calls / 1e3,
+                           2 ** bucket / 1e3, 2 ** buckets[-1] / 1e3))
+    return "\n".join(lines)
+
+  def to_dict(self):
+    '''
+    Returns what self recorded, as a dictionary from each hook called
+    to its calls, total nanoseconds and histogram
+
+    to_dict: Profiler -> (dictof Str (dictof Str Any))
+    '''
+    return {hook: {"calls": self.counts[hook],
+                   "total_ns": self.totals[hook],
+                   "histogram": {str(bucket): count for bucket, count
+                                 in sorted(self.histograms[hook].items())}}
+            for hook in self.hooks if self.counts[hook] > 0}
+
+  def dump(self, file_name):
+    '''
+    Writes what self recorded to file_name as JSON
+
+    Effects: Writes to file
+
+    dump: Profiler Str -> None
+    '''
+    file = open(file_name, 'w')
+    json.dump(self.to_dict(), file, indent = 2)
+    file.close()
+
+
+##END OF CLASSES
+
+
+@contextmanager
+def profile_game(hooks = HOOKS, dump_file = None, report_every = None,
+                 stream = sys.stderr):
+  '''
+  Returns a context manager enabling a new Profiler of hooks for the
+  code in its block, such as one game, and giving it as its value.
+  On leaving the block the profiler is disabled and what it recorded
+  is written to dump_file (if not None).
+
+  Effects:
+     Mutates the loaded modules and classes inside the block
+     Writes to file
+
+  profile_game: [(listof Str)] [(anyof Str None)] [(anyof Float None)]
+     [File] -> ContextManager
+
+  Example:
+     with profile_game() as profiler:
+       play_out(Engine(P), choose)
+     print(profiler.summary())
+  '''
+  profiler = Profiler(hooks, report_every, stream)
+  profiler.enable()
+  try:
+    yield profiler
+  finally:
+    profiler.disable()
+    if dump_file != None:
+      profiler.dump(dump_file)
+
+
+'''
+##Tests Profiler
+
+P = hands_to_players(generate_deals(1, 2)[0])
+original = Game.trick_winner
+with profile_game() as profiler:
+  E = Engine(P, "North")
+  for bid in [Bid("1", "NT"), Bid("pass", None), Bid("pass", None),
+              Bid("pass", None)]:
+    E.apply(bid)
+  points = play_out(E, lambda engine, moves: moves[0])
+  check.expect("Test wrapped", Game.trick_winner is original, False)
+  check.expect("Test wrapped in every module",
+               sys.modules["engine"].score is sys.modules["scoring"].score,
+               True)
+check.expect("Test restored", [Game.trick_winner is original,
+                               profiler.is_enabled()], [True, False])
+R = profiler.to_dict()
+check.expect("Test counts", [R["Engine.apply"]["calls"],
+                             R["Game.trick_winner"]["calls"],
+                             R["Auction.call"]["calls"], R["score"]["calls"]],
+             [56, 13, 4, 1])
+check.expect("Test histogram", sum(R["PlayState.apply"]["histogram"].values()),
+             52)
+check.expect("Test summary", profiler.summary().split("\n")[0].split()[0],
+             "hook")
+check.expect("Test disabled", [profiler.counts["score"],
+                               score(E.play.game) != None,
+                               profiler.counts["score"]], [1, True, 1])
+profiler = Profiler(["load", "Game.save"])
+profiler.enable()
+check.expect("Test load wrapped",
+             [hasattr(sys.modules["playing"].load, "__wrapped__"),
+              sys.modules["engine"].load is sys.modules["playing"].load,
+              hasattr(sys.modules["marshal"].load, "__wrapped__"),
+              len(profiler.originals) >= 2], [True, True, False, True])
+profiler.disable()
+check.expect("Test load restored",
+             hasattr(sys.modules["playing"].load, "__wrapped__"), False)
+'''
@@ -1,7 +1,19 @@
 from playing import *
+import bisect
 # import check
 
 
+DOUBLES = [None, "double", "redouble"]
+MAX_LEVEL = 7
+MAX_TRICKS = 13
+IMP_THRESHOLDS = [20, 50, 90, 130, 170, 220, 270, 320, 370, 430, 500, 600,
+                  750, 900, 1100, 1300, 1500, 1750, 2000, 2250, 2500, 3000,
+                  3500, 4000]
+BOARD_SPAN = 1 << 15
+
+_SCORE_TABLE = []
+
+
 def score(bridge_game):
   '''
   Returns the score of a bridge game.
@@ -159,6 +171,202 @@ def score(bridge_game):
         else:
           return points - 200 - (400 * 2) - (600 * (undertricks - 3))
 
+def score_table():
+  '''
+  Returns the table of declarer's score for every result, built with
+  score the first time it is needed. The table is a NumPy array
+  indexed by contract level - 1, strain (in the order of STRAINS),
+  doubling (in the order of DOUBLES), declarer's vulnerability
+  (0 or 1) and declarer's tricks (0 to 13).
+
+  Effects: Mutates _SCORE_TABLE the first time it is called
+
+  score_table: None -> ndarray
+
+  Example:
+     score_table()[2, 4, 0, 0, 9] => 400
+  '''
+  if _SCORE_TABLE == []:
+    table = numpy.zeros((MAX_LEVEL, len(STRAINS), len(DOUBLES), 2,
+                         MAX_TRICKS + 1), dtype = numpy.int32)
+    for level in range(MAX_LEVEL):
+      for strain in range(len(STRAINS)):
+        for double in range(len(DOUBLES)):
+          bid = None
+          if DOUBLES[double] != None:
+            bid = Bid(DOUBLES[double], None)
+          for vul in range(2):
+            for tricks in range(MAX_TRICKS + 1):
+              game = Game([Bid(str(level + 1), STRAINS[strain]), bid],
+                          "East", "North", tricks, [], vul == 1, False)
+              table[level, strain, double, vul, tricks] = score(game)
+    _SCORE_TABLE.append(table)
+  return _SCORE_TABLE[0]
+
+def score_many(levels, strains, doubles, vul, tricks):
+  '''
+  Returns declarer's score for each of a batch of results, given as
+  equal-shaped arrays (or numbers) of contract levels, strains,
+  doubling, declarer's vulnerability and declarer's tricks. Each
+  score is the same as score gives for that result.
+
+  score_many: ndarray ndarray ndarray ndarray ndarray -> ndarray
+  Requires:
+     1 <= levels <= 7
+     strains index STRAINS and doubles index DOUBLES
+     vul is 0 or 1 (or a boolean array)
+     0 <= tricks <= 13
+
+  Example:
+     score_many([3, 4], [4, 3], [0, 1], [0, 1], [9, 9]).tolist()
+        => [400, -200]
+  '''
+  levels = numpy.asarray(levels, dtype = numpy.intp)
+  vul = numpy.asarray(vul, dtype = numpy.intp)
+  return score_table()[levels - 1, strains, doubles, vul, tricks]
+
+def imps(difference):
+  '''
+  Returns the IMPs won for a score difference on the standard IMP
+  scale, where a difference of at least IMP_THRESHOLDS[k - 1] (and
+  less than IMP_THRESHOLDS[k]) is worth k IMPs; negative for a
+  negative difference
+
+  imps: Num -> Int
+
+  Examples:
+     imps(10) => 0
+     imps(420) => 9
+     imps(-1100) => -15
+     imps(5000) => 24
+  '''
+  if difference < 0:
+    return -bisect.bisect_right(IMP_THRESHOLDS, -difference)
+  return bisect.bisect_right(IMP_THRESHOLDS, difference)
+
+def imps_many(differences):
+  '''
+  Returns imps of each of an array of score differences
+
+  imps_many: ndarray -> ndarray
+
+  Example:
+     imps_many([10, 420, -1100]).tolist() => [0, 9, -15]
+  '''
+  differences = numpy.asarray(differences)
+  won = numpy.searchsorted(IMP_THRESHOLDS, numpy.abs(differences),
+                           side = "right")
+  return numpy.where(differences < 0, -won, won)
+
+##The field functions below take the NS scores of many results and the
+##board of each (all one board when boards is None). Results are sorted
+##once by the key board * BOARD_SPAN + score + BOARD_SPAN // 2, so that
+##each board is a contiguous run and counting the results of a board
+##within a range of scores is two binary searches.
+
+def _board_runs(scores, boards):
+  '''
+  Returns the sort keys of the results with NS scores scores on boards
+  boards, the keys in increasing order, and the start and end of the
+  run of each result's board in that order
+
+  _board_runs: ndarray (anyof ndarray None)
+     -> (list ndarray ndarray ndarray ndarray)
+  Requires: abs(score) + IMP_THRESHOLDS[-1] < BOARD_SPAN // 2 for every
+     score
+  '''
+  scores = numpy.asarray(scores, dtype = numpy.int64)
+  if boards is None:
+    groups = numpy.zeros(len(scores), dtype = numpy.int64)
+  else:
+    groups = numpy.unique(boards, return_inverse = True)[1].reshape(-1)
+  keys = groups * BOARD_SPAN + scores + BOARD_SPAN // 2
+  ordered = numpy.sort(keys)
+  starts = numpy.searchsorted(ordered, groups * BOARD_SPAN)
+  ends = numpy.searchsorted(ordered, (groups + 1) * BOARD_SPAN)
+  return [keys, ordered, starts, ends]
+
+def matchpoints_many(scores, boards = None):
+  '''
+  Returns the NS matchpoints of every result, given the NS scores and
+  boards of a field of results, and the top of each result's board:
+  one matchpoint for each other result on the board it beats, a half
+  for each it ties, and a top of one less than the board's results.
+  Sorting makes this O(n log n) rather than comparing every pair.
+
+  matchpoints_many: ndarray [(anyof ndarray None)] -> (list ndarray ndarray)
+
+  Example:
+     matchpoints_many([-100, 420, 420, 450])[0].tolist()
+        => [0.0, 1.5, 1.5, 3.0]
+  '''
+  keys, ordered, starts, ends = _board_runs(scores, boards)
+  below = numpy.searchsorted(ordered, keys, side = "left")
+  ties = numpy.searchsorted(ordered, keys, side = "right") - below - 1
+  return [below - starts + ties / 2, ends - starts - 1]
+
+def matchpoint_percentages(scores, boards = None):
+  '''
+  Returns the NS matchpoint percentage of every result, given the NS
+  scores and boards of a field of results (see matchpoints_many); 50
+  for the only result on a board. EW percentages are 100 minus these.
+
+  matchpoint_percentages: ndarray [(anyof ndarray None)] -> ndarray
+
+  Example:
+     matchpoint_percentages([-100, 420, 420, 450]).tolist()
+        => [0.0, 50.0, 50.0, 100.0]
+  '''
+  points, tops = matchpoints_many(scores, boards)
+  return numpy.where(tops > 0, 100 * points / numpy.maximum(tops, 1), 50.0)
+
+def butler_many(scores, boards = None):
+  '''
+  Returns the NS IMPs of every result, given the NS scores and boards
+  of a field of results, against its board's datum: the mean NS score
+  of the board rounded to the nearest 10, halves away from zero
+
+  butler_many: ndarray [(anyof ndarray None)] -> ndarray
+
+  Example:
+     butler_many([-100, 420, 420, 450]).tolist() => [-9, 3, 3, 4]
+  '''
+  scores = numpy.asarray(scores, dtype = numpy.int64)
+  if boards is None:
+    groups = numpy.zeros(len(scores), dtype = numpy.int64)
+  else:
+    groups = numpy.unique(boards, return_inverse = True)[1].reshape(-1)
+  sums = numpy.bincount(groups, weights = scores).astype(numpy.int64)
+  counts = numpy.bincount(groups)
+  ## floor(|mean| / 10 + 1/2) * 10 with the sign of the mean, in integers
+  datum = (numpy.sign(sums) * 10 *
+           ((2 * numpy.abs(sums) + 10 * counts) // (20 * counts)))
+  return imps_many(scores - datum[groups])
+
+def cross_imps_many(scores, boards = None):
+  '''
+  Returns the NS cross-IMPs of every result, given the NS scores and
+  boards of a field of results: the sum of the IMPs it gains against
+  each other result on its board. As a result gains k IMPs against
+  another when they differ by at least IMP_THRESHOLDS[k - 1], the sum
+  counts, for each threshold, the results at least that much below
+  less those at least that much above, which is two binary searches
+  per threshold.
+
+  cross_imps_many: ndarray [(anyof ndarray None)] -> ndarray
+
+  Example:
+     cross_imps_many([-100, 420, 420, 450]).tolist() => [-33, 10, 10, 13]
+  '''
+  keys, ordered, starts, ends = _board_runs(scores, boards)
+  total = numpy.zeros(len(keys), dtype = numpy.int64)
+  for threshold in IMP_THRESHOLDS:
+    total += numpy.searchsorted(ordered, keys - threshold, side = "right")
+    total -= starts
+    total -= ends - numpy.searchsorted(ordered, keys + threshold)
+  return total
+
+
 '''
 ##Examples for score
 
@@ -171,7 +379,61 @@ check.expect("Example 2", score(G), 450)
 
 G = Game([Bid("4", "S"), Bid("double", None)], "South", "North", 9, P, True, False)
 check.expect("Example 3", score(G), -200)
+
+##Tests score_many agrees with score on every result
+
+L, S, D, V, T = numpy.indices((7, 5, 3, 2, 14)).reshape(5, -1)
+R = score_many(L + 1, S, D, V, T)
+agree = True
+for k in range(len(R)):
+  bid = None
+  if DOUBLES[D[k]] != None:
+    bid = Bid(DOUBLES[D[k]], None)
+  G = Game([Bid(str(L[k] + 1), STRAINS[S[k]]), bid], "South", "West",
+           int(T[k]), P, False, V[k] == 1)
+  if score(G) != R[k]:
+    agree = False
+check.expect("Test score_many exhaustive", agree, True)
+check.expect("Example score_many", score_many([3, 4], [4, 3], [0, 1], [0, 1],
+                                              [9, 9]).tolist(), [400, -200])
+
+##Tests imps
+
+check.expect("Test imps", [imps(0), imps(10), imps(20), imps(420), imps(430),
+                           imps(-1100), imps(3990), imps(5000)],
+             [0, 0, 1, 9, 10, -15, 23, 24])
+
+##Tests field scoring
+
+import random as py_random
+py_random.seed(6)
+B = [py_random.randrange(5) for k in range(300)]
+S = [py_random.choice([-200, -100, 50, 110, 140, 420, 450, 620, 1430])
+     for k in range(300)]
+points, tops = matchpoints_many(S, B)
+crossed = cross_imps_many(S, B)
+agree = True
+for k in range(len(S)):
+  others = [S[j] for j in range(len(S)) if B[j] == B[k] and j != k]
+  if points[k] != sum(1 if S[k] > o else 0.5 if S[k] == o else 0
+                      for o in others):
+    agree = False
+  if tops[k] != len(others) or crossed[k] != sum(imps(S[k] - o)
+                                                 for o in others):
+    agree = False
+check.expect("Test field matchpoints and cross-IMPs", agree, True)
+check.expect("Test imps_many", imps_many(list(range(-5000, 5000, 10))).tolist(),
+             [imps(d) for d in range(-5000, 5000, 10)])
+check.expect("Test percentages", matchpoint_percentages([-100, 420, 420, 450],
+                                                        [1, 1, 1, 2]).tolist(),
+             [0.0, 75.0, 75.0, 50.0])
+check.expect("Test butler", butler_many([-100, 420, 420, 450]).tolist(),
+             [-9, 3, 3, 4])
+check.expect("Test butler halves", butler_many([0, 90, 0, -90],
+                                              [1, 1, 2, 2]).tolist(),
+             [-2, 1, 2, -1])
 '''
 
-##To see the whole game in action, uncomment this to play!
-print(score(play_game_bootstrap()))
\ No newline at end of file
+##To see the whole game in action, run this file to play!
+if __name__ == "__main__":
+  print(score(play_game_bootstrap()))
\ No newline at end of file
@@ -0,0 +1,352 @@
+from engine import *
+import asyncio
+import json
+import logging
+import time
+# import check
+
+
+SERVER_HOST = "127.0.0.1"
+LOAD_TABLES = 200
+
+##The protocol is one JSON object per line each way. Every request has an
+##"op" and, except for "new", the "table" it is about:
+##   {"op": "new", "seed": 7, "dealer": "North"}   starts a table
+##   {"op": "move", "table": 1, "move": "1NT"}     makes a call or play
+##   {"op": "state", "table": 1}                   reports the table
+##   {"op": "close", "table": 1}                   ends the table
+##Every reply has "ok"; table replies add the table's "phase",
+##"to_move", "legal" moves and, once it is over, its "result". Moves are
+##written as calls are shown by Bid ("1NT", "pass", "double") and cards
+##as value then suit ("10H", "AS").
+
+
+def move_text(move):
+  '''
+  Returns the protocol text of move
+
+  move_text: (anyof Bid Card) -> Str
+
+  Examples:
+     move_text(Bid("1", "NT")) => "1NT"
+     move_text(Card("10", "H")) => "10H"
+  '''
+  if isinstance(move, Card):
+    return move.value + move.suit
+  return repr(move)
+
+def parse_move(text, phase):
+  '''
+  Returns the Bid (in the "auction" phase) or Card (otherwise)
+  written as text, or None if text is not one. The phase decides,
+  as "2C" is both a call and a card.
+
+  parse_move: Str Str -> (anyof Bid Card None)
+  '''
+  if phase == "auction":
+    if (text, None) in BID_LOOKUP:
+      return BID_LOOKUP[(text, None)]
+    return BID_LOOKUP.get((text[:1], text[1:]))
+  return CARD_LOOKUP.get((text[:-1], text[-1:]))
+
+
+class TableServer:
+  '''
+  Many bridge tables played at once by clients over local sockets,
+  each table an Engine. All tables share one event loop.
+
+  Fields:
+     tables (dictof Nat Engine)
+     next_table (Nat)
+     moves (Nat)
+     server (anyof asyncio.Server None)
+  Requires:
+     next_table is greater than every key of tables
+     moves is the number of moves applied on all tables
+  '''
+
+  def __init__(self):
+    '''
+    Initialize a TableServer with no tables, not yet listening
+
+    Effects: Mutates self
+
+    __init__: TableServer -> None
+    '''
+    self.tables = {}
+    self.next_table = 1
+    self.moves = 0
+    self.server = None
+
+  def __repr__(self):
+    '''
+    Returns a representation of a TableServer object
+
+    __repr__: TableServer -> Str
+    '''
+    return "TableServer: Tables {0} Moves {1}".format(len(self.tables),
+                                                     self.moves)
+
+  def report(self, table):
+    '''
+    Returns the reply describing the table numbered table
+
+    report: TableServer Nat -> (dictof Str Any)
+    '''
+    engine = self.tables[table]
+    reply = {"ok": True, "table": table, "phase": engine.phase(),
+             "to_move": engine.to_move(),
+             "legal": [move_text(move) for move in engine.legal_moves()]}
+    if engine.is_over():
+      reply["result"] = engine.result()
+    return reply
+
+  def handle(self, request):
+    '''
+    Returns the reply to request, carrying it out. Requests that are
+    not objects, or whose fields have the wrong types, get the reply
+    {"ok": False, "error": "bad request"}.
+
+    Effects: Mutates self
+
+    handle: TableServer Any -> (dictof Str Any)
+    '''
+    if not isinstance(request, dict):
+      return {"ok": False, "error": "bad request"}
+    op = request.get("op")
+    if op == "new":
+      seed = request.get("seed", self.next_table)
+      dealer = request.get("dealer", "North")
+      ns_vul = request.get("ns_vulnerable", False)
+      ew_vul = request.get("ew_vulnerable", False)
+      if not (type(seed) == int and seed >= 0 and dealer in SEATS and
+              isinstance(ns_vul, bool) and isinstance(ew_vul, bool)):
+        return {"ok": False, "error": "bad request"}
+      table = self.next_table
+      self.next_table += 1
+      self.tables[table] = Engine(hands_to_players(deal_at(seed, 0)), dealer,
+                                  ns_vul, ew_vul)
+      return self.report(table)
+    table = request.get("table")
+    if type(table) != int or table not in self.tables:
+      return {"ok": False, "error": "unknown table"}
+    if op == "state":
+      return self.report(table)
+    if op == "close":
+      self.tables.pop(table)
+      return {"ok": True, "table": table}
+    if op == "move":
+      move = parse_move(str(request.get("move", "")),
+                        self.tables[table].phase())
+      if move == None or not self.tables[table].apply(move):
+        return {"ok": False, "error": "illegal move", "table": table}
+      self.moves += 1
+      return self.report(table)
+    return {"ok": False, "error": "unknown op"}
+
+  async def serve_client(self, reader, writer):
+    '''
+    Answers the requests of one client connection, a line at a time,
+    until it closes. A request failing on a bug in self is logged with
+    its traceback and answered with an error.
+
+    Effects:
+       Mutates self
+       Reads/Writes to a socket
+
+    serve_client: TableServer StreamReader StreamWriter -> None
+    '''
+    try:
+      while True:
+        line = await reader.readline()
+        if not line:
+          break
+        try:
+          reply = self.handle(json.loads(line))
+        except ValueError:
+          reply = {"ok": False, "error": "bad request"}
+        except Exception:
+          ## One bad request must not drop the client's connection, but
+          ## the server bug behind it must still be diagnosable
+          logging.exception("internal error handling %r", line)
+          reply = {"ok": False, "error": "internal error"}
+        writer.write(json.dumps(reply).encode() + b"\n")
+        await writer.drain()
+    finally:
+      writer.close()
+      await writer.wait_closed()
+
+  async def start(self, host = SERVER_HOST, port = 0):
+    '''
+    Returns the port self listens on after starting to serve clients
+    at host and port (any free port when port is 0)
+
+    Effects: Mutates self
+
+    start: TableServer [Str] [Nat] -> Nat
+    '''
+    self.server = await asyncio.start_server(self.serve_client, host, port)
+    return self.server.sockets[0].getsockname()[1]
+
+  async def stop(self):
+    '''
+    Stops self from serving clients
+
+    Effects: Mutates self
+
+    stop: TableServer -> None
+    '''
+    self.server.close()
+    await self.server.wait_closed()
+
+
+##END OF CLASSES
+
+
+async def scripted_table(host, port, seed):
+  '''
+  Returns the result of one table played to the end over a
+  connection to the server at host and port, always choosing a
+  random legal move (mostly passes in the auction), and the time
+  each move took to be answered
+
+  Effects: Reads/Writes to a socket
+
+  scripted_table: Str Nat Nat -> (list Int (listof Float))
+  '''
+  rng = random.default_rng(seed)
+  reader, writer = await asyncio.open_connection(host, port)
+
+  async def ask(request):
+    writer.write(json.dumps(request).encode() + b"\n")
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+  reply = await ask({"op": "new", "seed": seed,
+                     "dealer": SEATS[seed % NUM_HANDS]})
+  table = reply["table"]
+  latencies = []
+  while reply["phase"] != "over":
+    legal = reply["legal"]
+    move = legal[rng.integers(len(legal))]
+    if reply["phase"] == "auction" and rng.random() < 0.7:
+      move = "pass"
+    start = time.perf_counter()
+    reply = await ask({"op": "move", "table": table, "move": move})
+    latencies.append(time.perf_counter() - start)
+  await ask({"op": "close", "table": table})
+  writer.close()
+  await writer.wait_closed()
+  return [reply["result"], latencies]
+
+async def load_test(tables = LOAD_TABLES, seed = 0):
+  '''
+  Returns statistics of serving tables scripted tables at once from
+  one TableServer in this process: the number of tables and moves,
+  the seconds taken, moves per second, and the median and slowest
+  per-table mean latency of a move in milliseconds
+
+  Effects: Reads/Writes to a socket
+
+  load_test: [Nat] [Nat] -> (dictof Str Num)
+  '''
+  server = TableServer()
+  port = await server.start()
+  start = time.perf_counter()
+  results = await asyncio.gather(*[scripted_table(SERVER_HOST, port,
+                                                  seed + k)
+                                   for k in range(tables)])
+  seconds = time.perf_counter() - start
+  await server.stop()
+  means = sorted(sum(latencies) / len(latencies) * 1000
+                 for result, latencies in results)
+  moves = sum(len(latencies) for result, latencies in results)
+  return {"tables": tables, "moves": moves, "seconds": seconds,
+          "moves_per_second": moves / seconds,
+          "median_latency_ms": means[len(means) // 2],
+          "max_latency_ms": means[-1]}
+
+
+if __name__ == "__main__":
+  print(asyncio.run(load_test()))
+
+
+'''
+##Tests handle
+
+S = TableServer()
+R = S.handle({"op": "new", "seed": 3, "dealer": "East"})
+check.expect("Test new", [R["ok"], R["phase"], R["to_move"], len(R["legal"])],
+             [True, "auction", "East", 36])
+check.expect("Test illegal", S.handle({"op": "move", "table": 1,
+                                       "move": "double"})["ok"], False)
+for call in ["1NT", "pass", "pass", "pass"]:
+  R = S.handle({"op": "move", "table": 1, "move": call})
+check.expect("Test play", [R["phase"], R["to_move"]], ["play", "South"])
+check.expect("Test unknown table", S.handle({"op": "state", "table": 9})["ok"],
+             False)
+check.expect("Test bad requests", [S.handle([1]), S.handle(3),
+                                    S.handle({"op": "state", "table": [1]}),
+                                    S.handle({"op": "new", "seed": "x"}),
+                                    S.handle({"op": "new", "dealer": "Up"})],
+             [{"ok": False, "error": "bad request"}] * 2 +
+             [{"ok": False, "error": "unknown table"}] +
+             [{"ok": False, "error": "bad request"}] * 2)
+check.expect("Test parse_move", [parse_move("10H", "play"),
+                                 parse_move("pass", "auction"),
+                                 parse_move("2C", "auction"),
+                                 parse_move("2C", "play"),
+                                 parse_move("1Z", "auction")],
+             [Card("10", "H"), Bid("pass", None), Bid("2", "C"),
+              Card("2", "C"), None])
+
+##Tests a bad line does not drop the connection
+
+async def bad_client():
+  server = TableServer()
+  port = await server.start()
+  reader, writer = await asyncio.open_connection(SERVER_HOST, port)
+  replies = []
+  for line in [b"[1]\n", b"not json\n", b'{"op": "state", "table": {}}\n',
+               b'{"op": "new", "seed": 2}\n']:
+    writer.write(line)
+    await writer.drain()
+    replies.append(json.loads(await reader.readline())["ok"])
+  writer.close()
+  await writer.wait_closed()
+  await asyncio.sleep(0.05)
+  await server.stop()
+  return replies
+check.expect("Test connection kept", asyncio.run(bad_client()),
+             [False, False, False, True])
+
+##Tests a server bug is logged and answered
+
+async def broken_client():
+  server = TableServer()
+  server.handle = lambda request: 1 // 0
+  port = await server.start()
+  reader, writer = await asyncio.open_connection(SERVER_HOST, port)
+  writer.write(b'{"op": "new"}\n')
+  await writer.drain()
+  reply = json.loads(await reader.readline())
+  writer.close()
+  await writer.wait_closed()
+  await server.stop()
+  return reply
+import io
+stream = io.StringIO()
+handler = logging.StreamHandler(stream)
+logging.getLogger().addHandler(handler)
+reply = asyncio.run(broken_client())
+logging.getLogger().removeHandler(handler)
+check.expect("Test internal error logged",
+             [reply, "ZeroDivisionError" in stream.getvalue()],
+             [{"ok": False, "error": "internal error"}, True])
+
+##Tests scripted clients
+
+stats = asyncio.run(load_test(20, 5))
+check.expect("Test load test", [stats["tables"], stats["moves"] > 20 * 4],
+             [20, True])
+'''
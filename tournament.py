@@ -0,0 +1,496 @@
+from engine import *
+import bisect
+# import check
+
+
+VULNERABILITY = ["None", "NS", "EW", "All", "NS", "EW", "All", "None",
+                 "EW", "All", "None", "NS", "All", "None", "NS", "EW"]
+
+##A movement is a list of rounds, each a list of [table, NS pair, EW pair,
+##board set] for every table in play that round. Tables, pairs and board
+##sets are numbered from 1; board set s holds boards (s - 1) * per_round
+##+ 1 to s * per_round, for per_round boards played each round.
+
+
+class Board:
+  '''
+  A duplicate board: one deal played at many tables, with the dealer
+  and vulnerability that go with its number.
+
+  Fields:
+     number (Nat)
+     dealer (Str)
+     ns_vulnerable (Bool)
+     ew_vulnerable (Bool)
+     hands (anyof ndarray None)
+  Requires:
+     number >= 1
+     dealer is SEATS[(number - 1) % 4]
+     the vulnerability is VULNERABILITY[(number - 1) % 16]
+     hands is None or a (4, 13) array of card codes in the order of
+        SEATS
+  '''
+
+  def __init__(self, number, hands = None):
+    '''
+    Initialize board number number, with the deal hands (if not None)
+
+    Effects: Mutates self
+
+    __init__: Board Nat [(anyof ndarray None)] -> None
+    Requires: number >= 1
+    '''
+    vulnerable = VULNERABILITY[(number - 1) % len(VULNERABILITY)]
+    self.number = number
+    self.dealer = SEATS[(number - 1) % NUM_HANDS]
+    self.ns_vulnerable = vulnerable in ["NS", "All"]
+    self.ew_vulnerable = vulnerable in ["EW", "All"]
+    self.hands = hands
+
+  def __repr__(self):
+    '''
+    Returns a representation of a Board object
+
+    __repr__: Board -> Str
+    '''
+    return "Board {0.number}: Dealer {0.dealer} Vulnerable {1}".format(
+      self, VULNERABILITY[(self.number - 1) % len(VULNERABILITY)])
+
+  def engine(self):
+    '''
+    Returns a new Engine for playing self at a table
+
+    engine: Board -> Engine
+    Requires: self.hands is not None
+    '''
+    return Engine(hands_to_players(self.hands), self.dealer,
+                  self.ns_vulnerable, self.ew_vulnerable)
+
+
+class Tournament:
+  '''
+  A duplicate event: results are entered per board and pair as they
+  arrive, and matchpoints or Butler IMPs are found against the field
+  on that board when asked. Each board keeps its NS scores sorted, so
+  entering a result costs an insertion and scoring a result a binary
+  search; nothing is recomputed over the field. Standings score the
+  whole field at once with NumPy.
+
+  Fields:
+     boards (dictof Nat Board)
+     results (dictof Nat (dictof Nat (list Nat Int)))
+     scores (dictof Nat (listof Int))
+     totals (dictof Nat Int)
+     played (dictof Nat (dictof Nat Nat))
+  Requires:
+     results maps each board number to its results, each by NS pair
+        as [EW pair, NS score]
+     scores[b] are the NS scores of results[b] in increasing order
+        and totals[b] their sum
+     played maps each pair to the boards it has played, each to the
+        NS pair of that result (itself when it sat NS)
+  '''
+
+  def __init__(self, boards):
+    '''
+    Initialize a Tournament of boards with no results
+
+    Effects: Mutates self
+
+    __init__: Tournament (listof Board) -> None
+    '''
+    self.boards = {board.number: board for board in boards}
+    self.results = {}
+    self.scores = {}
+    self.totals = {}
+    self.played = {}
+
+  def __repr__(self):
+    '''
+    Returns a representation of a Tournament object
+
+    __repr__: Tournament -> Str
+    '''
+    return "Tournament: Boards {0} Results {1} Pairs {2}".format(
+      len(self.boards), sum(len(self.scores[b]) for b in self.scores),
+      len(self.played))
+
+  def add_result(self, board, ns_pair, ew_pair, ns_score):
+    '''
+    Returns True if the result of ns_pair against ew_pair on board,
+    scoring ns_score for North-South, is entered, replacing an earlier
+    result of ns_pair on board (a correction). False with no mutation
+    if board is not in self, or either pair already has a result on
+    board at another table (ns_pair as East-West, or ew_pair against
+    another pair).
+
+    Effects: Mutates self
+
+    add_result: Tournament Nat Nat Nat Int -> Bool
+    Requires: ns_pair != ew_pair
+    '''
+    if board not in self.boards:
+      return False
+    if self.played.get(ns_pair, {}).get(board, ns_pair) != ns_pair:
+      return False
+    if self.played.get(ew_pair, {}).get(board, ns_pair) != ns_pair:
+      return False
+    table = self.results.setdefault(board, {})
+    scores = self.scores.setdefault(board, [])
+    if ns_pair in table:
+      old_ew, old_score = table[ns_pair]
+      del scores[bisect.bisect_left(scores, old_score)]
+      self.totals[board] -= old_score
+      self.played[old_ew].pop(board)
+    table[ns_pair] = [ew_pair, ns_score]
+    bisect.insort(scores, ns_score)
+    self.totals[board] = self.totals.get(board, 0) + ns_score
+    self.played.setdefault(ns_pair, {})[board] = ns_pair
+    self.played.setdefault(ew_pair, {})[board] = ns_pair
+    return True
+
+  def add_game(self, board, ns_pair, ew_pair, engine):
+    '''
+    Returns add_result of the finished engine's result for ns_pair
+    against ew_pair on board
+
+    Effects: Mutates self
+
+    add_game: Tournament Nat Nat Nat Engine -> Bool
+    Requires: engine.is_over() => True
+    '''
+    return self.add_result(board, ns_pair, ew_pair, engine.result())
+
+  def top(self, board):
+    '''
+    Returns the most matchpoints a result on board can score: one for
+    each other result
+
+    top: Tournament Nat -> Nat
+    '''
+    return max(0, len(self.scores.get(board, [])) - 1)
+
+  def matchpoints(self, board, ns_score):
+    '''
+    Returns the NS matchpoints of a result of ns_score on board: one
+    for each other result it beats and one half for each it ties
+
+    matchpoints: Tournament Nat Int -> Float
+    Requires: a result of ns_score has been entered on board
+
+    Example:
+       with NS scores [-100, 420, 420, 450] on board 1,
+       T.matchpoints(1, 420) => 1.5
+    '''
+    scores = self.scores[board]
+    below = bisect.bisect_left(scores, ns_score)
+    ties = bisect.bisect_right(scores, ns_score) - below - 1
+    return below + ties / 2
+
+  def datum(self, board):
+    '''
+    Returns the Butler datum of board: the mean NS score of its
+    results, rounded to the nearest 10 with halves away from zero
+
+    datum: Tournament Nat -> Int
+    Requires: board has at least one result
+    '''
+    total = self.totals[board]
+    count = len(self.scores[board])
+    datum = (2 * abs(total) + 10 * count) // (20 * count) * 10
+    if total < 0:
+      return -datum
+    return datum
+
+  def butler(self, board, ns_score):
+    '''
+    Returns the NS IMPs of a result of ns_score on board against the
+    datum of board
+
+    butler: Tournament Nat Int -> Int
+    Requires: board has at least one result
+    '''
+    return imps(ns_score - self.datum(board))
+
+  def pair_matchpoints(self, pair):
+    '''
+    Returns the total matchpoints of pair and the total of the tops
+    of the boards it played
+
+    pair_matchpoints: Tournament Nat -> (list Float Nat)
+    '''
+    points = 0
+    tops = 0
+    for board, ns_pair in self.played.get(pair, {}).items():
+      ns_points = self.matchpoints(board, self.results[board][ns_pair][1])
+      top = self.top(board)
+      if ns_pair == pair:
+        points += ns_points
+      else:
+        points += top - ns_points
+      tops += top
+    return [points, tops]
+
+  def pair_imps(self, pair):
+    '''
+    Returns the total Butler IMPs of pair
+
+    pair_imps: Tournament Nat -> Int
+    '''
+    total = 0
+    for board, ns_pair in self.played.get(pair, {}).items():
+      gained = self.butler(board, self.results[board][ns_pair][1])
+      if ns_pair == pair:
+        total += gained
+      else:
+        total -= gained
+    return total
+
+  def result_arrays(self):
+    '''
+    Returns the board, NS pair, EW pair and NS score of every result
+    in self, as four arrays
+
+    result_arrays: Tournament -> (list ndarray ndarray ndarray ndarray)
+    '''
+    rows = [[board, ns_pair, ew_pair, ns_score]
+            for board in self.results
+            for ns_pair, (ew_pair, ns_score) in self.results[board].items()]
+    columns = numpy.array(rows, dtype = numpy.int64).reshape(-1, 4)
+    return [columns[:, k] for k in range(4)]
+
+  def standings(self, method = "matchpoints"):
+    '''
+    Returns every pair with its score, best first: its matchpoint
+    percentage (method "matchpoints"), Butler IMPs ("imps") or
+    cross-IMPs ("cross_imps"). Pairs whose boards all have a top of 0
+    score 50%. Every board is scored afresh in one pass over the
+    field with the field functions of scoring (matchpoints_many,
+    butler_many, cross_imps_many).
+
+    standings: Tournament [Str] -> (listof (list Nat Num))
+    Requires: method is "matchpoints", "imps" or "cross_imps"
+    '''
+    boards, ns_pairs, ew_pairs, scores = self.result_arrays()
+    if len(scores) == 0:
+      return []
+    if method == "matchpoints":
+      points, tops = matchpoints_many(scores, boards)
+      values = numpy.concatenate([points, tops - points])
+    elif method == "imps":
+      gained = butler_many(scores, boards)
+      values = numpy.concatenate([gained, -gained])
+    else:
+      gained = cross_imps_many(scores, boards)
+      values = numpy.concatenate([gained, -gained])
+    pairs, index = numpy.unique(numpy.concatenate([ns_pairs, ew_pairs]),
+                                return_inverse = True)
+    totals = numpy.bincount(index, weights = values)
+    if method == "matchpoints":
+      all_tops = numpy.bincount(index, weights = numpy.concatenate([tops,
+                                                                    tops]))
+      totals = numpy.where(all_tops > 0,
+                           100 * totals / numpy.maximum(all_tops, 1), 50.0)
+      table = [[pair, total] for pair, total in zip(pairs.tolist(),
+                                                    totals.tolist())]
+    else:
+      table = [[pair, int(total)] for pair, total in zip(pairs.tolist(),
+                                                         totals.tolist())]
+    table.sort(key = lambda entry: (-entry[1], entry[0]))
+    return table
+
+
+##END OF CLASSES
+
+
+def board_set(n, seed = None, first = 1):
+  '''
+  Returns n Boards numbered from first, dealt from the deal stream of
+  seed (see deal_at) with board b getting deal b - 1, or without
+  hands if seed is None
+
+  board_set: Nat [(anyof Nat None)] [Nat] -> (listof Board)
+  '''
+  boards = []
+  for number in range(first, first + n):
+    hands = None
+    if seed != None:
+      hands = deal_at(seed, number - 1)
+    boards.append(Board(number, hands))
+  return boards
+
+def mitchell(tables, rounds = None):
+  '''
+  Returns the Mitchell movement for tables tables over rounds rounds
+  (tables rounds if None). NS pair k stays at table k and EW pairs
+  1 + tables to 2 * tables move up one table each round while the
+  board sets move down one, so every NS pair meets every EW pair once.
+  With an even number of tables, the first and last tables share a board
+  set each round (a relay) and one set a round rests on a bye stand
+  between tables tables // 2 and tables // 2 + 1, so that every pair
+  still plays every board set once.
+
+  mitchell: Nat [(anyof Nat None)] -> (listof (listof (list Nat Nat Nat Nat)))
+  Requires: rounds is None or 1 <= rounds <= tables
+
+  Example:
+     mitchell(3)[1] => [[1, 1, 6, 2], [2, 2, 4, 3], [3, 3, 5, 1]]
+  '''
+  if rounds == None:
+    rounds = tables
+  movement = []
+  bye = tables
+  if tables % 2 == 0:
+    bye = tables // 2
+  for r in range(rounds):
+    movement.append([[k + 1, k + 1, tables + (k - r) % tables + 1,
+                      (k + r + (k >= bye)) % tables + 1]
+                     for k in range(tables)])
+  return movement
+
+def howell(tables):
+  '''
+  Returns the complete Howell movement for 2 * tables pairs: over
+  2 * tables - 1 rounds every pair meets every other pair once. Pair
+  2 * tables stays at table 1, changing direction every round, and
+  the others move round it. All tables play the same board set in a
+  round (set r in round r), so each board is played at every table
+  and must be duplicated for each.
+
+  howell: Nat -> (listof (listof (list Nat Nat Nat Nat)))
+  Requires: tables >= 1
+
+  Example:
+     howell(2) => [[[1, 4, 1, 1], [2, 2, 3, 1]],
+                   [[1, 2, 4, 2], [2, 3, 1, 2]],
+                   [[1, 4, 3, 3], [2, 1, 2, 3]]]
+  '''
+  others = 2 * tables - 1
+  movement = []
+  for r in range(others):
+    first = [others + 1, r + 1]
+    if r % 2 == 1:
+      first = [r + 1, others + 1]
+    seating = [[1] + first + [r + 1]]
+    for k in range(1, tables):
+      seating.append([k + 1, (r + k) % others + 1, (r - k) % others + 1,
+                      r + 1])
+    movement.append(seating)
+  return movement
+
+def movement_boards(movement, per_round):
+  '''
+  Returns the board assignments of movement with per_round boards a
+  round, as [round, table, board, NS pair, EW pair] in playing order
+
+  movement_boards: (listof (listof (list Nat Nat Nat Nat))) Nat
+     -> (listof (list Nat Nat Nat Nat Nat))
+  Requires: per_round >= 1
+  '''
+  plays = []
+  for r in range(len(movement)):
+    for table, ns_pair, ew_pair, board_set in movement[r]:
+      for board in range((board_set - 1) * per_round + 1,
+                         board_set * per_round + 1):
+        plays.append([r + 1, table, board, ns_pair, ew_pair])
+  return plays
+
+
+'''
+##Tests Board
+
+B = Board(4)
+check.expect("Test board 4", [B.dealer, B.ns_vulnerable, B.ew_vulnerable],
+             ["West", True, True])
+B = Board(18)
+check.expect("Test board 18", [B.dealer, B.ns_vulnerable, B.ew_vulnerable],
+             ["East", True, False])
+check.expect("Test board_set", [board.number for board in board_set(3, 1, 5)],
+             [5, 6, 7])
+
+##Tests movements
+
+M = mitchell(3)
+check.expect("Test mitchell round", M[1],
+             [[1, 1, 6, 2], [2, 2, 4, 3], [3, 3, 5, 1]])
+def sets_once(movement, direction):
+  seen = {}
+  for seating in movement:
+    for entry in seating:
+      seen.setdefault(entry[direction], []).append(entry[3])
+  return all(sorted(sets) == sorted(set(sets)) for sets in seen.values())
+check.expect("Test mitchell odd", [sets_once(mitchell(7), 1),
+                                   sets_once(mitchell(7), 2)], [True, True])
+check.expect("Test mitchell even", [sets_once(mitchell(8), 1),
+                                    sets_once(mitchell(8), 2)], [True, True])
+def meets_once(movement, tables):
+  meetings = sorted(tuple(entry[1:3]) for seating in movement
+                    for entry in seating)
+  return meetings == sorted((ns, ew) for ns in range(1, tables + 1)
+                            for ew in range(tables + 1, 2 * tables + 1))
+check.expect("Test mitchell meets once", [meets_once(mitchell(7), 7),
+                                          meets_once(mitchell(8), 8),
+                                          meets_once(mitchell(2), 2)],
+             [True, True, True])
+check.expect("Test mitchell relay", mitchell(4)[1],
+             [[1, 1, 8, 2], [2, 2, 5, 3], [3, 3, 6, 1], [4, 4, 7, 2]])
+check.expect("Test mitchell even sizes",
+             [sets_once(mitchell(t), d) for t in [2, 4, 6, 10]
+              for d in [1, 2]], [True] * 8)
+H = howell(4)
+meetings = sorted(tuple(sorted(entry[1:3])) for seating in H
+                  for entry in seating)
+check.expect("Test howell meets all", meetings,
+             sorted((a, b) for a in range(1, 9) for b in range(a + 1, 9)))
+check.expect("Test howell example", howell(2),
+             [[[1, 4, 1, 1], [2, 2, 3, 1]], [[1, 2, 4, 2], [2, 3, 1, 2]],
+              [[1, 4, 3, 3], [2, 1, 2, 3]]])
+
+##Tests Tournament
+
+T = Tournament(board_set(2))
+for ns_pair, ew_pair, ns_score in [[1, 5, -100], [2, 6, 420], [3, 7, 420],
+                                   [4, 8, 450]]:
+  T.add_result(1, ns_pair, ew_pair, ns_score)
+check.expect("Test matchpoints", [T.matchpoints(1, 420), T.matchpoints(1, 450),
+                                  T.matchpoints(1, -100), T.top(1)],
+             [1.5, 3, 0, 3])
+check.expect("Test pair_matchpoints", [T.pair_matchpoints(2),
+                                       T.pair_matchpoints(5)],
+             [[1.5, 3], [3, 3]])
+check.expect("Test datum", [T.datum(1), T.butler(1, 450), T.pair_imps(5)],
+             [300, 4, 9])
+check.expect("Test bad board", T.add_result(9, 1, 5, 0), False)
+check.expect("Test bad pair", T.add_result(1, 2, 5, 0), False)
+check.expect("Test bad NS pair", [T.add_result(1, 5, 9, 0), 9 in T.played],
+             [False, False])
+check.expect("Test correction", [T.add_result(1, 1, 5, 500),
+                                 T.matchpoints(1, 500), T.scores[1]],
+             [True, 3, [420, 420, 450, 500]])
+check.expect("Test standings", T.standings()[0], [1, 100.0])
+check.expect("Test imps standings", T.standings("imps")[0][0], 1)
+check.expect("Test imps agree", dict(T.standings("imps"))[5], T.pair_imps(5))
+check.expect("Test cross-IMPs standings", T.standings("cross_imps")[0],
+             [1, 6])
+U = Tournament(board_set(2))
+for board, ns_score in [[1, 0], [1, 90], [2, 0], [2, -90]]:
+  U.add_result(board, len(U.played) + 1, len(U.played) + 2, ns_score)
+check.expect("Test datum halves", [U.datum(1), U.datum(2)], [50, -50])
+
+##Tests a whole Mitchell event
+
+import random as py_random
+py_random.seed(4)
+T = Tournament(board_set(14))
+for r, table, board, ns_pair, ew_pair in movement_boards(mitchell(7), 2):
+  T.add_result(board, ns_pair, ew_pair, py_random.choice([-100, 110, 140]))
+check.expect("Test boards played", [len(T.scores[b]) for b in T.scores],
+             [7] * 14)
+check.expect("Test boards per pair", sorted(set(len(T.played[p])
+                                                for p in T.played)), [14])
+S = T.standings()
+points, tops = T.pair_matchpoints(S[3][0])
+check.expect("Test standings agree", S[3][1], 100 * points / tops)
+check.expect("Test average 50", round(sum(percent for pair, percent in S)
+                                      / len(S), 6), 50.0)
+'''
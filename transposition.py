@@ -0,0 +1,297 @@
+from playing import *
+import random as py_random
+# import check
+
+
+TABLE_CAPACITY = 1 << 20
+ZOBRIST_SEED = 52
+NUM_STRAINS = 5
+OWNER_BITS = 2 * SUIT_BITS
+DEPTH_BITS = 4
+DEPTH_WORD = (1 << DEPTH_BITS) - 1
+BOUND_SHIFT = 4 * DEPTH_BITS
+
+##A position is keyed by Zobrist hashing: every (seat, suit, length) triple,
+##every seat on lead and every strain gets a random 64-bit number, and the
+##key of a position is the xor of the numbers of its parts. Playing a card
+##changes one length, so the key is updated with a single xor.
+
+
+def _zobrist_numbers():
+  '''
+  Returns the random numbers of the (seat, suit, length) triples,
+  of the seats on lead and of the strains. Numbers are drawn from
+  a fixed seed so keys are the same in every process, with the
+  standard library's generator so that importing this file does not
+  import NumPy.
+
+  _zobrist_numbers: None
+     -> (list (listof (listof (listof Nat))) (listof Nat) (listof Nat))
+  '''
+  rng = py_random.Random(ZOBRIST_SEED)
+  numbers = [rng.getrandbits(64) for k in range(NUM_HANDS * 4 *
+                                                (HAND_SIZE + 1) +
+                                                NUM_HANDS + NUM_STRAINS)]
+  lengths = [[numbers[(seat * 4 + suit) * (HAND_SIZE + 1):
+                      (seat * 4 + suit + 1) * (HAND_SIZE + 1)]
+              for suit in range(4)] for seat in range(NUM_HANDS)]
+  start = NUM_HANDS * 4 * (HAND_SIZE + 1)
+  return [lengths, numbers[start:start + NUM_HANDS],
+          numbers[start + NUM_HANDS:]]
+
+LENGTH_KEYS, LEADER_KEYS, STRAIN_KEYS = _zobrist_numbers()
+PLAY_KEYS = [[[LENGTH_KEYS[seat][suit][length] ^
+               LENGTH_KEYS[seat][suit][length - 1] if length else 0
+               for length in range(HAND_SIZE + 1)]
+              for suit in range(4)] for seat in range(NUM_HANDS)]
+
+
+class TranspositionTable:
+  '''
+  A store of bounds on the tricks the side on lead takes from a
+  position, shared by any number of double-dummy solves.
+  Bounds are kept for the side on lead rather than for a declarer,
+  so the solves of every declarer of a deal (and of every strain,
+  through the strain part of the key) can use each other's entries.
+
+  Entries with the same Zobrist key are kept together in a bucket.
+  Each entry fixes the owners of only the top cards of each suit
+  that decided its result, so one entry matches every position
+  that agrees with it on those cards. Owners and card depths are
+  packed into single numbers (see store). When the table holds
+  capacity entries, the least recently used bucket is dropped.
+
+  Fields:
+     capacity (Nat)
+     buckets (dictof Nat (listof (list Nat Nat Nat Nat Nat)))
+     leads (dictof Nat Nat)
+     size (Nat)
+     hits (Nat)
+     misses (Nat)
+     stores (Nat)
+     evictions (Nat)
+  Requires:
+     capacity > 0
+     size is the number of entries in all of buckets
+  '''
+
+  def __init__(self, capacity = TABLE_CAPACITY):
+    '''
+    Initialize an empty TranspositionTable holding at most capacity
+    entries
+
+    Effects: Mutates self
+
+    __init__: TranspositionTable [Nat] -> None
+    Requires: Conditions from Fields above are met.
+    '''
+    self.capacity = capacity
+    self.buckets = {}
+    self.leads = {}
+    self.size = 0
+    self.hits = 0
+    self.misses = 0
+    self.stores = 0
+    self.evictions = 0
+
+  def __len__(self):
+    '''
+    Returns the number of entries in self
+
+    __len__: TranspositionTable -> Nat
+    '''
+    return self.size
+
+  def __repr__(self):
+    '''
+    Returns a representation of a TranspositionTable object
+
+    __repr__: TranspositionTable -> Str
+    '''
+    return ("TranspositionTable: {0.size}/{0.capacity} entries " +
+            "Hits {0.hits} Misses {0.misses} Stores {0.stores} " +
+            "Evictions {0.evictions}").format(self)
+
+  def probe(self, key, owners, target):
+    '''
+    Returns a bound and its packed card depths from an entry of self
+    matching the position with Zobrist key key and packed owners
+    owners when the bound settles whether the side on lead takes
+    target tricks (a lower bound of at least target or an upper
+    bound below it), and None otherwise. The two are packed into one
+    number, the bound shifted up by BOUND_SHIFT, so that a hit
+    builds no list.
+
+    Effects: Mutates self
+
+    probe: TranspositionTable Nat Nat Int -> (anyof Nat None)
+    '''
+    entries = self.buckets.get(key)
+    if entries != None:
+      for mask, prefix, low, high, depths in entries:
+        if owners & mask == prefix:
+          if low >= target:
+            self.hits += 1
+            self.buckets[key] = self.buckets.pop(key)
+            return low << BOUND_SHIFT | depths
+          if high < target:
+            self.hits += 1
+            self.buckets[key] = self.buckets.pop(key)
+            return high << BOUND_SHIFT | depths
+    self.misses += 1
+    return None
+
+  def store(self, key, owners, low, high, depths):
+    '''
+    Adds an entry to self bounding the tricks for the side on lead
+    between low and high in every position with Zobrist key key
+    whose top cards of each suit s, depths >> (DEPTH_BITS * s) of
+    them, have the owners they have in owners. An entry for the same
+    cards and owners is narrowed instead. Makes room by dropping the
+    least recently used buckets when self is full.
+
+    Effects: Mutates self
+
+    store: TranspositionTable Nat Nat Nat Nat Nat -> None
+    Requires: owners holds the owner sequences of suit_shape of the
+       four suits, OWNER_BITS apart
+    '''
+    mask = 0
+    for s in range(4):
+      depth = (depths >> (DEPTH_BITS * s)) & DEPTH_WORD
+      mask |= ((1 << (2 * depth)) - 1) << (OWNER_BITS * s)
+    prefix = owners & mask
+    self.stores += 1
+    entries = self.buckets.get(key)
+    if entries != None:
+      for entry in entries:
+        if entry[0] == mask and entry[1] == prefix:
+          entry[2] = max(entry[2], low)
+          entry[3] = min(entry[3], high)
+          return None
+    while self.size >= self.capacity:
+      oldest = next(iter(self.buckets))
+      dropped = len(self.buckets.pop(oldest))
+      self.size -= dropped
+      self.evictions += dropped
+      if oldest == key:
+        entries = None
+    if entries == None:
+      self.buckets[key] = [[mask, prefix, low, high, depths]]
+    else:
+      entries.append([mask, prefix, low, high, depths])
+    self.size += 1
+
+  def best_lead(self, position):
+    '''
+    Returns the lead remembered for position, packed as the suit
+    times 16 plus the number of cards of that suit above it, or None
+
+    best_lead: TranspositionTable Nat -> (anyof Nat None)
+    '''
+    return self.leads.get(position)
+
+  def remember_lead(self, position, lead):
+    '''
+    Remembers lead, packed as in best_lead, as the lead to try first
+    in position
+
+    Effects: Mutates self
+
+    remember_lead: TranspositionTable Nat Nat -> None
+    '''
+    if len(self.leads) >= self.capacity:
+      self.leads.clear()
+    self.leads[position] = lead
+
+  def clear(self):
+    '''
+    Removes every entry and remembered lead from self and resets
+    its counters
+
+    Effects: Mutates self
+
+    clear: TranspositionTable -> None
+    '''
+    self.__init__(self.capacity)
+
+
+##END OF CLASSES
+
+
+def position_key(masks, first, strain):
+  '''
+  Returns the Zobrist key of the position with hands masks, first
+  on lead and strain as trumps
+
+  position_key: (listof Nat) Nat Nat -> Nat
+  Requires:
+     masks are four hand masks (see CompactPlayer) for North, East,
+        South and West in that order
+     0 <= first <= 3 and 0 <= strain <= 4
+  '''
+  key = LEADER_KEYS[first] ^ STRAIN_KEYS[strain]
+  for seat in range(NUM_HANDS):
+    for suit in range(4):
+      length = bin((int(masks[seat]) >> (SUIT_BITS * suit)) &
+                   SUIT_WORD).count("1")
+      key ^= LENGTH_KEYS[seat][suit][length]
+  return key
+
+def play_key(key, seat, suit, length):
+  '''
+  Returns key updated for seat playing a card of suit while holding
+  length cards of it. Playing it back gives key again.
+
+  play_key: Nat Nat Nat Nat -> Nat
+  Requires: 1 <= length <= 13
+
+  Example:
+     play_key(play_key(k, 0, 3, 5), 0, 3, 5) => k
+  '''
+  return key ^ PLAY_KEYS[seat][suit][length]
+
+def lead_key(key, first, second):
+  '''
+  Returns key updated for the lead passing from first to second
+
+  lead_key: Nat Nat Nat -> Nat
+  '''
+  return key ^ LEADER_KEYS[first] ^ LEADER_KEYS[second]
+
+
+'''
+##Tests position_key and play_key
+
+M = [hand_to_mask([Card("A", "S"), Card("K", "S")]),
+     hand_to_mask([Card("Q", "S"), Card("2", "H")]),
+     hand_to_mask([Card("3", "S"), Card("4", "S")]),
+     hand_to_mask([Card("A", "H"), Card("5", "S")])]
+K = position_key(M, 3, 4)
+check.expect("Test play_key undoes", play_key(play_key(K, 0, 3, 2), 0, 3, 2), K)
+M2 = [M[0] ^ card_to_bit(Card("K", "S"))] + M[1:]
+check.expect("Test play_key incremental", play_key(K, 0, 3, 2),
+             position_key(M2, 3, 4))
+check.expect("Test lead_key", lead_key(K, 3, 1), position_key(M, 1, 4))
+check.expect("Test strain in key", position_key(M, 3, 3) == K, False)
+
+##Tests TranspositionTable
+
+T = TranspositionTable(2)
+T.store(1, 0, 1, 3, 0)
+check.expect("Test probe lower", T.probe(1, 5, 1), 1 << BOUND_SHIFT)
+check.expect("Test probe miss", T.probe(1, 5, 2), None)
+T.store(2, 3 << (3 * OWNER_BITS), 0, 0, 1 << (3 * DEPTH_BITS))
+check.expect("Test probe prefix", T.probe(2, 7 << (3 * OWNER_BITS), 1),
+             1 << (3 * DEPTH_BITS))
+check.expect("Test probe prefix differs", T.probe(2, 6 << (3 * OWNER_BITS), 1),
+             None)
+T.store(3, 0, 0, 0, 0)
+check.expect("Test eviction", [len(T), T.evictions, 1 in T.buckets], [2, 1, False])
+check.expect("Test counters", [T.hits, T.misses, T.stores], [2, 2, 3])
+U = TranspositionTable()
+U.store(4, 0, 0, 5, 0)
+U.store(4, 0, 2, 7, 0)
+check.expect("Test store narrows", [len(U), U.probe(4, 0, 2), U.probe(4, 0, 6)],
+             [1, 2 << BOUND_SHIFT, 5 << BOUND_SHIFT])
+'''